@@ -0,0 +1,207 @@
+# Formato de arquivo compacto e versionado para o modelo de renda.
+#
+# Em vez de retreinar o modelo (rodando o script) ou de despickar o estimador completo do
+# sklearn em cada processo, o modelo é gravado como um diretório (apontado por um link
+# simbólico com o nome do artefato, trocado atomicamente a cada gravação) com:
+#   - meta.json: versão do formato, vocabulários congelados do pré-processamento e do
+#     codificador, ordem das colunas e classes;
+#   - um .npy por vetor da(s) árvore(s): atributo, limiar, filho da esquerda, filho da
+#     direita e probabilidades de cada nó, além da raiz de cada árvore.
+# Os vetores são abertos com np.load(mmap_mode='r'), de modo que vários processos que
+# carregam o mesmo artefato compartilham as mesmas páginas de memória. Carregar o artefato
+# não importa o sklearn, o matplotlib nem o seaborn; a pontuação é feita pela inferência em
+# lote de inferencia.py, sempre com o motor 'numpy' (o motor 'compilado' importaria o
+# sklearn e dependeria do formato interno das suas árvores).
+
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from preprocessamento import PreProcessamento, CodificadorOneHot
+from inferencia import InferenciaEmLote
+
+
+FORMATO = 'renda-arvores'
+VERSAO = 1
+
+# Vetores gravados em .npy, com o tipo usado em cada um.
+vetores = {
+    'atributo': np.int32,
+    'limiar': np.float64,
+    'esquerda': np.int32,
+    'direita': np.int32,
+    'valor': np.float64,
+    'raizes': np.int32,
+}
+
+
+def _estado_pre(pre):
+    return {
+        'descartadas': list(pre.descartadas),
+        'padroes': dict(pre.padroes),
+        'limite_ganho': pre.limite_ganho,
+        'colunas': list(pre.colunas_),
+        'categorias': {c: list(t.categories) for c, t in pre.categorias_.items()},
+        'saida': {c: list(t.categories) for c, t in pre.saida_.items()},
+        'tabelas': {c: t.tolist() for c, t in pre.tabelas_.items()},
+    }
+
+
+def _pre_de_estado(estado):
+    pre = PreProcessamento(agrupamentos={}, padroes=estado['padroes'], descartadas=estado['descartadas'],
+                           limite_ganho=estado['limite_ganho'])
+    pre.colunas_ = estado['colunas']
+    pre.categorias_ = {c: pd.CategoricalDtype(v) for c, v in estado['categorias'].items()}
+    pre.saida_ = {c: pd.CategoricalDtype(v) for c, v in estado['saida'].items()}
+    pre.tabelas_ = {c: np.array(v, dtype=np.int8 if len(pre.saida_[c].categories) < 127 else np.int32)
+                    for c, v in estado['tabelas'].items()}
+    return pre
+
+
+def _estado_codificador(cod):
+    return {
+        'alvo': cod.alvo,
+        'drop_first': cod.drop_first,
+        'numericas': list(cod.numericas_),
+        'categoricas': list(cod.categoricas_),
+        'vocabulario': {c: list(t.categories) for c, t in cod.vocabulario_.items()},
+        'classes': list(cod.classes_),
+    }
+
+
+def _codificador_de_estado(estado):
+    cod = CodificadorOneHot(alvo=estado['alvo'], drop_first=estado['drop_first'])
+    return cod.define_vocabulario(estado['numericas'], {c: estado['vocabulario'][c] for c in estado['categoricas']},
+                                  estado['classes'])
+
+
+def vetores_arvores(arvores):
+    """Concatena os nós de uma ou mais árvores do sklearn (atributo tree_) em vetores planos.
+
+    Os índices dos filhos passam a ser globais; 'raizes' guarda o nó inicial de cada árvore.
+    """
+    partes = {nome: [] for nome in vetores}
+    deslocamento = 0
+    for arvore in arvores:
+        esq, dir_ = arvore.children_left, arvore.children_right
+        folha = esq == -1
+        valores = arvore.value[:, 0, :]
+        partes['atributo'].append(np.where(folha, -1, arvore.feature))
+        partes['limiar'].append(arvore.threshold)
+        partes['esquerda'].append(np.where(folha, -1, esq + deslocamento))
+        partes['direita'].append(np.where(folha, -1, dir_ + deslocamento))
+        partes['valor'].append(valores / valores.sum(axis=1, keepdims=True))
+        partes['raizes'].append(np.array([deslocamento]))
+        deslocamento += arvore.node_count
+    return {nome: np.concatenate(partes[nome]).astype(tipo) for nome, tipo in vetores.items()}
+
+
+def salva_artefato(modelo, diretorio):
+    """Grava um ModeloRenda (árvore de decisão ou floresta do sklearn) como artefato."""
+    estimador = modelo.estimador
+    arvores = [e.tree_ for e in estimador.estimators_] if hasattr(estimador, 'estimators_') else [estimador.tree_]
+    dados = vetores_arvores(arvores)
+    meta = {
+        'formato': FORMATO,
+        'versao': VERSAO,
+        'pre': _estado_pre(modelo.pre),
+        'codificador': _estado_codificador(modelo.codificador),
+        'nomes': list(modelo.codificador.nomes_),
+        'classes': [modelo.codificador.classes_[int(c)] for c in estimador.classes_],
+        'profundidade': int(max(a.max_depth for a in arvores)),
+        'n_arvores': len(arvores),
+    }
+    diretorio = os.path.abspath(diretorio)
+    pai, nome = os.path.split(diretorio)
+    versoes = os.path.join(pai, f".{nome}.versoes")
+    os.makedirs(versoes, exist_ok=True)
+    versao = tempfile.mkdtemp(dir=versoes)
+    # O artefato é lido por processos de outros usuários (workers de pontuação).
+    os.chmod(versao, 0o755)
+    for nome_vetor, vetor in dados.items():
+        np.save(os.path.join(versao, f"{nome_vetor}.npy"), vetor)
+    with open(os.path.join(versao, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    # 'diretorio' é um link simbólico para a versão atual. O link novo é criado ao lado e
+    # trocado com os.replace (um rename, atômico): um leitor abre a versão anterior ou a nova,
+    # nunca um diretório ausente ou incompleto.
+    anterior = os.path.realpath(diretorio) if os.path.islink(diretorio) else None
+    if os.path.isdir(diretorio) and anterior is None:
+        # Artefato gravado como diretório comum (antes dos links): trocado uma única vez por
+        # dois renames, com um intervalo em que o caminho não existe.
+        os.rename(diretorio, tempfile.mkdtemp(dir=versoes))
+    link = f"{diretorio}.{os.getpid()}.link"
+    os.symlink(os.path.relpath(versao, pai), link)
+    os.replace(link, diretorio)
+    # Fica apenas a versão anterior, para os leitores que resolveram o link antes da troca (e
+    # que tentam de novo se ela também for apagada, veja PreditorArtefato).
+    manter = {os.path.realpath(versao), anterior}
+    for antiga in os.listdir(versoes):
+        if os.path.realpath(os.path.join(versoes, antiga)) not in manter:
+            shutil.rmtree(os.path.join(versoes, antiga), ignore_errors=True)
+
+
+class PreditorArtefato:
+    """Modelo carregado de um artefato; mesma interface de pontuação do ModeloRenda."""
+
+    def __init__(self, diretorio, mmap_mode='r'):
+        # O link é resolvido uma vez por tentativa: todos os arquivos vêm da mesma versão. Os
+        # vetores mapeados continuam válidos mesmo que a versão seja apagada depois.
+        while True:
+            versao = os.path.realpath(diretorio)
+            try:
+                self._carrega(versao, mmap_mode)
+                break
+            except FileNotFoundError:
+                # A versão foi apagada por gravações seguidas depois de o link ser resolvido;
+                # o link já aponta para uma versão mais nova.
+                if os.path.realpath(diretorio) == versao:
+                    raise
+        # Montado no primeiro lote (inferencia.py).
+        self._inferencia = None
+
+    def _carrega(self, diretorio, mmap_mode):
+        with open(os.path.join(diretorio, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('formato') != FORMATO or meta.get('versao') != VERSAO:
+            raise ValueError(f"artefato incompatível em {diretorio}: {meta.get('formato')} v{meta.get('versao')}")
+        self.meta = meta
+        self.pre = _pre_de_estado(meta['pre'])
+        self.codificador = _codificador_de_estado(meta['codificador'])
+        self.classes = meta['classes']
+        self.profundidade = meta['profundidade']
+        for nome in vetores:
+            setattr(self, nome, np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode=mmap_mode))
+
+    def matriz(self, data):
+        # O sklearn compara os atributos em float32; o mesmo é feito aqui.
+        return self.codificador.transform(self.pre.transform(data), formato='denso', dtype=np.float32)
+
+    def proba_matriz(self, X):
+        """Probabilidade de cada classe (média das árvores) para uma matriz já codificada."""
+        if self._inferencia is None:
+            self._inferencia = InferenciaEmLote({nome: getattr(self, nome) for nome in vetores}, self.profundidade,
+                                                motor='numpy')
+        return self._inferencia.proba_matriz(X)
+
+    def predict_proba(self, data):
+        """Probabilidade de alta renda (>50K)."""
+        return self.proba_matriz(self.matriz(data))[:, 1]
+
+    def predict(self, data):
+        return self.pontua(data)[0]
+
+    def pontua(self, data):
+        proba = self.proba_matriz(self.matriz(data))
+        return proba[:, 1] > proba[:, 0], proba[:, 1]
+
+    def rotulos(self, previsoes):
+        return np.asarray(self.codificador.classes_, dtype=object)[np.asarray(previsoes, dtype=np.intp)]
+
+
+def carrega_artefato(diretorio, mmap_mode='r'):
+    return PreditorArtefato(diretorio, mmap_mode)
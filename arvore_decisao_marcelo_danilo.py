@@ -1,730 +1,404 @@
-# %% [markdown]
-# # **1. Preparando o ambiente de trabalho**
-
-# %%
-# Imports
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib as m
-import seaborn as sns
-from collections import Counter
-
-# %% [markdown]
-# # **2. Objetivos**
-
-# %% [markdown]
-# O objetivo deste trabalho é realizar uma análise exploratória de dados do conjunto de dados "Adult" do UCI Machine Learning Repository. E criar um modelo de classificação que classifique os respondentes da pesquisa de acordo com a renda a partir das variáveis de característica, obtendo valores corretos para a variável alvo. Utilizando o método de aprendizado de máquina denominado Árvore de decisão. Para saber quais características são importantes para determinar se a renda anaual é superior ou inferior a $50.00 Dólares por ano.
-# 
-
-# %% [markdown]
-# # **3. O Dataset**
-
-# %% [markdown]
-# O conjunto de dados "Adult" contém informações sobre renda, educação, idade, sexo e raça, etc. O conjunto de dados contém *48.842* entradas com um total de 15 colunas representando diferentes atributos das pessoas, conforme a tabela abaixo. O conjunto de dados foi divido previamente em dois datasets, o dataset de de treino **adult.data** que contém *32.560* entradas, e o dataset de testes **adult.test** que contém *16.282* entradas. Os dados foram coletados em 1994 e a variável alvo,  **Renda Anual** (*income*) é dividida em duas classes: *"Alta Renda"* ($\gt50K$) e *"Baixa Renda"* ($\leq50K$).
-# 
-# 
-# 
-# 
-
-# %% [markdown]
-# | Coluna          | Variável                  | Definição                                                                                     | Tipo de Variável                             | Tipo de Dado |
-# | :------------  | :------------            | :------                                                                                       | :------                                      |  ----:       |
-# | age             |  Idade                    |   Idade do respondente                                                                        |   Discreta (de 17 a 90)                      |  int64       |
-# | workclass       |  Classe de trabalho       |   Classificação do trabalho do respondente                                                    |   Categórica (9 categorias)                     |  object      |
-# | fnlwgt          |  Peso final               |   O número de pessoas que acreditam no senso                          |   Discreta                                   |  int64       |
-# | education       |  Escolaridade             |   O nível de escolaridade mais elevado obtido pelo respondente                                |   Ordinal (16 categorias)                    |  object      |
-# | education-num   |  Número de escolaridade   |   O número de escolaridade associada ao 'education' do respondente                                             |   Discreta (de 1 a 16)                       |  int64       |
-# | marital-status  |  Estado Civil             |   O estado civil do respondente                                                               |   Categórica (7 categorias)                     |  object      |
-# | occupation      |  Ocupação                 |   Qual o tipo de trabalho do respondente                                                      |   Categórica (15 categorias)                    |  object      |
-# | relationship    |  Relacionamento familiar  |   Tipo de relacionamento familiar do respondente                                              |   Categórica (6 categorias)                     |  object      |
-# | race            |  Raça                     |   A raça do respondente                                                                       |   Categórica (5 categorias)                     |  object      |
-# | sex             |  Sexo                     |   O sexo do do respondente                                                                    |   Categórica (2 categorias)                     |  object      |
-# | capital-gain    |  Ganho de capital         |   Valor de ganhos de capital que o respondente obteve sobre sua poupança, investimentos e pensão   |   Contínua                                   |  int64       |
-# | capital-loss    |  Perda de capital         |   Valor de perda de capital que o respondente obteve sobre sua poupança, investimentos e pensão    |   Contínua                                   |  int64       |
-# | hours-per-week  |  Horas por semana         |   Quantidade de horas trabalhadas por semana pelo respondente                                 |   Discreta (de 1 a 99)                       |  int64       |
-# | native-country  |  País de origem           |   Nacionalidade do respondente                                                                |   Categórica (42 países)                        |  object      |
-# | income          |  Renda                    |   Classificação se o respondente é de baixa ou de alta renda                                  |   Booleano (≤ USD 50 mil, > USD 50 mil)      |  object      |
-
-# %% [markdown]
-# Os dados foram obtidos do repositório *UCI Machine Learning Repository* por meio do download do arquivo *.zip* que contém os arquivos *adult.data*, *adult.names*, *adult.test*, *Index*, *old.adult.names*. Então usamos o arquivo *adult.data*, que contém o dataset de treino, e transformando-o em um Pandas Dataframe.
-
-# %%
-# Carregando os dados dos arquivos baixados do site UCI Machine Learning.
-
-colunas = ['age', 'workclass', 'fnlwgt', 'education', 'education-num', 'marital-status', 'occupation', 'relationship', 'race', 'sex', 'capital-gain', 'capital-loss', 'hours-per-week', 'native-country', 'income']
-
-data = pd.read_csv('data/adult.data', sep = ', ', names = colunas, engine = 'python', skiprows = 1)
-
-# %%
-# Visualizando o dataset
-data.head()
-
-# %%
-# Observando o formato do Dataframe
-data.shape
-
-# %% [markdown]
-# Verificando a distribuição da variável alvo, Renda, no dataset.
-
-# %%
-data['income'].value_counts()
-
-# %%
-# Criando uma função para avaliar a simetria entre os valores de cada categoria de renda no dataset.
-
-def calcula_porcent_renda(data):
-    rotulo = data.values[:, -1]
-    contador = Counter(rotulo)
-    for key, value in contador.items():
-        porcentagem = value / len(rotulo) * 100
-        print(f"A Classe: {key}, tem o total de {value} indivíduos, o que representa {porcentagem:.2f}% dos dados coletados.")
-
-# %%
-# Calculando a porcentagem de cada categoria de renda
-
-calcula_porcent_renda(data)
-
-# %% [markdown]
-# Nota-se que há um grande desbalanço de renda entre os participantes da pesquisa, com aqueles considerados de baixa renda ($\leq50K$) apresentando mais de três vezes o número de participantes considerados de alta renda ($\gt50K$).
-# 
-# 
-# 
-
-# %% [markdown]
-# Observamos, então, as variáveis do dataset junto com seus tipos de dados e a presença de valores faltantes.
-
-# %%
-# Informações sobre as colunas e os dados
-data.info()
-
-# %%
-print(f"dados únicos do workclass:{data['workclass'].unique()}\n")
-print(f"dados únicos do occupation:{data['occupation'].unique()}\n")
-print(f"dados únicos do native-country:{data['native-country'].unique()}\n")
-
-# %% [markdown]
-# Embora não tenha-se observado que existem valores faltantes, algumas categorias apresentam dados não respondidos. Por hora, faremos a substituição dos valores faltantes do caractere "**?**" para o objecto **nan**. E em seguida contaremos quantos valores desconhecidos há em cada coluna.
-
-# %%
-# Substituindo os valores faltantes do caractere '?' para o objeto nan,
-
-from numpy import nan
-data = data.replace('?',nan)
-
-# %%
-# Criando funlção para calcular os número e a percentagem de valores faltantes em cada coluna
-
-def valoresFaltantes(data):
-		valores_faltantes = data.isnull().sum()
-		valores_faltantes = pd.DataFrame(valores_faltantes, columns= ['Valores Faltantes'])
-		j=1
-		sum_total=len(data)
-		valores_faltantes['Porcentagem (%)'] = round(( (valores_faltantes['Valores Faltantes'] / sum_total) * 100), 1)
-		return valores_faltantes.sort_values('Porcentagem (%)',ascending=False)
-
-
-# %%
-# Calculando o número, a percentagem dos valores faltantes.
-
-valoresFaltantes(data)
-
-# %% [markdown]
-# Há valores faltantes apenas nas variáveis ***workclass***, ***occupation*** e ***native-country***, onde é possível notar que o número de valores faltantes nas variáveis ***workclass*** e ***occupation*** são praticamente iguais. Logo, quase sempre que houver um valor faltante em ***workclass***, haverá um valor faltante em ***occupation***.
-
-# %% [markdown]
-# # **4 Explorando as variáveis**
-
-# %% [markdown]
-# Separando as variáveis numéricas e categóricas em conjuntos de dados diferentes para tratá-las separadamente.
-
-# %%
-data['native-country'].value_counts()
-
-# %% [markdown]
-# <p>Observe que a maioria dos respondentes são Estadunidenses. Portanto, vamos considerar os demais países como 'outros'.</p>
-
-# %%
-# Criando conjuntos de dados diferentes para as variáveis numéricas e categóricas.
-
-num_data= data[['age', 'fnlwgt', 'education-num', 'capital-gain', 'capital-loss', 'hours-per-week']]
-cat_data= data.select_dtypes(include=['object'])
-cat_data['native-country'] = cat_data['native-country'].apply(lambda country: country if country=='United-States' else 'Others')
-cat_data['native-country'].unique()
-
-
-# %% [markdown]
-# ## **4.1 Explorando as variáveis numéricas**
-
-# %% [markdown]
-# Usamos o método **.describe** do Pandas para fazemos um sumário com as estatísticas descritivas básicas de todas as vairáveis numéricas, como os valores mínimos, médios, máximos, desvio padrão, etc.
-
-# %%
-# Sumário das variáveis numéricas
-
-pd.set_option('display.float_format', lambda x: '%.3f' % x)
-data.describe()
-
-# %% [markdown]
-# <p>Os dados de 'hours-per-week' possuem valores mínimo de <b>1h</b> e máximo de <b>99h</b>. Ou seja, provavelmente foram informados incorretamente ou erros na entrada dos dados.
-# </p>
-
-# %% [markdown]
-# Plotamos os histogramas com as distribuições de todas as variáveis numéricas
-
-# %%
-num_data.hist(bins=20, figsize=(20, 15), histtype='step')
-plt.show()
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# 
-# 
-# *   O pico da variável **idade** é idade abaixo de 50 anos.
-# *   O máximo da variável **fnlwgts** está abaixo de 400k.
-# *   Muito poucas pessoas investem em capital e há alguns casos discrepantes, como:
-#     *   Pessoas que ganham mais de US$ 90.000,00 por meio de **ganhos de capital**.
-#     *   No entanto, para pessoas que sofreram  **perda de capital** a perda média é cerca de US$ 2.000,00.
-#     *   Obseve que a maioria das pessoas não tiveram perda de capital.
-# *   A maioria das pessoas trabalha cerca de **40 horas semanais**.
-#     *   Também há outliers como alguns casos de pessoas trabalhando **100 horas** e **1 hora** por semana.
-# 
-# 
-# 
-# 
-
-# %% [markdown]
-# #### **Correlações entre as variáveis numéricas**
-
-# %% [markdown]
-# Iremos, então, analisar a correlação entre as variáveis numéricas.
-
-# %%
-# Criando Função para gerar o heatmap com as correlações das variáveis numéricas.
-
-def heatMap(data):
-  sns.heatmap(data.corr(), annot=True, fmt='.3f')
-  #print(data.corr())
-
-# %%
-heatMap(num_data)
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   A variável **fnlwgt** não possui correlação significativa com nenhuma das outras variáveis, portanto, é uma variável descartável para a análise.
-# *   As variáveis **número de escolaridade**, **horas trabalhadas por semana** e **ganho capital** têm algumas correlações que valem a pena serem exploradas e podem ser melhoradas.
-
-# %% [markdown]
-# #### **Relações entre as variáveis numéricas e a Renda**
-
-# %%
-pd.pivot_table(data, index= ['income'], values=num_data.columns)
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Pessoas com maior **renda** apresentam valores elevados em todos os atributos.
-
-# %% [markdown]
-# ## **4.2 Explorando as variáveis categóricas**
-
-# %% [markdown]
-# Começaremos plotando os gráficos de barra de todas as variáveis categóricas.
-
-# %%
-for i in cat_data.columns:
-    plt.figure(figsize=(25, 5))
-    sns.countplot(data= cat_data, x= i)
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# 
-# 
-# *   A maioria das pessoas trabalham no setor privado, com outras distribuídas quase uniformemente entre vários empregos governamentais e como autônomos.
-# *   A maioria das pessoas possui diploma de Ensino Superior, do Ensino Médio ou cursou alguma faculdade. A distribuição é muito semelhante à dos anos de escolaridade (education-number), fato que pode ser melhor explorado.
-# *   A maioria das pessoas casaram, sendo poucas as que divorciaram ou tornaram-se viúvas. Enquanto as demais não se casaram.
-# *   As ocupações estão, em sua maioria, distribuídas de maneira uniforme e é difícil ver uma tendência quando há tantas categorias.
-# *   A maioria das pessoas são maridos ou não têm família.
-# *   A maioria das pessoas é branca, sendo os negros o único grupo etnico com número considerável na amostra.
-# *   Há mais homens do que mulheres na amostra, o que também pode ser inferido do facto de a maioria das pessoas serem maridos.
-# *   A grande maioria dos entrevistados é dos EUA.
-# *   Como comentado anteriormente, há muito mais pessoas com Baixa Renda (inferior a 50 mil), do que pessoas de Alta Renda (superior à 50 mil), o que mostra que os dados estão muito desequilibrados.
-
-# %% [markdown]
-# # **5. Engenharia de atributos**
-
-# %% [markdown]
-# A maioria dos atributos categóricos são muito confusos, com número excessivo de categorias. Então, podemos fazer uma engenharia de atributos para agrupar categorias semelhantes para aprimorar os atributos.
-# 
-# Começamos observando o número de categorias de cada variável categórica.
-
-# %%
-# Computando valores únicos de cada variável categórica
-
-cat_rotulos = ['workclass', 'education', 'marital-status', 'occupation', 'relationship', 'race', 'sex', 'native-country']
-wkclass = data.workclass.unique()
-edu = data.education.unique()
-estciv = data['marital-status'].unique()
-ocup = data.occupation.unique()
-relat = data.relationship.unique()
-race = data.race.unique()
-sex = data.sex.unique()
-country = data['native-country'].unique()
-
-# Gerando um array com os valores únicos de cada variável.
-
-data_col=[wkclass, edu, estciv, ocup, relat, race, sex, country]
-
-# Uniformizando o tamanho dos arrays
-
-cat_col = []
-for i in data_col:
-    cat_col.append(np.pad(i, (0, (len(country)-len(i))), 'empty'))
-cat_col.append(country)
-
-# Gerando o dataframe com os valores das variáveis categóricas.
-
-categorias = pd.DataFrame(dict(zip(cat_rotulos, cat_col)))
-categorias.head()
-
-# %%
-
-
-# %% [markdown]
-# #### **Classe de trabalho** (*workclass*)
-
-# %% [markdown]
-# Iremos iniciar reduzindo o número de categorias da variável Classe de trabalho (workclass), agrupando diversas categorias que apresentam afinidade entre si, criando apenas 4 grupos representando setores distintos da economia, são eles:
-# *   Privado
-# *   Governo
-# *   Autônomo
-# *   Outros
-
-# %%
-# Agrupando as classes de trabalho por afinidade.
-
-data['workclass'].replace(['State-gov', 'Federal-gov', 'Local-gov'], 'Government', inplace=True)
-data['workclass'].replace(['Self-emp-not-inc', 'Self-emp-inc'], 'Self', inplace=True)
-data['workclass'].replace(['Without-pay', 'Never-worked'], 'Others', inplace=True)
-
-plt.figure(figsize=(16, 4))
-sns.countplot(data=data, x='workclass')
-plt.figure(figsize=(16, 4))
-sns.countplot(data=data, x='workclass', hue='income')
-
-# %% [markdown]
-# #### **Educação e Escolaridade** (*education* e *education-number*)
-
-# %% [markdown]
-# Verificando a interseção entre as variáveis Educação e Escolaridade
-
-# %%
-# Verificando a interseção entre educação e escolaridade.
-
-data.groupby('education').nunique()['education-num']
-
-# %% [markdown]
-# Isso implica que *Educação* (education) e *Escolaridade* (education-num) representam exatamente a mesma informação. E já está diretamente codificada na base de dados, então podemos usar apenas um dos dois e descartar o outro.
-
-# %%
-# Agrupando os níveis de escolaridd por afinidade.
-
-data['education'].replace(['11th', '9th', '7th-8th', '5th-6th', '10th', '1st-4th', 'Preschool', '12th'], 'School-Dropout', inplace=True)
-data['education'].replace(['Some-college', 'Assoc-acdm', 'Assoc-voc'], 'College', inplace=True)
-data['education'].replace('Prof-school', 'Masters', inplace=True)
-
-# %%
-# Plotando os gráficos
-
-plt.figure(figsize=(16, 4))
-sns.countplot(data=data, x='education')
-
-plt.figure(figsize=(16,4))
-sns.countplot(data=data, x='education', hue='income')
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Mestres e Doutores são muito bem remunerados em comparação com demais níveis de ensino.
-# *   A maioria das pessoas de baixa renda abandonou o ensino básico ou concluiu apenas o ensino médio
-# 
-
-# %% [markdown]
-# #### **Estado Civil** (*marital-status*)
-
-# %% [markdown]
-# Iremos reduzir o número de categorias da variável Estado Civil (marital-status), agrupando diversas categorias que apresentam afinidade entre si, criando apenas 4 grupos representando setores distintos da economia, são eles:
-# *   Solteiro(a)
-# *   Casado(a)
-# *   Divorciado(a)
-# *   Viúvo(a)  
-
-# %%
-# Agrupando os estados civis por afinidade.
-
-data['marital-status'].replace(['Married-AF-spouse', 'Married-civ-spouse', 'Married-spouse-absent'], 'Married', inplace=True)
-data['marital-status'].replace('Divorced', 'Separated',inplace=True)
-
-plt.figure(figsize=(16, 4))
-sns.countplot(data=data, x='marital-status')
-
-plt.figure(figsize=(16,4))
-sns.countplot(data=data, x='marital-status', hue='income')
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Quase todas as pessoas com renda superior a 50 mil são casadas.
-# *   As pessoas solteiras têm renda comparativamente muito mais baixa.
-
-# %% [markdown]
-# #### **Ocupação** (*occupation*)
-
-# %% [markdown]
-# Iremos iniciar reduzindo o número de categorias da variável Ocupação (occupation), agrupando diversas categorias pelo tipo de trabalho que desempenham, criando apenas 6 grupos representando setores distintos da economia, são eles:
-# *   Trabalhadores Operacional (Operários)
-# *   Trabalhadores Administrativo e Executivo
-# *   Trabalhadores do Conhecimento
-# *   Trabalhadores em Vendas e Serviços
-# *   Trabalhadores do Setor primário (agricultura, pecuária, pesca, extrativismo)
-# *   Militares
-
-# %%
-# Agrupando os ocupações por setor de trabalho.
-
-data['occupation'].replace(['Tech-support', 'Craft-repair', 'Handlers-cleaners', 'Transport-moving', 'Machine-op-inspct'], 'Blue-collar', inplace=True)
-data['occupation'].replace(['Exec-managerial', 'Adm-clerical'], 'White-collar', inplace=True)
-data['occupation'].replace('Prof-specialty', 'Gold-collar', inplace=True)
-data['occupation'].replace(['Other-service', 'Sales', 'Priv-house-serv', 'Protective-serv'], 'Pink-collar', inplace=True)
-data['occupation'].replace('Farming-fishing', 'Green-collar', inplace=True)
-data['occupation'].replace('Armed-Forces', 'Brown-collar', inplace=True)
-
-plt.figure(figsize=(16, 4))
-sns.countplot(data=data, x='occupation')
-
-plt.figure(figsize=(16,4))
-sns.countplot(data=data, x='occupation', hue='income')
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Operários e trabalhadores do setor de vendas e serviços têm a renda mais baixa.
-# *   Trabalhadores do conhecimento são as profissões mais bem pagas.
-
-# %% [markdown]
-# #### **País de origem** (*native-country*)
-
-# %% [markdown]
-# Iremos reduzie o número de categorias da variável Paíos de origem (native-country), agrupando as nacionalidades em 2 grupos distintos, são eles:
-# *   Estados Unidos
-# *   Outros
-
-# %%
-# Agrupando as nacionalidades em Estados Unidos e outros.
-
-data['native-country'] = data['native-country'].map(lambda country: 'US' if country == 'United-States' else 'Other')
-
-data.head()
-
-# %%
-# Plotando os gráficos
-
-plt.figure(figsize=(16, 4))
-sns.countplot(data=data, x='native-country')
-
-plt.figure(figsize=(16,4))
-sns.countplot(data=data, x='native-country', hue='income')
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Há uma quantidade desproporcionalmente maior de pessoas nascidas nos Estados Unidos, portanto a maioria das pessoas de alta renda também provém desse país.
-
-# %% [markdown]
-# #### **Idade** (*age*)
-
-# %% [markdown]
-#  Separamos as diversas idades em faixas etárias, para melhor caracterizar a distribbuição de idades e rendas do dataset. E em seguida plotamos o gráfico Faixa etária versus renda.
-
-# %%
-data['age-range']= pd.cut(data['age'], 10)
-
-plt.figure(figsize=(16,4))
-sns.countplot(data=data, x='age-range', hue='income')
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Pessoas de maior renda tem idades na faixa dos 30 à 50 anos.
-# *   Pessoa jovens tem renda muito menor do que pessoas de meia-idade.
-
-# %% [markdown]
-# #### **Relacionamento familiar** (*relationship*)
-
-# %% [markdown]
-# Primeiro fazemos o gráfico das variáveis Relacionamento familiar versus a Renda.
-
-# %%
-plt.figure(figsize=(16,4))
-sns.countplot(data=data, x='relationship', hue='income')
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Maridos e esposas apresentam maior renda familiar, o que é condizente com o fato de que pessoas casadas ganham mais que os demais.
-
-# %% [markdown]
-# #### **Sexo** (*sex*)
-
-# %% [markdown]
-# Primeiro fazemos o gráfico das variáveis Sexo versus a Renda.
-
-# %%
-sns.countplot(data=data, x='sex', hue='income')
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Mais pessoas do sexo masculino tem alta renda do que do sexo feminino.
-
-# %% [markdown]
-# #### **Raça** (*race*)
-
-# %% [markdown]
-# Primeiro fazemos o gráfico das variáveis Raça versus a Renda.
-
-# %%
-plt.figure(figsize=(16,4))
-sns.countplot(data=data, x='race', hue='income')
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Como há muito mais pessoas brancas do que pertencentes à outras etnias, elas também apresentam maior renda. Entre as outras etnias, os negros são o grupo mais significativo em relação à renda.
-
-# %% [markdown]
-# #### **Horas (trabalhadas) por semana** (*hours-per-week*)
-
-# %% [markdown]
-#  Separamos as horas trabalhadas por semanas em intervalos para melhor caracterizar a distribbuição entre a quantidade de horas trabalhadas e a renda. E em seguida plotamos o gráfico das faixas de horas trabalhadas versus renda.
-
-# %%
-data['h/w-range']= pd.cut(data['hours-per-week'], 5)
-
-plt.figure(figsize=(16,4))
-sns.countplot(data=data, x='h/w-range', hue='income')
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Pessoas com maior renda trabalham entre 20 e 60 horas semanais.
-
-# %% [markdown]
-# # **6. Processamento dos dados**
-
-# %% [markdown]
-# Para o processamento dos dados realizou-se os seguintes procedimentos:
-# *   Removeu-se outliers na variável ganho de capital para generalizar melhor os dados.
-# *   Para lidar com os valores ausentes removeu-se registros com quaisquer atributos nulos. Visto que não fará uma diferença significativa no treinamento, pois os registros nulos representam apenas cerca de 5% de todos os dados de treinamento.
-# *   Removeu-se duplicatas para evitar overfitting.
-# *   Descartou-se a variável **fnlwgt** porque é um recurso inútil.
-# *   Entre as variáveis Educação e Número de Educação, usamos apenas Número de Educação, pois contém toda a informação presente em Educação.
-# *   Combinou-se ganhos e perdas de capital para torná-lo um único recurso.
-# *   Todos os outros recursos permanecem inalterados.
-# 
-
-# %%
-# Removendo ouliers da variável ganho de capital
-outliers= data[data['capital-gain'] > 40000].index
-data= data.drop(outliers)
-
-# Removendo linhas com valores faltantes ou duplicadas
-data= data.dropna(how='any', axis=0)
-data= data.drop_duplicates()
-
-# Removendo as colunas fnlwgt e education
-data= data.drop('fnlwgt', axis=1)
-data= data.drop(columns='education')
-
-# Combinando as colunas ganho e perda de capital em uma única coluna
-data['capital-gain'] = data.apply(lambda capital: (capital['capital-gain'] - capital['capital-loss']), axis=1)
-
-# Removendo demais colunas desnecessárias
-data= data.drop(columns='capital-loss')
-data= data.drop(columns='age-range')
-data= data.drop(columns='h/w-range')
-
-# verificando o novo dataset
-data.info()
-
-# %% [markdown]
-# Verifica-se que não há colunas com valores nulos.
-# Pode-se portanto verificar as estatísticas descritivas das colunas numéricas restantes.
-
-# %%
-data.describe()
-
-# %% [markdown]
-# Pode-se então verificar como ficaram as correlações após as alterações feitas nos atributos.
-
-# %%
-correlacao_nova =data[['age', 'education-num', 'capital-gain', 'hours-per-week']].corr()
-
-heatMap(correlacao_nova)
-
-# %% [markdown]
-# ##### **Observações:**
-
-# %% [markdown]
-# *   Houve uma melhora significativa nas correlações dos dados numéricos.
-# *   Pode-se, então, seguir para a construção do modelo.
-# 
-# 
-
-# %% [markdown]
-# # **7. Construção do modelo**
-
-# %% [markdown]
-# Importando os elementos necessários do Sci-Kit Learn.
-
-# %%
-from sklearn.model_selection import KFold, GridSearchCV, cross_val_score, cross_val_predict
-cv = KFold(6)
-from sklearn.metrics import (accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, classification_report, confusion_matrix)
-from sklearn.preprocessing import StandardScaler
-from sklearn.preprocessing import RobustScaler
-
-model = []
-accuracy = []
-f1 = []
-auc = []
-
-# %%
-data = pd.get_dummies(data, drop_first=True)
-data
-
-# %% [markdown]
-# Gerando os datasets de treino e normalizando os dados.
-
-# %%
-# Dividindo o dataset
-X = data[data.columns[:-1]]
-y = data[data.columns[-1]]
-
-
-# %%
-# Normalizando os dados
-
-scaler = StandardScaler().fit(X)
-x_scaled = scaler.transform(X)
-
-# %% [markdown]
-# Importando modelo de Classificador por Árvore de Decisões
-
-# %%
-from sklearn.tree import DecisionTreeClassifier, plot_tree
-
-tree_clf_income = DecisionTreeClassifier(max_depth=3,random_state=42,criterion="gini",splitter='best',max_features=7)
-tree_clf_income.fit(X,y)
-
-#aram_grid = {'max_depth': [5, 10, 50, 100, None],
-#              'criterion': ['gini','entropy']}
-#grid2 = GridSearchCV(dtc, param_grid, cv=cv).fit(x_scaled, y)
-#print("DTC: ", grid2.best_score_, grid2.best_params_)
-
-
-# %%
-fig,ax = plt.subplots(figsize=(30,30))
-plot_tree(tree_clf_income,ax=ax,feature_names=X.columns,
-        rounded=True,filled=True,precision=2,class_names=['Pobre','Rico'])
-plt.show()
-
-# %%
-from sklearn.metrics import classification_report
-print(classification_report(y,tree_clf_income.predict(X)))
-
-# %% [markdown]
-# # **8. Aplicação do modelo aos dataset de testes**
-
-# %% [markdown]
-# Carregando o dataset de testes.
-
-# %%
-test= pd.read_csv('data/adult.test', sep=', ', names=colunas, na_values='?', engine='python', skiprows=1)
-test.info()
-
-# %% [markdown]
-# Processando o dataset de testes
-
-# %%
-test= test.dropna(how='any', axis=0)
-test= test.drop_duplicates()
-test= test.drop('fnlwgt', axis=1)
-test= test.drop(columns='education')
-
-test['capital-gain']= test.apply(lambda x: (x['capital-gain'] - x['capital-loss']), axis=1)
-test= test.drop(columns='capital-loss')
-
-test.info()
-
-# %% [markdown]
-# Realizando engenharia de atributos no dataset de testes.
-
-# %%
-test['workclass'].replace(['State-gov', 'Federal-gov', 'Local-gov'], 'Government', inplace=True)
-test['workclass'].replace(['Self-emp-not-inc', 'Self-emp-inc'], 'Self', inplace=True)
-test['workclass'].replace(['Without-pay', 'Never-worked'], 'Others', inplace=True)
-
-test['marital-status'].replace(['Married-AF-spouse', 'Married-civ-spouse', 'Married-spouse-absent'], 'Married', inplace=True)
-test['marital-status'].replace('Divorced', 'Separated',inplace=True)
-
-test['occupation'].replace(['Tech-support', 'Craft-repair', 'Handlers-cleaners', 'Transport-moving', 'Machine-op-inspct'], 'Blue-collar', inplace=True)
-test['occupation'].replace(['Exec-managerial', 'Adm-clerical'], 'White-collar', inplace=True)
-test['occupation'].replace('Prof-specialty', 'Gold-collar', inplace=True)
-test['occupation'].replace(['Other-service', 'Sales', 'Priv-house-serv', 'Protective-serv'], 'Pink-collar', inplace=True)
-test['occupation'].replace('Farming-fishing', 'Green-collar', inplace=True)
-test['occupation'].replace('Armed-Forces', 'Brown-collar', inplace=True)
-
-test['native-country']= test['native-country'].map(lambda country: 'US' if country == 'United-States' else 'Other')
-
-# %%
-test = pd.get_dummies(test, drop_first=True)
-test
-
-# %% [markdown]
-# Preparando o dataset de testes para rodar o modelo.
-
-# %%
-Xtest = test[test.columns[:-1]]
-ytest = test[test.columns[-1]]
-
-scaler = StandardScaler().fit(Xtest)
-xtest_scaled = scaler.transform(Xtest)
-
-# %%
-xtest_scaled.shape
-
-# %% [markdown]
-# Rodando o modelo para gerar previsões
-
-# %%
-print('Conjunto de Teste:')
-print(classification_report(ytest,tree_clf_income.predict(Xtest)))
-
-
+# Árvore de decisão para a classificação de renda do dataset "Adult" (UCI Machine Learning Repository).
+#
+# O objetivo deste trabalho é criar um modelo de classificação que classifique os respondentes
+# da pesquisa de acordo com a renda (alta renda, >50K, ou baixa renda, <=50K) a partir das
+# variáveis de característica, utilizando o método de aprendizado de máquina denominado Árvore
+# de decisão. A análise exploratória completa, com as observações de cada seção, está no
+# notebook arvore_decisao_marcelo_danilo.ipynb.
+#
+# Este módulo expõe o fluxo do notebook como funções importáveis e como linha de comando:
+#
+#   python arvore_decisao_marcelo_danilo.py treina      # ajusta e grava o modelo (modelos/)
+#   python arvore_decisao_marcelo_danilo.py busca       # hiperparâmetros com KFold(6) e halving sucessivo
+#   python arvore_decisao_marcelo_danilo.py valida      # métricas da árvore com KFold(6), dobras em paralelo
+#   python arvore_decisao_marcelo_danilo.py importancia modelos/arvore_decisao.pkl   # importância por permutação
+#   python arvore_decisao_marcelo_danilo.py pontua modelos/arvore_decisao entrada.csv saida.csv
+#   python arvore_decisao_marcelo_danilo.py treina --motor incremental        # árvore de Hoeffding (incremental.py)
+#   python arvore_decisao_marcelo_danilo.py atualiza modelos/arvore_decisao.pkl novos.data   # absorve linhas novas
+#   python arvore_decisao_marcelo_danilo.py treina-distribuido fragmentos/*.data   # um trabalhador por arquivo (distribuido.py)
+#   python arvore_decisao_marcelo_danilo.py relatorio   # figuras e tabelas da análise exploratória
+#
+# treina e pontua não importam o matplotlib nem o seaborn; o sklearn só é importado no
+# treino. A análise exploratória fica em relatorio.py e só é carregada pelo comando relatorio.
+#
+# As etapas do treino (carga, limpeza, engenharia, codificação, ajuste e avaliação) podem ser
+# medidas com instrumentacao.py:
+#
+#   python arvore_decisao_marcelo_danilo.py treina --instrumenta etapas.jsonl --memoria --perfil perfis/
+#
+# Com --orcamento-mb, a carga e a limpeza passam a ser feitas em lotes quando o arquivo
+# inteiro não caberia no orçamento (memoria.py). O orçamento não cobre a codificação nem o
+# ajuste, que continuam em memória.
+
+import os
+import sys
+import time
+import argparse
+
+from carregamento import carrega_adult
+from preprocessamento import PreProcessamento, CodificadorOneHot
+from modelo import ModeloRenda
+from instrumentacao import SEM_INSTRUMENTACAO
+
+
+# Parâmetros da árvore de decisão escolhidos na seção 7.
+parametros_arvore = dict(max_depth=3, random_state=42, criterion="gini", splitter='best', max_features=7)
+
+# Parâmetros da floresta aleatória usada na comparação com a árvore.
+parametros_floresta = dict(n_estimators=300, random_state=42, n_jobs=-1)
+
+# O adult.test começa com a linha '|1x3 Cross validator'; no adult.data a primeira linha
+# também era descartada pelo notebook, o que é mantido para reproduzir o mesmo modelo.
+SKIPROWS = 1
+
+
+def carrega_treino(caminho='data/adult.data', instrumentacao=None, orcamento_mb=None):
+    """Carrega o dataset de treino e ajusta o pré-processamento (seções 3, 5 e 6).
+
+    Retorna o PreProcessamento ajustado e o dataset limpo e transformado. Com orcamento_mb,
+    se o pico estimado da leitura do arquivo inteiro não couber no orçamento (memoria.py),
+    a carga, a limpeza e a engenharia são feitas em lotes, com o mesmo resultado. O
+    orçamento vale só para estas etapas: o dataset transformado devolvido fica inteiro na
+    memória.
+    """
+    from memoria import cabe_no_orcamento, tamanho_lote, tamanho_mb
+
+    instrumentacao = instrumentacao or SEM_INSTRUMENTACAO
+    if not cabe_no_orcamento(caminho, orcamento_mb):
+        from limpeza import prepara_em_lotes
+
+        linhas = tamanho_lote(caminho, orcamento_mb)
+        with instrumentacao.etapa('carga_limpeza_engenharia_em_lotes', tamanho_lote=linhas) as registro:
+            pre, transformado = prepara_em_lotes(caminho, skiprows=SKIPROWS, tamanho_lote=linhas)
+            registro['linhas_saida'] = len(transformado)
+            registro['dados_mb'] = tamanho_mb(transformado)
+        return pre, transformado
+    with instrumentacao.etapa('carga') as registro:
+        data = carrega_adult(caminho, skiprows=SKIPROWS, cache=True)
+        registro['linhas_saida'] = len(data)
+        registro['dados_mb'] = tamanho_mb(data)
+    with instrumentacao.etapa('limpeza', len(data)) as registro:
+        pre = PreProcessamento().fit(data)
+        limpo = pre.limpa(data)
+        registro['linhas_saida'] = len(limpo)
+        registro['dados_mb'] = tamanho_mb(limpo)
+    with instrumentacao.etapa('engenharia', len(limpo)) as registro:
+        transformado = pre.transform(limpo)
+        registro['linhas_saida'] = len(transformado)
+        registro['dados_mb'] = tamanho_mb(transformado)
+    return pre, transformado
+
+
+def cria_estimador(motor='sklearn', **parametros):
+    """Estimador (ainda não ajustado) do motor, com parametros_arvore ou parametros_floresta.
+
+    motor: 'sklearn' (DecisionTreeClassifier), 'histograma' (histograma.ArvoreHistograma,
+    que procura os cortes em histogramas dos atributos discretizados), 'incremental'
+    (incremental.ArvoreIncremental, atualizável com linhas novas pelo comando atualiza),
+    'distribuido' (distribuido.ArvoreDistribuida, a mesma árvore do 'histograma' treinada por
+    processos com fragmentos das linhas) ou 'floresta' (floresta.FlorestaCompartilhada). Os
+    parâmetros informados substituem os padrões.
+    """
+    if motor == 'floresta':
+        from floresta import FlorestaCompartilhada
+        return FlorestaCompartilhada(**{**parametros_floresta, **parametros})
+    if motor in ('histograma', 'distribuido'):
+        from histograma import ArvoreHistograma
+        from distribuido import ArvoreDistribuida
+        parametros = {**parametros_arvore, **parametros}
+        # Os cortes são sempre os melhores de cada nó (equivalente a splitter='best').
+        parametros.pop('splitter', None)
+        return (ArvoreHistograma if motor == 'histograma' else ArvoreDistribuida)(**parametros)
+    if motor == 'incremental':
+        from incremental import ArvoreIncremental
+        parametros = {**parametros_arvore, **parametros}
+        # Os cortes são escolhidos entre todos os atributos, sem sorteio.
+        for p in ('splitter', 'max_features', 'random_state'):
+            parametros.pop(p, None)
+        return ArvoreIncremental(**parametros)
+    if motor == 'sklearn':
+        from sklearn.tree import DecisionTreeClassifier
+        return DecisionTreeClassifier(**{**parametros_arvore, **parametros})
+    raise ValueError(f"motor deve ser 'sklearn', 'histograma', 'incremental', 'distribuido' ou 'floresta', não {motor!r}")
+
+
+def treina(caminho='data/adult.data', destino='modelos/arvore_decisao', motor='sklearn', instrumentacao=None,
+           orcamento_mb=None, **parametros):
+    """Ajusta a árvore de decisão (seção 7) e grava o modelo como .pkl e como artefato.
+
+    motor e parâmetros: como em cria_estimador; orcamento_mb: como em carrega_treino. A
+    codificação e o ajuste não são limitados pelo orçamento: a matriz codificada (cerca de
+    0,8 vez o tamanho do arquivo no adult.data) e as cópias feitas pelo estimador no ajuste
+    ficam inteiras na memória, além do dataset transformado.
+    """
+    from artefato import salva_artefato
+    from memoria import tamanho_mb
+
+    instrumentacao = instrumentacao or SEM_INSTRUMENTACAO
+    pre, data = carrega_treino(caminho, instrumentacao, orcamento_mb)
+    with instrumentacao.etapa('codificacao', len(data)) as registro:
+        codificador = CodificadorOneHot(alvo='income').fit(data)
+        X = codificador.transform(data)
+        y = codificador.transforma_alvo(data)
+        registro['linhas_saida'] = X.shape[0]
+        registro['dados_mb'] = tamanho_mb(X)
+    tree_clf_income = cria_estimador(motor, **parametros)
+    with instrumentacao.etapa('ajuste', X.shape[0], motor=motor):
+        tree_clf_income.fit(X, y)
+    modelo = ModeloRenda(pre, codificador, tree_clf_income)
+    if destino:
+        modelo.salva(f"{destino}.pkl")
+        salva_artefato(modelo, destino)
+    return modelo
+
+
+def atualiza(modelo, caminho, destino=None, skiprows=0, tamanho_lote=100000):
+    """Absorve linhas novas rotuladas (formato do adult.data) em um modelo treinado com o motor incremental.
+
+    Só o arquivo novo é lido, em lotes, limpo com o pré-processamento congelado do modelo
+    (duplicatas removidas dentro do arquivo) e passado ao partial_fit da árvore: o tempo
+    depende do tamanho do arquivo, não do histórico. Com destino, grava o .pkl e o artefato
+    como o treina. Retorna os contadores da limpeza.
+    """
+    from carregamento import le_em_lotes
+    from limpeza import LimpezaEmLotes
+
+    if not hasattr(modelo.estimador, 'partial_fit'):
+        raise ValueError("o modelo não é incremental: treine com --motor incremental")
+    limpeza = LimpezaEmLotes(modelo.pre)
+    for lote in le_em_lotes(caminho, tamanho_lote, skiprows=skiprows):
+        limpo = modelo.pre.transform(limpeza.limpa(lote))
+        if len(limpo):
+            X = modelo.codificador.transform(limpo, formato='denso')
+            modelo.estimador.partial_fit(X, modelo.codificador.transforma_alvo(limpo))
+    if destino:
+        from artefato import salva_artefato
+        modelo.salva(f"{destino}.pkl")
+        salva_artefato(modelo, destino)
+    return limpeza.contadores()
+
+
+def treina_distribuido(arquivos, destino='modelos/arvore_decisao', skiprows=SKIPROWS, endereco=None, remotos=False,
+                       **parametros):
+    """Ajusta a árvore com um trabalhador por arquivo (distribuido.py) e grava o modelo como o treina.
+
+    O resultado é o do treina com motor='histograma' sobre os arquivos concatenados (por
+    exemplo, os fragmentos do adult.data gravados por distribuido.fragmenta_arquivo). Com
+    remotos=True, o coordenador escuta em endereco e espera um trabalhador remoto por arquivo.
+    """
+    from artefato import salva_artefato
+    from distribuido import treina_arquivos, ENDERECO
+
+    parametros = {**parametros_arvore, **parametros}
+    parametros.pop('splitter', None)
+    modelo = treina_arquivos(arquivos, skiprows, endereco=endereco or ENDERECO, locais=not remotos, **parametros)
+    if destino:
+        modelo.salva(f"{destino}.pkl")
+        salva_artefato(modelo, destino)
+    return modelo
+
+
+def busca_parametros(caminho='data/adult.data', sucessiva=True, n_jobs=None):
+    """Busca de hiperparâmetros com KFold(6) (busca.py), no lugar do GridSearchCV da seção 7."""
+    from busca import BuscaSucessiva
+
+    _, data = carrega_treino(caminho)
+    return BuscaSucessiva(sucessiva=sucessiva, n_jobs=n_jobs).fit(data)
+
+
+def valida(caminho='data/adult.data', motor='sklearn', n_jobs=None, **parametros):
+    """Validação cruzada KFold(6) do estimador do motor (validacao.py), com as dobras em paralelo."""
+    from validacao import ValidacaoCruzada
+
+    _, data = carrega_treino(caminho)
+    return ValidacaoCruzada(cria_estimador(motor, **parametros), n_jobs=n_jobs).fit(data)
+
+
+def avalia(modelo, caminho='data/adult.test', instrumentacao=None):
+    """Relatório de classificação do modelo no dataset de testes (seção 8)."""
+    from sklearn.metrics import classification_report
+
+    instrumentacao = instrumentacao or SEM_INSTRUMENTACAO
+    with instrumentacao.etapa('avaliacao') as registro:
+        test = carrega_adult(caminho, skiprows=SKIPROWS, cache=True)
+        test = modelo.pre.limpa(test, remove_outliers=False)
+        ytest = modelo.codificador.transforma_alvo(modelo.pre.transform(test))
+        relatorio_teste = classification_report(ytest, modelo.predict(test))
+        registro['linhas_saida'] = len(test)
+    return relatorio_teste
+
+
+def importancia(modelo, caminho='data/adult.test', **opcoes):
+    """Importância por permutação de cada atributo no dataset de testes (importancia.py)."""
+    from importancia import ImportanciaPermutacao
+
+    test = carrega_adult(caminho, skiprows=SKIPROWS, cache=True)
+    return ImportanciaPermutacao(**opcoes).fit(modelo, test)
+
+
+def verifica_compilada(modelo, caminho='data/adult.test'):
+    """Compila a árvore (compilacao.py) e confere as previsões com as do sklearn no dataset de testes."""
+    from compilacao import compila, verifica
+
+    return verifica(compila(modelo), modelo, carrega_adult(caminho, skiprows=SKIPROWS, cache=True))
+
+
+def pontua(modelo, entrada, saida, tamanho_lote=100000, skiprows=0):
+    """Pontua um arquivo no formato do dataset Adult em lotes (pontuacao.py)."""
+    from pontuacao import pontua_arquivo
+
+    return pontua_arquivo(modelo, entrada, saida, tamanho_lote, skiprows)
+
+
+def relatorio(caminho='data/adult.data', destino='relatorio', caminho_teste='data/adult.test', modelo=None, n_jobs=None):
+    """Gera as figuras e tabelas da análise exploratória (relatorio.py) em 'destino'."""
+    from relatorio import gera_relatorio
+    from estatisticas import estatisticas_arquivo, estatisticas_cache, versao_pre
+
+    data = carrega_adult(caminho, skiprows=SKIPROWS, cache=True)
+    pre = PreProcessamento().fit(data)
+    teste = carrega_adult(caminho_teste, skiprows=SKIPROWS, cache=True) if modelo is not None else None
+    # Estatísticas das tabelas, do cache (e atualizadas apenas com as linhas novas se o arquivo cresceu).
+    estatisticas = estatisticas_arquivo(caminho, skiprows=SKIPROWS)
+    processado = estatisticas_cache(pre.transform(pre.limpa(data)), versao_pre(pre),
+                                    os.path.join(os.path.dirname(os.path.abspath(caminho)), '.cache', 'estatisticas'))
+    return gera_relatorio(data, pre, destino, modelo=modelo, teste=teste, estatisticas=estatisticas,
+                          estatisticas_processado=processado, n_jobs=n_jobs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Árvore de decisão para a renda do dataset Adult.')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p = comandos.add_parser('treina', help='ajusta a árvore de decisão e grava o modelo')
+    p.add_argument('--dados', default='data/adult.data')
+    p.add_argument('--teste', default='data/adult.test', help="dataset de testes para a avaliação ('' para pular)")
+    p.add_argument('--destino', default='modelos/arvore_decisao', help='caminho do modelo (sem extensão)')
+    p.add_argument('--motor', choices=['sklearn', 'histograma', 'incremental', 'distribuido', 'floresta'], default='sklearn',
+                   help='histograma: cortes procurados em histogramas dos atributos discretizados; '
+                        'incremental: árvore de Hoeffding, atualizável com o comando atualiza; '
+                        'distribuido: a árvore do histograma treinada por processos com fragmentos das linhas; '
+                        'floresta: floresta aleatória treinada em processos com a matriz compartilhada')
+    p.add_argument('--instrumenta', metavar='ARQUIVO', help='mede cada etapa e acrescenta os registros (JSON lines) ao arquivo')
+    p.add_argument('--memoria', action='store_true', help='mede também a memória alocada com o tracemalloc')
+    p.add_argument('--perfil', metavar='DIRETORIO', help='roda cada etapa sob o cProfile e grava um .prof por etapa')
+    p.add_argument('--orcamento-mb', type=float, help='memória máxima para a carga, a limpeza e a engenharia (acima dela, processadas em lotes); '
+                        'a codificação e o ajuste não são limitados')
+
+    p = comandos.add_parser('atualiza', help='absorve linhas novas rotuladas em um modelo do motor incremental')
+    p.add_argument('modelo', help='modelo .pkl treinado com --motor incremental')
+    p.add_argument('dados', help='arquivo com as linhas novas, no formato do adult.data')
+    p.add_argument('--destino', help='caminho do modelo atualizado, sem extensão (padrão: o do modelo)')
+    p.add_argument('--skiprows', type=int, default=0)
+    p.add_argument('--tamanho-lote', type=int, default=100000)
+    p.add_argument('--teste', default='data/adult.test', help="dataset de testes para a avaliação ('' para pular)")
+
+    p = comandos.add_parser('treina-distribuido', help='ajusta a árvore do histograma com um trabalhador por arquivo')
+    p.add_argument('arquivos', nargs='+', help='fragmentos do dataset de treino, no formato do adult.data')
+    p.add_argument('--skiprows', type=int, default=SKIPROWS, help='linhas de cabeçalho de cada fragmento')
+    p.add_argument('--destino', default='modelos/arvore_decisao', help='caminho do modelo (sem extensão)')
+    p.add_argument('--teste', default='data/adult.test', help="dataset de testes para a avaliação ('' para pular)")
+    p.add_argument('--endereco', metavar='HOST:PORTA', help='endereço em que o coordenador escuta')
+    p.add_argument('--remotos', action='store_true',
+                   help='espera trabalhadores iniciados à parte (python distribuido.py trabalhador HOST PORTA)')
+
+    p = comandos.add_parser('busca', help='busca de hiperparâmetros da árvore com validação cruzada')
+    p.add_argument('--dados', default='data/adult.data')
+    p.add_argument('--exaustiva', action='store_true', help='avalia todas as combinações com o treino completo')
+    p.add_argument('--n-jobs', type=int, default=None)
+
+    p = comandos.add_parser('valida', help='acurácia, precisão, revocação, F1 e ROC-AUC com KFold(6)')
+    p.add_argument('--dados', default='data/adult.data')
+    p.add_argument('--motor', choices=['sklearn', 'histograma', 'incremental', 'distribuido', 'floresta'], default='sklearn')
+    p.add_argument('--n-jobs', type=int, default=None, help='processos (um por dobra)')
+
+    p = comandos.add_parser('importancia', help='importância dos atributos por permutação, com intervalos de confiança')
+    p.add_argument('modelo', help='modelo .pkl')
+    p.add_argument('--teste', default='data/adult.test')
+    p.add_argument('--repeticoes', type=int, default=5)
+    p.add_argument('--metrica', choices=['acuracia', 'precisao', 'revocacao', 'f1', 'auc'], default='acuracia')
+    p.add_argument('--por-coluna', action='store_true', help='permuta juntos os dummies de cada coluna original')
+    p.add_argument('--n-jobs', type=int, default=None)
+
+    p = comandos.add_parser('pontua', help='pontua um arquivo no formato do dataset Adult')
+    p.add_argument('modelo', help='modelo .pkl ou diretório de artefato')
+    p.add_argument('entrada')
+    p.add_argument('saida', help='arquivo de previsões (.csv ou .parquet)')
+    p.add_argument('--tamanho-lote', type=int, default=100000)
+    p.add_argument('--skiprows', type=int, default=0)
+
+    p = comandos.add_parser('relatorio', help='gera as figuras e tabelas da análise exploratória')
+    p.add_argument('--dados', default='data/adult.data')
+    p.add_argument('--destino', default='relatorio')
+    p.add_argument('--modelo', help='modelo .pkl, para incluir a árvore e a matriz de confusão')
+    p.add_argument('--n-jobs', type=int, default=None, help='processos que desenham as figuras')
+
+    args = parser.parse_args(argv)
+    if args.comando == 'treina':
+        instrumentacao = None
+        if args.instrumenta or args.memoria or args.perfil:
+            import logging
+            from instrumentacao import Instrumentacao, ReceptorArquivo, receptor_log
+            logging.basicConfig(level=logging.INFO, format='%(message)s')
+            receptores = [receptor_log] + ([ReceptorArquivo(args.instrumenta)] if args.instrumenta else [])
+            instrumentacao = Instrumentacao(receptores, memoria=args.memoria, diretorio_perfil=args.perfil)
+        modelo = treina(args.dados, args.destino, args.motor, instrumentacao, args.orcamento_mb)
+        if args.teste:
+            print('Conjunto de Teste:')
+            print(avalia(modelo, args.teste, instrumentacao))
+        if instrumentacao is not None:
+            print(instrumentacao.relatorio_memoria())
+        # Apenas uma árvore de decisão pode ser compilada (compilacao.py).
+        if args.teste and hasattr(modelo.estimador, 'tree_'):
+            divergencias, microssegundos = verifica_compilada(modelo, args.teste)
+            print(f'Árvore compilada: {divergencias} divergências em relação ao modelo, {microssegundos:.2f} µs por previsão')
+    elif args.comando == 'atualiza':
+        modelo = ModeloRenda.carrega(args.modelo)
+        destino = args.destino or os.path.splitext(args.modelo)[0]
+        antes = modelo.estimador.linhas_
+        inicio = time.perf_counter()
+        contadores = atualiza(modelo, args.dados, destino, args.skiprows, args.tamanho_lote)
+        print(f"{modelo.estimador.linhas_ - antes} linhas absorvidas de {contadores['linhas']} lidas "
+              f"em {time.perf_counter() - inicio:.2f}s; {modelo.estimador.n_cortes_} cortes, "
+              f"{modelo.estimador.tree_.node_count} nós, {modelo.estimador.linhas_} linhas no total")
+        if args.teste:
+            print('Conjunto de Teste:')
+            print(avalia(modelo, args.teste))
+    elif args.comando == 'treina-distribuido':
+        endereco = None
+        if args.endereco:
+            host, porta = args.endereco.rsplit(':', 1)
+            endereco = (host, int(porta))
+        inicio = time.perf_counter()
+        modelo = treina_distribuido(args.arquivos, args.destino, args.skiprows, endereco, args.remotos)
+        print(f"{len(args.arquivos)} trabalhadores, {modelo.estimador.tree_.node_count} nós "
+              f"em {time.perf_counter() - inicio:.2f}s")
+        if args.teste:
+            print('Conjunto de Teste:')
+            print(avalia(modelo, args.teste))
+    elif args.comando == 'busca':
+        resultado = busca_parametros(args.dados, not args.exaustiva, args.n_jobs)
+        print(f"Melhores parâmetros: {resultado.melhores_parametros_} (acurácia média {resultado.melhor_acuracia_:.4f})")
+    elif args.comando == 'valida':
+        validacao = valida(args.dados, args.motor, args.n_jobs)
+        for k, metricas in enumerate(validacao.por_dobra()):
+            print(f"Dobra {k}: " + ', '.join(f"{m} {v:.4f}" for m, v in metricas.items()))
+        for m, valores in validacao.resumo().items():
+            print(f"{m}: {valores['media']:.4f} ± {valores['desvio']:.4f}")
+        print(validacao.total_.relatorio())
+    elif args.comando == 'importancia':
+        resultado = importancia(ModeloRenda.carrega(args.modelo), args.teste, n_repeticoes=args.repeticoes,
+                                metrica=args.metrica, por_coluna=args.por_coluna, n_jobs=args.n_jobs)
+        print(f"{args.metrica} sem permutação: {resultado.base_:.4f}")
+        print(resultado.resumo().to_string(index=False))
+    elif args.comando == 'pontua':
+        from pontuacao import main as main_pontuacao
+        main_pontuacao([args.modelo, args.entrada, args.saida, '--tamanho-lote', str(args.tamanho_lote),
+                        '--skiprows', str(args.skiprows)])
+    elif args.comando == 'relatorio':
+        modelo = ModeloRenda.carrega(args.modelo) if args.modelo else None
+        relatorio(args.dados, args.destino, modelo=modelo, n_jobs=args.n_jobs)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,166 @@
+# Benchmark do pipeline de treino em datasets sintéticos de escala crescente.
+#
+# Uso:
+#   python benchmark.py --escalas 1 10 100 1000 --saida benchmark.json
+#   python benchmark.py --escalas 1 10 --saida novo.json --compara benchmark.json
+#
+# Para cada escala, um dataset com escala × 32.561 linhas é gerado por sintetico.py (e
+# guardado em .cache/benchmark para as execuções seguintes) e cada etapa do pipeline do
+# script principal é cronometrada separadamente:
+#   carga          carregamento.carrega_adult (sem o cache colunar)
+#   agrupamento    PreProcessamento.fit + transform (os replace da seção 5)
+#   limpeza        PreProcessamento.limpa (dropna e drop_duplicates da seção 6)
+#   dummies        CodificadorOneHot.fit + transform (o get_dummies da seção 6)
+#   padronizacao   StandardScaler(with_mean=False) na matriz codificada, como no notebook
+#   treino         DecisionTreeClassifier(**parametros_arvore).fit
+#   previsao       predict da árvore na matriz codificada
+# Cada etapa é repetida --repeticoes vezes e fica o menor tempo. O resultado vai para um
+# JSON com a versão do código (commit do git) e das bibliotecas; com --compara, as etapas
+# que ficaram mais lentas que a tolerância em relação a um JSON anterior são apontadas e o
+# script termina com código 1.
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from carregamento import carrega_adult
+from preprocessamento import PreProcessamento, CodificadorOneHot
+from sintetico import GeradorCenso, VERSAO
+
+
+ESCALAS = [1, 10, 100, 1000]
+DIRETORIO = os.path.join('.cache', 'benchmark')
+# Aumento relativo de tempo a partir do qual uma etapa é considerada uma regressão.
+TOLERANCIA = 0.2
+# Etapas mais rápidas que isto (em segundos) não são comparadas: o ruído domina.
+TEMPO_MINIMO = 0.05
+
+etapas = ['carga', 'agrupamento', 'limpeza', 'dummies', 'padronizacao', 'treino', 'previsao']
+
+
+def cronometra(funcao, repeticoes=1):
+    """Executa funcao() 'repeticoes' vezes; retorna o último resultado e o menor tempo."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return resultado, melhor
+
+
+def arquivo_escala(escala, origem='data/adult.data', diretorio=DIRETORIO, semente=0, gerador=None):
+    """Caminho do dataset sintético da escala, gerando-o se ainda não existir."""
+    caminho = os.path.join(diretorio, f"adult_x{escala:g}_s{semente}_v{VERSAO}.data")
+    if not os.path.exists(caminho):
+        if gerador is None:
+            gerador = GeradorCenso().fit(carrega_adult(origem, skiprows=1))
+        gerador.grava(caminho, int(round(gerador.n_linhas_ * escala)), semente)
+    return caminho
+
+
+def mede_pipeline(caminho, repeticoes=1):
+    """Tempo (em segundos) de cada etapa do pipeline para o arquivo."""
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.tree import DecisionTreeClassifier
+    from arvore_decisao_marcelo_danilo import parametros_arvore
+
+    tempos = {}
+    data, tempos['carga'] = cronometra(lambda: carrega_adult(caminho, skiprows=1, cache=None), repeticoes)
+
+    def agrupa():
+        pre = PreProcessamento().fit(data)
+        return pre, pre.transform(data)
+    (pre, agrupado), tempos['agrupamento'] = cronometra(agrupa, repeticoes)
+    limpo, tempos['limpeza'] = cronometra(lambda: pre.limpa(data), repeticoes)
+    agrupado = agrupado.loc[limpo.index]
+
+    def codifica():
+        codificador = CodificadorOneHot(alvo='income').fit(agrupado)
+        return codificador.transform(agrupado), codificador.transforma_alvo(agrupado)
+    (X, y), tempos['dummies'] = cronometra(codifica, repeticoes)
+    _, tempos['padronizacao'] = cronometra(lambda: StandardScaler(with_mean=False).fit_transform(X), repeticoes)
+    arvore, tempos['treino'] = cronometra(lambda: DecisionTreeClassifier(**parametros_arvore).fit(X, y), repeticoes)
+    _, tempos['previsao'] = cronometra(lambda: arvore.predict(X), repeticoes)
+    return {'linhas': len(data), 'linhas_limpas': len(limpo), 'colunas': X.shape[1], 'etapas': tempos}
+
+
+def versoes():
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'pandas': pd.__version__, 'sklearn': sklearn.__version__,
+            'maquina': socket.gethostname(), 'cpus': os.cpu_count(), 'plataforma': platform.platform()}
+
+
+def executa(escalas=ESCALAS, origem='data/adult.data', diretorio=DIRETORIO, repeticoes=1, semente=0):
+    """Roda o benchmark em cada escala; retorna o dict gravado no JSON."""
+    gerador = GeradorCenso().fit(carrega_adult(origem, skiprows=1))
+    resultados = []
+    for escala in escalas:
+        caminho = arquivo_escala(escala, origem, diretorio, semente, gerador)
+        resultado = {'escala': escala, **mede_pipeline(caminho, repeticoes)}
+        resultados.append(resultado)
+        tempos = ', '.join(f"{e} {resultado['etapas'][e]:.3f}s" for e in etapas)
+        print(f"x{escala:g} ({resultado['linhas']} linhas): {tempos}", file=sys.stderr)
+    return {'versao': versoes(), 'data': time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeticoes': repeticoes,
+            'semente': semente, 'resultados': resultados}
+
+
+def compara(atual, anterior, tolerancia=TOLERANCIA):
+    """Lista de regressões (escala, etapa, tempo anterior, tempo atual) entre dois resultados."""
+    base = {r['escala']: r['etapas'] for r in anterior['resultados']}
+    regressoes = []
+    for r in atual['resultados']:
+        if r['escala'] not in base:
+            continue
+        for etapa, tempo in r['etapas'].items():
+            antes = base[r['escala']].get(etapa)
+            if antes is None or max(antes, tempo) < TEMPO_MINIMO:
+                continue
+            if tempo > antes * (1 + tolerancia):
+                regressoes.append((r['escala'], etapa, antes, tempo))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark do pipeline em datasets sintéticos de escala crescente.')
+    parser.add_argument('--escalas', type=float, nargs='+', default=ESCALAS)
+    parser.add_argument('--origem', default='data/adult.data')
+    parser.add_argument('--diretorio', default=DIRETORIO, help='onde guardar os datasets sintéticos')
+    parser.add_argument('--repeticoes', type=int, default=1)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', default='benchmark.json')
+    parser.add_argument('--compara', help='JSON de uma execução anterior')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help=f"aumento relativo tolerado por etapa (padrão: {TOLERANCIA})")
+    args = parser.parse_args(argv)
+
+    escalas = [int(e) if float(e).is_integer() else e for e in args.escalas]
+    resultado = executa(escalas, args.origem, args.diretorio, args.repeticoes, args.semente)
+    with open(args.saida, 'w') as f:
+        json.dump(resultado, f, indent=2)
+    if args.compara:
+        with open(args.compara) as f:
+            anterior = json.load(f)
+        regressoes = compara(resultado, anterior, args.tolerancia)
+        for escala, etapa, antes, depois in regressoes:
+            print(f"regressão em x{escala:g}/{etapa}: {antes:.3f}s -> {depois:.3f}s ({depois / antes - 1:+.0%})", file=sys.stderr)
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+# Busca de hiperparâmetros da árvore de decisão com validação cruzada (KFold(6)).
+#
+# O GridSearchCV(dtc, param_grid, cv=cv) da seção 7 ficou comentado por ser lento: cada
+# combinação de parâmetros refaz as dobras e ajusta a árvore com todas as linhas. Aqui:
+#   - as 6 dobras são codificadas uma única vez e gravadas como .npy (float32, o tipo usado
+#     internamente pelo sklearn), abertos com np.load(mmap_mode='r') por todos os processos
+#     do pool, que compartilham as mesmas páginas de memória;
+#   - as combinações (e as dobras de cada combinação) são avaliadas em paralelo;
+#   - com halving sucessivo, todas as combinações começam com uma amostra pequena do treino
+#     de cada dobra e só a melhor fração (1/eta) passa para a rodada seguinte, com eta vezes
+#     mais linhas; a última rodada (a única, sem halving) usa o treino completo de cada
+#     dobra, na ordem original das linhas, como o GridSearchCV.
+# A acurácia média nas dobras de validação e o desempate pela ordem da grade são os mesmos
+# do GridSearchCV.
+
+import os
+import json
+import shutil
+import tempfile
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from preprocessamento import CodificadorOneHot
+
+
+# Grade do GridSearchCV comentado na seção 7, ampliada com max_features, min_samples_leaf e splitter.
+grade_padrao = {
+    'max_depth': [5, 10, 50, 100, None],
+    'criterion': ['gini', 'entropy'],
+    'max_features': [None, 'sqrt', 7],
+    'min_samples_leaf': [1, 5, 20],
+    'splitter': ['best', 'random'],
+}
+
+N_DOBRAS = 6
+ETA = 3
+# Menor número de linhas de treino por dobra na primeira rodada do halving.
+MIN_LINHAS = 1000
+
+
+def combinacoes(grade):
+    """Lista de dicts de parâmetros, na mesma ordem do ParameterGrid do sklearn."""
+    chaves = sorted(grade)
+    return [dict(zip(chaves, valores)) for valores in itertools.product(*(grade[c] for c in chaves))]
+
+
+def prepara_dobras(data, diretorio, n_dobras=N_DOBRAS, alvo='income', random_state=42):
+    """Codifica as dobras do KFold(n_dobras) (sem embaralhar) e grava cada uma em 'diretorio'.
+
+    O codificador de cada dobra é ajustado apenas com as linhas de treino dela. As linhas
+    de treino são gravadas na ordem original, junto com uma permutação fixa delas
+    (amostra_k.npy): a amostra de n linhas do halving são as n primeiras posições da
+    permutação.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    n = len(data)
+    # Mesmos limites do KFold(n_dobras): as primeiras n % n_dobras dobras têm uma linha a mais.
+    tamanhos = np.full(n_dobras, n // n_dobras)
+    tamanhos[:n % n_dobras] += 1
+    limites = np.concatenate([[0], np.cumsum(tamanhos)])
+    rng = np.random.default_rng(random_state)
+    linhas_treino = []
+    for k in range(n_dobras):
+        validacao = np.arange(limites[k], limites[k + 1])
+        treino = np.concatenate([np.arange(limites[k]), np.arange(limites[k + 1], n)])
+        parte_treino, parte_validacao = data.iloc[treino], data.iloc[validacao]
+        codificador = CodificadorOneHot(alvo=alvo).fit(parte_treino)
+        for nome, parte in (('treino', parte_treino), ('validacao', parte_validacao)):
+            np.save(os.path.join(diretorio, f"X_{nome}_{k}.npy"), codificador.transform(parte, formato='denso', dtype=np.float32))
+            np.save(os.path.join(diretorio, f"y_{nome}_{k}.npy"), codificador.transforma_alvo(parte))
+        np.save(os.path.join(diretorio, f"amostra_{k}.npy"), rng.permutation(len(treino)).astype(np.int32))
+        linhas_treino.append(len(treino))
+    with open(os.path.join(diretorio, 'meta.json'), 'w') as f:
+        json.dump({'n_dobras': n_dobras, 'linhas_treino': linhas_treino}, f)
+    return diretorio
+
+
+# Dobras abertas em cada processo do pool (por _abre_dobras).
+_dobras = None
+
+
+def _abre_dobras(diretorio):
+    global _dobras
+    with open(os.path.join(diretorio, 'meta.json')) as f:
+        meta = json.load(f)
+    _dobras = [{nome: np.load(os.path.join(diretorio, f"{nome}_{k}.npy"), mmap_mode='r')
+                for nome in ('X_treino', 'y_treino', 'X_validacao', 'y_validacao', 'amostra')}
+               for k in range(meta['n_dobras'])]
+    return meta
+
+
+def _avalia(tarefa):
+    # Acurácia de uma combinação em uma dobra, treinando com uma amostra de n_linhas do
+    # treino (None: o treino completo).
+    from sklearn.tree import DecisionTreeClassifier
+
+    parametros, k, n_linhas, random_state = tarefa
+    dobra = _dobras[k]
+    arvore = DecisionTreeClassifier(random_state=random_state, **parametros)
+    if n_linhas is None:
+        arvore.fit(dobra['X_treino'], dobra['y_treino'])
+    else:
+        linhas = np.sort(dobra['amostra'][:n_linhas])
+        arvore.fit(dobra['X_treino'][linhas], dobra['y_treino'][linhas])
+    return float(np.mean(arvore.predict(dobra['X_validacao']) == dobra['y_validacao']))
+
+
+class BuscaSucessiva:
+    """Busca em grade com validação cruzada e, opcionalmente, halving sucessivo.
+
+    busca = BuscaSucessiva().fit(data)   # data: saída de PreProcessamento.transform
+    busca.melhores_parametros_, busca.melhor_acuracia_
+
+    Com sucessiva=False todas as combinações são avaliadas com o treino completo, como o
+    GridSearchCV. resultados_ tem uma entrada por combinação avaliada em cada rodada
+    ('linhas' None na última: o treino completo de cada dobra).
+    """
+
+    def __init__(self, grade=grade_padrao, n_dobras=N_DOBRAS, sucessiva=True, eta=ETA, min_linhas=MIN_LINHAS,
+                 n_jobs=None, random_state=42, diretorio=None):
+        self.grade = grade
+        self.n_dobras = n_dobras
+        self.sucessiva = sucessiva
+        self.eta = eta
+        self.min_linhas = min_linhas
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.diretorio = diretorio
+
+    def fit(self, data, alvo='income'):
+        diretorio = self.diretorio or tempfile.mkdtemp(prefix='busca-')
+        try:
+            prepara_dobras(data, diretorio, self.n_dobras, alvo, self.random_state)
+            return self._busca(diretorio)
+        finally:
+            if self.diretorio is None:
+                shutil.rmtree(diretorio, ignore_errors=True)
+
+    def rodadas(self, n_combinacoes, n_linhas):
+        """Linhas de treino por dobra em cada rodada do halving; a última é None (o treino completo de cada dobra).
+
+        n_linhas: o menor treino entre as dobras, de onde saem as amostras das primeiras rodadas.
+        """
+        if not self.sucessiva:
+            return [None]
+        n_rodadas = 1
+        while (self.eta ** n_rodadas < n_combinacoes
+               and n_linhas // self.eta ** n_rodadas >= self.min_linhas):
+            n_rodadas += 1
+        return [n_linhas // self.eta ** r for r in range(n_rodadas - 1, 0, -1)] + [None]
+
+    def _busca(self, diretorio):
+        meta = _abre_dobras(diretorio)
+        candidatos = list(enumerate(combinacoes(self.grade)))
+        rodadas = self.rodadas(len(candidatos), min(meta['linhas_treino']))
+        self.resultados_ = []
+        n_jobs = self.n_jobs or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(n_jobs, initializer=_abre_dobras, initargs=(diretorio,)) if n_jobs > 1 else None
+        try:
+            for rodada, n_linhas in enumerate(rodadas):
+                tarefas = [(parametros, k, n_linhas, self.random_state)
+                           for _, parametros in candidatos for k in range(self.n_dobras)]
+                mapa = pool.map(_avalia, tarefas, chunksize=max(1, len(tarefas) // (4 * n_jobs))) if pool else map(_avalia, tarefas)
+                acuracias = np.array(list(mapa)).reshape(len(candidatos), self.n_dobras)
+                medias = acuracias.mean(axis=1)
+                for (indice, parametros), acc in zip(candidatos, acuracias):
+                    self.resultados_.append({'rodada': rodada, 'linhas': n_linhas, 'indice': indice,
+                                             'parametros': parametros, 'media': float(acc.mean()),
+                                             'desvio': float(acc.std())})
+                # Maior média primeiro; empates pela ordem da grade, como no GridSearchCV.
+                ordem = sorted(range(len(candidatos)), key=lambda i: (-medias[i], candidatos[i][0]))
+                if rodada == len(rodadas) - 1:
+                    melhor = ordem[0]
+                    self.melhor_indice_, self.melhores_parametros_ = candidatos[melhor]
+                    self.melhor_acuracia_ = float(medias[melhor])
+                else:
+                    restantes = max(1, int(np.ceil(len(candidatos) / self.eta)))
+                    candidatos = [candidatos[i] for i in sorted(ordem[:restantes])]
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self
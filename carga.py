@@ -0,0 +1,114 @@
+# Gerador de carga para o serviço de pontuação (servico.py), contra localhost.
+#
+# Uso:
+#   python carga.py --porta 8000 --conexoes 64 --duracao 10
+#   python carga.py --porta 8000 --conexoes 8 --registros-por-requisicao 100
+#
+# Cada conexão (keep-alive) envia requisições em sequência, sem pausa, com registros
+# sorteados do arquivo de dados; com várias conexões abertas ao mesmo tempo o serviço
+# recebe requisições concorrentes e monta os micro-lotes. Ao final são impressas a
+# latência (p50/p99) e a vazão medidas no cliente e as métricas reportadas pelo serviço.
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import numpy as np
+
+from carregamento import carrega_adult
+
+
+def registros_de(caminho, skiprows=1):
+    """Registros (dicts JSON) do arquivo, sem a coluna income e com '?' nos faltantes."""
+    data = carrega_adult(caminho, skiprows=skiprows).drop(columns=['income'])
+    data = data.astype(object).where(data.notna(), '?')
+    return [{c: (int(v) if isinstance(v, (int, np.integer)) else v) for c, v in r.items()}
+            for r in data.to_dict(orient='records')]
+
+
+async def _requisicao(leitor, escritor, host, metodo, caminho, corpo=b''):
+    escritor.write((f"{metodo} {caminho} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(corpo)}\r\n\r\n").encode() + corpo)
+    await escritor.drain()
+    status = int((await leitor.readline()).split()[1])
+    tamanho = 0
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b'\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        if nome.strip().lower() == 'content-length':
+            tamanho = int(valor)
+    return status, json.loads(await leitor.readexactly(tamanho))
+
+
+async def _conexao(host, porta, corpos, fim, latencias, erros):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    rng = np.random.default_rng(len(latencias))
+    try:
+        while time.perf_counter() < fim:
+            corpo = corpos[rng.integers(len(corpos))]
+            inicio = time.perf_counter()
+            status, _ = await _requisicao(leitor, escritor, host, 'POST', '/pontua', corpo)
+            latencias.append(time.perf_counter() - inicio)
+            if status != 200:
+                erros.append(status)
+    finally:
+        escritor.close()
+
+
+async def metricas_servico(host, porta):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    try:
+        return (await _requisicao(leitor, escritor, host, 'GET', '/metricas'))[1]
+    finally:
+        escritor.close()
+
+
+async def gera_carga(registros, host='127.0.0.1', porta=8000, conexoes=64, duracao=10.0, por_requisicao=1):
+    """Envia requisições por 'duracao' segundos e retorna as métricas do cliente e do serviço."""
+    rng = np.random.default_rng(0)
+    # Corpos pré-serializados, para que o cliente gaste o mínimo de CPU por requisição.
+    corpos = []
+    for _ in range(1000):
+        escolhidos = [registros[i] for i in rng.integers(len(registros), size=por_requisicao)]
+        corpos.append(json.dumps(escolhidos[0] if por_requisicao == 1 else escolhidos).encode())
+    antes = await metricas_servico(host, porta)
+    latencias, erros = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_conexao(host, porta, corpos, inicio + duracao, latencias, erros) for _ in range(conexoes)))
+    segundos = time.perf_counter() - inicio
+    depois = await metricas_servico(host, porta)
+    ms = np.array(latencias) * 1000
+    cliente = {'requisicoes': len(latencias), 'erros': len(erros),
+               'latencia_p50_ms': float(np.percentile(ms, 50)), 'latencia_p99_ms': float(np.percentile(ms, 99)),
+               'requisicoes_por_s': len(latencias) / segundos,
+               'linhas_por_s': len(latencias) * por_requisicao / segundos}
+    lotes = depois['lotes'] - antes['lotes']
+    servico = dict(depois, linhas_por_lote=(depois['linhas'] - antes['linhas']) / lotes if lotes else 0.0)
+    return {'cliente': cliente, 'servico': servico}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gerador de carga para servico.py.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--dados', default='data/adult.test', help='arquivo de onde sortear os registros')
+    parser.add_argument('--conexoes', type=int, default=64, help='conexões simultâneas (padrão: 64)')
+    parser.add_argument('--duracao', type=float, default=10.0, help='segundos de carga (padrão: 10)')
+    parser.add_argument('--registros-por-requisicao', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    resultado = asyncio.run(gera_carga(registros_de(args.dados), args.host, args.porta, args.conexoes,
+                                       args.duracao, args.registros_por_requisicao))
+    cliente = resultado['cliente']
+    print(f"{cliente['requisicoes']} requisições ({cliente['erros']} erros): "
+          f"{cliente['requisicoes_por_s']:,.0f} req/s, {cliente['linhas_por_s']:,.0f} linhas/s, "
+          f"p50 {cliente['latencia_p50_ms']:.1f}ms, p99 {cliente['latencia_p99_ms']:.1f}ms", file=sys.stderr)
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+# Carregamento rápido dos arquivos no formato do dataset "Adult" (adult.data / adult.test).
+#
+# O script original usa pd.read_csv(..., sep=', ', engine='python'), que força o parser
+# em Python puro e deixa todas as colunas categóricas como object. Aqui o arquivo é
+# dividido em blocos alinhados em quebras de linha, e cada bloco é lido pelo motor C
+# do Pandas em uma thread separada (ou pelo leitor multithread do PyArrow, se instalado).
+#
+# Opcionalmente o resultado é gravado em um cache colunar (um diretório com um .npy por
+# coluna, identificado pelo hash do arquivo de origem). Nas execuções seguintes apenas as
+# colunas pedidas são abertas com np.load(mmap_mode='c'), sem passar pelo texto.
+#
+# Na memória, as colunas categóricas são 'category' (códigos int8 e um dicionário por coluna)
+# e as numéricas são reduzidas ao menor inteiro com sinal que guarda os valores lidos
+# (reduz_inteiros): age, education-num e hours-per-week cabem em int8, e as demais em int32.
+
+import io
+import os
+import json
+import mmap
+import hashlib
+import tempfile
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+# Serializa as leituras do PyArrow que usam o pool de threads global (_carrega_pyarrow).
+_trava_pyarrow = threading.Lock()
+
+
+colunas = ['age', 'workclass', 'fnlwgt', 'education', 'education-num', 'marital-status', 'occupation', 'relationship', 'race', 'sex', 'capital-gain', 'capital-loss', 'hours-per-week', 'native-country', 'income']
+
+colunas_numericas = ['age', 'fnlwgt', 'education-num', 'capital-gain', 'capital-loss', 'hours-per-week']
+colunas_categoricas = [c for c in colunas if c not in colunas_numericas]
+
+# Tipos explícitos de cada coluna. As categóricas são lidas como 'category'.
+tipos = {c: ('int64' if c in colunas_numericas else 'category') for c in colunas}
+
+# Valores considerados faltantes: o caractere '?' usado pelo UCI.
+valores_faltantes = ['?']
+
+# Tamanho mínimo de cada bloco lido por uma thread (em bytes).
+TAMANHO_MIN_BLOCO = 1 << 20
+
+# Versão do formato do cache; alterá-la invalida os caches gravados anteriormente.
+# Versão 2: colunas numéricas gravadas com o tipo reduzido por reduz_inteiros.
+VERSAO_CACHE = 2
+
+
+def _pula_linhas(buf, skiprows):
+    # Retorna a posição do início da linha seguinte às 'skiprows' primeiras linhas.
+    inicio = 0
+    for _ in range(skiprows):
+        fim = buf.find(b'\n', inicio)
+        if fim == -1:
+            return len(buf)
+        inicio = fim + 1
+    return inicio
+
+
+def _limites_blocos(buf, inicio, n_blocos):
+    # Divide buf[inicio:] em até n_blocos intervalos terminados em quebra de linha.
+    tamanho = len(buf) - inicio
+    n_blocos = max(1, min(n_blocos, tamanho // TAMANHO_MIN_BLOCO))
+    passo = tamanho // n_blocos
+    limites = [inicio]
+    for i in range(1, n_blocos):
+        corte = buf.find(b'\n', inicio + i * passo)
+        if corte == -1 or corte + 1 <= limites[-1]:
+            continue
+        limites.append(corte + 1)
+    limites.append(len(buf))
+    return list(zip(limites[:-1], limites[1:]))
+
+
+def _le_bloco(bloco, usecols):
+    # Lê um bloco de bytes com o motor C; os espaços após a vírgula são descartados.
+    return pd.read_csv(io.BytesIO(bloco), header=None, names=colunas, usecols=usecols,
+                       dtype=tipos, sep=',', skipinitialspace=True,
+                       na_values=valores_faltantes, engine='c')
+
+
+def _junta_blocos(partes, usecols):
+    # Concatena os blocos unificando as categorias de cada coluna categórica.
+    if len(partes) == 1:
+        data = partes[0]
+    else:
+        data = {}
+        for c in usecols:
+            if tipos[c] == 'category':
+                data[c] = union_categoricals([p[c] for p in partes], sort_categories=True)
+            else:
+                data[c] = np.concatenate([p[c].to_numpy() for p in partes])
+        data = pd.DataFrame(data, columns=usecols)
+    return reduz_inteiros(ordena_categorias(data))
+
+
+def reduz_inteiros(data):
+    """Converte cada coluna inteira para o menor inteiro com sinal que guarda os seus valores.
+
+    Com sinal, a diferença de duas colunas não negativas (capital-gain - capital-loss) cabe
+    no tipo da maior delas, e o hash das linhas (limpeza.impressoes) não depende do tipo.
+    """
+    for c in data.columns:
+        if pd.api.types.is_integer_dtype(data[c].dtype) and not isinstance(data[c].dtype, pd.CategoricalDtype):
+            data[c] = pd.to_numeric(data[c], downcast='signed')
+    return data
+
+
+def ordena_categorias(data):
+    """Deixa as categorias de cada coluna 'category' em ordem alfabética e sem categorias sem uso.
+
+    Com colunas object, pd.get_dummies gera as colunas em ordem alfabética (e drop_first
+    descarta a primeira delas); com 'category' ele segue a ordem das categorias.
+    """
+    for c in data.select_dtypes(include=['category']).columns:
+        cat = data[c].cat.remove_unused_categories()
+        if not cat.cat.categories.is_monotonic_increasing:
+            cat = cat.cat.reorder_categories(sorted(cat.cat.categories))
+        data[c] = cat
+    return data
+
+
+def _carrega_c(caminho, skiprows, usecols, n_threads):
+    with open(caminho, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return _le_bloco(b'', usecols)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            inicio = _pula_linhas(buf, skiprows)
+            limites = _limites_blocos(buf, inicio, n_threads)
+            blocos = [buf[a:b] for a, b in limites]
+    if len(blocos) == 1:
+        partes = [_le_bloco(blocos[0], usecols)]
+    else:
+        with ThreadPoolExecutor(n_threads) as executor:
+            partes = list(executor.map(lambda bloco: _le_bloco(bloco, usecols), blocos))
+    return _junta_blocos(partes, usecols)
+
+
+def _carrega_pyarrow(caminho, skiprows, usecols, n_threads):
+    tipos_arrow = {c: (pa.int64() if tipos[c] == 'int64' else pa.dictionary(pa.int32(), pa.string())) for c in usecols}
+
+    def le():
+        return pa_csv.read_csv(
+            caminho,
+            read_options=pa_csv.ReadOptions(column_names=colunas, skip_rows=skiprows, use_threads=n_threads > 1),
+            parse_options=pa_csv.ParseOptions(delimiter=','),
+            convert_options=pa_csv.ConvertOptions(column_types=tipos_arrow, include_columns=usecols,
+                                                  null_values=valores_faltantes, strings_can_be_null=True),
+        )
+
+    # O número de threads do PyArrow é global (pa.set_cpu_count): com uma thread a leitura
+    # é feita sem o pool; com outro número, ele é trocado só durante a leitura e restaurado.
+    # As leituras com o pool são serializadas por _trava_pyarrow: sem isso, duas leituras
+    # simultâneas intercalam a troca e a restauração, e uma delas restaura o número da outra.
+    if n_threads == 1:
+        tabela = le()
+    else:
+        with _trava_pyarrow:
+            anterior = pa.cpu_count()
+            if n_threads != anterior:
+                pa.set_cpu_count(n_threads)
+            try:
+                tabela = le()
+            finally:
+                if n_threads != anterior:
+                    pa.set_cpu_count(anterior)
+    # O PyArrow não remove o espaço após a vírgula: tira-se apenas dos dicionários,
+    # que são pequenos, em vez de percorrer os valores de cada linha.
+    data = {}
+    for c in usecols:
+        col = tabela.column(c)
+        if tipos[c] == 'category':
+            cat = col.to_pandas()
+            data[c] = cat.cat.rename_categories(cat.cat.categories.str.strip()) if len(cat.cat.categories) else cat
+        else:
+            data[c] = col.to_numpy()
+    data = pd.DataFrame(data, columns=usecols)
+    # Após tirar os espaços, '?' pode aparecer como categoria: é tratado como faltante.
+    for c in usecols:
+        if tipos[c] == 'category' and '?' in data[c].cat.categories:
+            data[c] = data[c].cat.remove_categories('?')
+    return _junta_blocos([data], usecols)
+
+
+def hash_arquivo(caminho, indice=None):
+    """Hash (blake2b) do conteúdo do arquivo.
+
+    Se 'indice' (um arquivo .json) for informado, o hash é memorizado pelo par
+    (tamanho, data de modificação), evitando reler arquivos grandes que não mudaram.
+    """
+    st = os.stat(caminho)
+    chave = f"{os.path.abspath(caminho)}:{st.st_size}:{st.st_mtime_ns}"
+    memo = {}
+    if indice is not None and os.path.exists(indice):
+        with open(indice) as f:
+            memo = json.load(f)
+        if chave in memo:
+            return memo[chave]
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 22), b''):
+            h.update(bloco)
+    resultado = h.hexdigest()
+    if indice is not None:
+        memo[chave] = resultado
+        _grava_json(indice, memo)
+    return resultado
+
+
+def _grava_json(caminho, obj):
+    # Grava de forma atômica, para que leitores concorrentes nunca vejam um arquivo pela metade.
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp, caminho)
+
+
+def _tipo_codigos(n_categorias):
+    # Menor inteiro com sinal capaz de guardar os códigos (e o -1 dos faltantes).
+    for tipo in (np.int8, np.int16, np.int32):
+        if n_categorias < np.iinfo(tipo).max:
+            return tipo
+    return np.int64
+
+
+def salva_cache(data, diretorio):
+    """Grava o DataFrame como um diretório com um .npy por coluna e um meta.json.
+
+    Colunas 'category' são gravadas como códigos inteiros, e as categorias vão no meta.json.
+    """
+    pai = os.path.dirname(os.path.abspath(diretorio))
+    os.makedirs(pai, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=pai, prefix='.tmp-')
+    meta = {'versao': VERSAO_CACHE, 'linhas': len(data), 'colunas': {}}
+    for i, c in enumerate(data.columns):
+        col = data[c]
+        arquivo = f"{i:02d}.npy"
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            categorias = list(col.cat.categories)
+            np.save(os.path.join(tmp, arquivo), col.cat.codes.to_numpy().astype(_tipo_codigos(len(categorias))))
+            meta['colunas'][c] = {'arquivo': arquivo, 'categorias': categorias}
+        else:
+            np.save(os.path.join(tmp, arquivo), np.ascontiguousarray(col.to_numpy()))
+            meta['colunas'][c] = {'arquivo': arquivo}
+    _grava_json(os.path.join(tmp, 'meta.json'), meta)
+    try:
+        os.rename(tmp, diretorio)
+    except OSError:
+        # Outro processo gravou o mesmo cache primeiro.
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def le_cache(diretorio, usecols=None):
+    """Abre um cache gravado por salva_cache, lendo apenas as colunas em 'usecols'.
+
+    As colunas são mapeadas com mmap_mode='c' (cópia na escrita): nada é copiado na
+    leitura, e alterações feitas no DataFrame não chegam ao arquivo.
+    """
+    with open(os.path.join(diretorio, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('versao') != VERSAO_CACHE:
+        raise ValueError(f"versão de cache incompatível em {diretorio}")
+    usecols = list(meta['colunas']) if usecols is None else [c for c in meta['colunas'] if c in usecols]
+    data = {}
+    for c in usecols:
+        info = meta['colunas'][c]
+        valores = np.load(os.path.join(diretorio, info['arquivo']), mmap_mode='c')
+        if 'categorias' in info:
+            dtype = pd.CategoricalDtype(info['categorias'])
+            data[c] = pd.Categorical.from_codes(valores, dtype=dtype)
+        else:
+            data[c] = valores
+    return pd.DataFrame(data, columns=usecols, copy=False)
+
+
+def diretorio_cache(caminho, skiprows=0, cache=True):
+    # O cache fica, por padrão, em '.cache' ao lado do arquivo de origem.
+    raiz = os.path.join(os.path.dirname(os.path.abspath(caminho)), '.cache') if cache is True else cache
+    os.makedirs(raiz, exist_ok=True)
+    h = hash_arquivo(caminho, indice=os.path.join(raiz, 'indice.json'))
+    return os.path.join(raiz, f"{os.path.basename(caminho)}-{h}-s{skiprows}-v{VERSAO_CACHE}")
+
+
+def carrega_adult(caminho, skiprows=0, usecols=None, n_threads=None, motor=None, cache=None):
+    """Lê um arquivo no formato do dataset Adult.
+
+    Substitui pd.read_csv(caminho, sep=', ', names=colunas, engine='python', skiprows=...)
+    retornando as mesmas colunas, com '?' convertido em NaN durante a leitura e as
+    colunas categóricas como 'category'.
+
+    motor: 'c' (motor C do Pandas em várias threads) ou 'pyarrow'. Por padrão usa o
+    PyArrow se estiver instalado.
+    cache: True (diretório '.cache' ao lado do arquivo) ou o diretório onde guardar o
+    cache colunar. Na primeira leitura todas as colunas são gravadas; depois, apenas as
+    colunas em 'usecols' são lidas do cache.
+    """
+    usecols = list(colunas) if usecols is None else [c for c in colunas if c in usecols]
+    if cache:
+        diretorio = diretorio_cache(caminho, skiprows, cache)
+        if not os.path.exists(os.path.join(diretorio, 'meta.json')):
+            salva_cache(carrega_adult(caminho, skiprows, n_threads=n_threads, motor=motor), diretorio)
+        return le_cache(diretorio, usecols)
+    n_threads = n_threads or os.cpu_count() or 1
+    if motor is None:
+        motor = 'pyarrow' if pa_csv is not None else 'c'
+    if motor == 'pyarrow':
+        if pa_csv is None:
+            raise ImportError("motor='pyarrow' requer o pacote pyarrow")
+        return _carrega_pyarrow(caminho, skiprows, usecols, n_threads)
+    if motor == 'c':
+        return _carrega_c(caminho, skiprows, usecols, n_threads)
+    raise ValueError(f"motor desconhecido: {motor!r}")
+
+
+def le_em_lotes(caminho, tamanho_lote=100000, skiprows=0, usecols=None):
+    """Lê o arquivo em lotes de 'tamanho_lote' linhas (gerador de DataFrames).
+
+    Usa o motor C com os mesmos tipos de carrega_adult; a memória usada depende apenas
+    do tamanho do lote, não do tamanho do arquivo.
+    """
+    usecols = list(colunas) if usecols is None else [c for c in colunas if c in usecols]
+    leitor = pd.read_csv(caminho, header=None, names=colunas, usecols=usecols, dtype=tipos,
+                         sep=',', skipinitialspace=True, na_values=valores_faltantes,
+                         skiprows=skiprows, engine='c', chunksize=tamanho_lote)
+    with leitor:
+        for lote in leitor:
+            yield reduz_inteiros(lote)
@@ -0,0 +1,197 @@
+# Pontuação direta de dados colunares: RecordBatches do Arrow e arrays estruturados do NumPy.
+#
+# O ModeloRenda (e o PreditorArtefato) recebem um DataFrame no esquema bruto do dataset
+# Adult. Quem já tem os dados no Arrow ou em um array estruturado paga pela conversão para
+# o Pandas e por várias cópias intermediárias: to_pandas, o DataFrame agrupado do
+# pre.transform, as colunas recodificadas do codificador e, por fim, a matriz do modelo.
+#
+# O CodificadorColunar compõe, uma única vez, o agrupamento de categorias do
+# PreProcessamento e o vocabulário do CodificadorOneHot em uma tabela por coluna
+# categórica: código da categoria original -> coluna da matriz com o dummy (ou -1, para a
+# categoria descartada pelo drop_first). Em cada lote:
+#   - colunas do Arrow codificadas por dicionário usam os índices do próprio dicionário: só
+#     o dicionário (algumas dezenas de valores) é traduzido para a tabela, e os índices são
+#     lidos do buffer do Arrow sem cópia; colunas de texto são codificadas por dicionário
+#     pelo Arrow antes;
+#   - campos inteiros de um array estruturado são tratados como códigos na ordem das
+#     categorias do modelo (PreProcessamento.categorias_, -1 para faltante); campos de texto
+#     passam por pd.factorize;
+#   - as colunas numéricas são lidas dos buffers (ou das vistas do array estruturado) e
+#     escritas uma única vez na matriz float32 que vai para o modelo.
+# Nenhum DataFrame é montado, e o resultado é o mesmo de modelo.pontua(DataFrame).
+
+import numpy as np
+import pandas as pd
+
+from carregamento import colunas_numericas, valores_faltantes
+from preprocessamento import codigos_categoria
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+
+class CodificadorColunar:
+    """Monta a matriz float32 do modelo diretamente das colunas brutas de um lote.
+
+    codificador = CodificadorColunar(modelo)      # ModeloRenda ou PreditorArtefato
+    X = codificador.matriz(batch)                 # pa.RecordBatch, pa.Table ou array estruturado
+    """
+
+    def __init__(self, modelo):
+        pre, cod = modelo.pre, modelo.codificador
+        self.nomes_ = list(cod.nomes_)
+        self.categorias_ = {}
+        self.destinos_ = {}
+        for c in cod.categoricas_:
+            originais = list(pre.categorias_[c].categories) if c in pre.tabelas_ else list(cod.vocabulario_[c].categories)
+            if c in pre.tabelas_:
+                # Grupo de cada categoria original; a última posição é a de nan e das não vistas.
+                saida = list(pre.saida_[c].categories)
+                grupos = [saida[g] if g >= 0 else None for g in pre.tabelas_[c]]
+            else:
+                grupos = originais + [None]
+            vocabulario = {v: i for i, v in enumerate(cod.vocabulario_[c].categories)}
+            inicio = 1 if cod.drop_first else 0
+            destino = np.full(len(grupos), -1, dtype=np.int32)
+            for i, grupo in enumerate(grupos):
+                codigo = vocabulario.get(grupo, -1)
+                if codigo >= inicio:
+                    destino[i] = cod.deslocamentos_[c] + codigo
+            self.categorias_[c] = {v: i for i, v in enumerate(originais)}
+            self.destinos_[c] = destino
+        # Coluna numérica da matriz -> (coluna bruta, coluna subtraída ou None).
+        self.numericas_ = []
+        for c in cod.numericas_:
+            if c == 'capital-gain' and 'capital-loss' not in pre.colunas_:
+                self.numericas_.append((c, 'capital-loss'))
+            else:
+                self.numericas_.append((c, None))
+
+    def matriz(self, fonte):
+        """Matriz float32 (n x len(nomes_)) do lote, com as mesmas colunas de modelo.matriz."""
+        if isinstance(fonte, np.ndarray):
+            X = np.zeros((len(fonte), len(self.nomes_)), dtype=np.float32)
+            self._monta(X, lambda c: fonte[c], self._codigos_estruturado(fonte))
+            return X
+        if pa is not None and isinstance(fonte, (pa.RecordBatch, pa.Table)):
+            X = np.zeros((fonte.num_rows, len(self.nomes_)), dtype=np.float32)
+            # Uma tabela é montada pedaço a pedaço (cada RecordBatch tem o seu dicionário).
+            inicio = 0
+            for batch in ([fonte] if isinstance(fonte, pa.RecordBatch) else fonte.to_batches()):
+                fim = inicio + batch.num_rows
+                self._monta(X[inicio:fim], lambda c: _numeros_arrow(batch.column(c)), self._codigos_arrow(batch))
+                inicio = fim
+            return X
+        raise TypeError(f"esperado um pa.RecordBatch, pa.Table ou array estruturado do NumPy, não {type(fonte).__name__}")
+
+    def _monta(self, X, numeros, codigos):
+        n = len(X)
+        for j, (c, subtraida) in enumerate(self.numericas_):
+            if subtraida is None:
+                X[:, j] = numeros(c)
+            else:
+                # Como no pre.transform: capital-gain - capital-loss, em inteiros.
+                X[:, j] = numeros(c).astype(np.int64) - numeros(subtraida)
+        linhas = np.arange(n)
+        for c, destino in self.destinos_.items():
+            colunas_x = destino[codigos(c)]
+            marcadas = colunas_x >= 0
+            X[linhas[marcadas], colunas_x[marcadas]] = 1
+
+    def _codigos_arrow(self, batch):
+        def codigos(c):
+            coluna = batch.column(c)
+            if not pa.types.is_dictionary(coluna.type):
+                coluna = coluna.dictionary_encode()
+            # Tradução do dicionário: posição de cada valor nas categorias do modelo; a
+            # posição extra (len(dicionário)) recebe os nulos.
+            mapa = self._traduz(coluna.dictionary.to_pylist(), c)
+            indices = coluna.indices
+            if indices.null_count:
+                indices = pc.fill_null(indices, len(mapa) - 1)
+            return mapa[indices.to_numpy(zero_copy_only=True)]
+        return codigos
+
+    def _codigos_estruturado(self, registros):
+        def codigos(c):
+            campo = registros[c]
+            if campo.dtype.kind in 'iu':
+                # Já codificado na ordem das categorias do modelo (-1: faltante).
+                return np.where(campo >= 0, campo, len(self.categorias_[c]))
+            # Os nulos (None, nan) recebem -1, que indexa a posição extra da tradução.
+            inversos, valores = pd.factorize(campo)
+            return self._traduz(list(valores), c)[inversos]
+        return codigos
+
+    def _traduz(self, valores, c):
+        # Códigos (posições na tabela de destino) dos valores de um dicionário, com uma
+        # posição extra no fim para os nulos; '?' e categorias não vistas são faltantes.
+        categorias = self.categorias_[c]
+        faltante = len(categorias)
+        mapa = np.empty(len(valores) + 1, dtype=np.intp)
+        for i, v in enumerate(valores):
+            if isinstance(v, bytes):
+                v = v.decode()
+            v = v.strip() if isinstance(v, str) else v
+            mapa[i] = categorias.get(v, faltante) if v not in valores_faltantes else faltante
+        mapa[-1] = faltante
+        return mapa
+
+
+def _numeros_arrow(coluna):
+    # Sem nulos, a vista do buffer do Arrow (sem cópia); com nulos, float com nan.
+    return coluna.to_numpy(zero_copy_only=coluna.null_count == 0 and pa.types.is_primitive(coluna.type))
+
+
+class PreditorColunar:
+    """Mesma interface de pontuação do ModeloRenda, para lotes colunares (Arrow ou NumPy).
+
+    preditor = PreditorColunar(modelo)
+    classe, proba = preditor.pontua(batch)
+    """
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.codificador = CodificadorColunar(modelo)
+
+    def proba(self, fonte):
+        X = self.codificador.matriz(fonte)
+        if hasattr(self.modelo, 'proba_matriz'):
+            return self.modelo.proba_matriz(X)
+        return self.modelo.estimador.predict_proba(X)
+
+    def predict_proba(self, fonte):
+        return self.proba(fonte)[:, 1]
+
+    def predict(self, fonte):
+        return self.pontua(fonte)[0]
+
+    def pontua(self, fonte):
+        proba = self.proba(fonte)
+        return proba[:, 1] > proba[:, 0], proba[:, 1]
+
+    def rotulos(self, previsoes):
+        return self.modelo.rotulos(previsoes)
+
+
+def registros_estruturados(data, modelo=None):
+    """Converte um DataFrame bruto em um array estruturado no esquema do dataset Adult.
+
+    Com o modelo, as colunas categóricas viram códigos int16 na ordem das categorias do
+    modelo (-1 para faltante), a forma mais compacta de entrada; sem ele, texto (object).
+    """
+    campos = [(c, np.int64 if c in colunas_numericas else (np.int16 if modelo is not None else object))
+              for c in data.columns]
+    saida = np.empty(len(data), dtype=campos)
+    for c in data.columns:
+        if c in colunas_numericas:
+            saida[c] = data[c].to_numpy()
+        elif modelo is not None:
+            saida[c] = codigos_categoria(data[c], modelo.pre.categorias_[c])
+        else:
+            saida[c] = data[c].astype(object).where(data[c].notna(), None).to_numpy()
+    return saida
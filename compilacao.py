@@ -0,0 +1,199 @@
+# Compilação da árvore de decisão ajustada em um preditor de uma única linha.
+#
+# Para pontuar uma pessoa por vez, montar um DataFrame e chamar tree_clf_income.predict
+# custa milissegundos, enquanto a árvore (max_depth=3) faz apenas três comparações. Aqui
+# a árvore é convertida em código Python com ifs aninhados que recebe o registro bruto
+# (um dict com as colunas do dataset Adult, ou uma tupla na ordem de 'colunas'): o
+# agrupamento de categorias e o one-hot viram um único teste de pertinência a um conjunto
+# de categorias originais, e o ganho de capital é calculado apenas se a árvore o usar.
+#
+# O código gerado não depende do Pandas, do NumPy nem do sklearn e pode ser gravado como um
+# módulo independente (ArvoreCompilada.salva).
+
+import time
+
+import numpy as np
+
+from carregamento import colunas
+
+
+# Acima desta profundidade os ifs aninhados ultrapassariam o limite de indentação do
+# Python; a árvore é então percorrida como vetores de nós.
+PROFUNDIDADE_MAX_CODIGO = 90
+
+
+def _atributos(modelo):
+    # Para cada coluna da matriz do codificador: ('num', coluna) ou ('cat', coluna, categoria).
+    cod = modelo.codificador
+    atributos = [('num', c) for c in cod.numericas_]
+    for c in cod.categoricas_:
+        categorias = list(cod.vocabulario_[c].categories)
+        atributos += [('cat', c, cat) for cat in categorias[1 if cod.drop_first else 0:]]
+    return atributos
+
+
+def _teste_categoria(pre, coluna, grupo, valor):
+    # Expressão verdadeira quando a categoria original 'valor' pertence ao 'grupo' após o agrupamento.
+    if coluna not in pre.tabelas_:
+        return f"({valor} == {grupo!r})"
+    originais = list(pre.categorias_[coluna].categories)
+    saida = list(pre.saida_[coluna].categories)
+    tabela = pre.tabelas_[coluna]
+    if grupo not in saida:
+        return "False"
+    codigo = saida.index(grupo)
+    membros = [o for o, t in zip(originais, tabela[:-1]) if t == codigo]
+    if tabela[-1] == codigo:
+        # O grupo também recebe nan e categorias não vistas (ex.: native-country 'Other').
+        outros = [o for o, t in zip(originais, tabela[:-1]) if t != codigo]
+        return f"({valor} not in {_conjunto(outros)})"
+    return f"({valor} in {_conjunto(membros)})"
+
+
+def _conjunto(valores):
+    # Um literal de conjunto após 'in' é guardado pelo Python como constante (frozenset).
+    return "{" + ", ".join(repr(v) for v in sorted(valores)) + "}" if valores else "()"
+
+
+def _expressoes(modelo, acesso):
+    # Expressão Python do valor de cada coluna da matriz a partir do registro bruto.
+    pre = modelo.pre
+    expressoes = []
+    for atributo in _atributos(modelo):
+        if atributo[0] == 'num':
+            c = atributo[1]
+            if c == 'capital-gain' and 'capital-loss' in pre.descartadas:
+                expressoes.append(f"({acesso(c)} - {acesso('capital-loss', 0)})")
+            else:
+                expressoes.append(acesso(c))
+        else:
+            _, c, grupo = atributo
+            expressoes.append(_teste_categoria(pre, c, grupo, acesso(c, None)))
+    return expressoes
+
+
+def _acesso_dict(c, padrao=...):
+    return f"r[{c!r}]" if padrao is ... else f"r.get({c!r}, {padrao!r})"
+
+
+def _acesso_tupla(c, padrao=...):
+    i = colunas.index(c)
+    if padrao is ...:
+        return f"r[{i}]"
+    return f"(r[{i}] if len(r) > {i} else {padrao!r})"
+
+
+def _folhas(arvore, classes):
+    # Rótulo e probabilidade de alta renda em cada nó, como no predict/predict_proba do sklearn.
+    valores = arvore.value[:, 0, :]
+    proba = valores / valores.sum(axis=1, keepdims=True)
+    rotulos = [classes[int(np.argmax(v))] for v in proba]
+    return rotulos, proba[:, 1]
+
+
+def _ifs(arvore, expressoes, eh_categoria, folha, no=0, nivel=1):
+    recuo = '    ' * nivel
+    esq, dir_ = arvore.children_left[no], arvore.children_right[no]
+    if esq == -1:
+        return [f"{recuo}return {folha[no]!r}"]
+    f = arvore.feature[no]
+    limiar = float(arvore.threshold[no])
+    if eh_categoria[f]:
+        # Dummy (0 ou 1), normalmente com limiar 0.5: à esquerda fica a categoria ausente.
+        teste = f"not {expressoes[f]}" if 0.0 <= limiar < 1.0 else repr(limiar >= 1.0)
+    else:
+        # Os atributos numéricos são inteiros menores que 2**24, exatos em float32 (o tipo
+        # usado internamente pelo sklearn), de modo que a comparação é a mesma.
+        teste = f"{expressoes[f]} <= {limiar!r}"
+    return ([f"{recuo}if {teste}:"] + _ifs(arvore, expressoes, eh_categoria, folha, esq, nivel + 1)
+            + [f"{recuo}else:"] + _ifs(arvore, expressoes, eh_categoria, folha, dir_, nivel + 1))
+
+
+def _caminhamento(arvore, expressoes, eh_categoria, tabela, nome):
+    # Versão sem ifs aninhados: calcula os atributos usados e percorre os vetores de nós.
+    usados = sorted(set(int(f) for f in arvore.feature[arvore.children_left != -1]))
+    valores = ", ".join(f"{f}: (1.0 if {expressoes[f]} else 0.0)" if eh_categoria[f] else f"{f}: {expressoes[f]}"
+                        for f in usados)
+    return [f"def {nome}(r):",
+            f"    x = {{{valores}}}",
+            "    no = 0",
+            "    while _ESQ[no] != -1:",
+            "        no = _ESQ[no] if x[_ATR[no]] <= _LIM[no] else _DIR[no]",
+            f"    return {tabela}[no]"]
+
+
+def gera_codigo(modelo):
+    """Gera o código-fonte das funções prediz, prediz_proba e prediz_tupla.
+
+    prediz(registro: dict) -> rótulo de renda ('<=50K' ou '>50K')
+    prediz_proba(registro: dict) -> probabilidade de alta renda
+    prediz_tupla(registro: tuple) -> rótulo, com os valores na ordem de 'colunas'
+    """
+    estimador = modelo.estimador
+    if not hasattr(estimador, 'tree_'):
+        raise TypeError(f"apenas árvores de decisão ajustadas podem ser compiladas, não {type(estimador).__name__}")
+    arvore = estimador.tree_
+    classes = list(modelo.codificador.classes_)
+    rotulos, proba = _folhas(arvore, [classes[int(c)] for c in estimador.classes_])
+    atributos = _atributos(modelo)
+    eh_categoria = [a[0] == 'cat' for a in atributos]
+    funcoes = [('prediz', _acesso_dict, '_ROTULOS', rotulos),
+               ('prediz_proba', _acesso_dict, '_PROBA', proba.tolist()),
+               ('prediz_tupla', _acesso_tupla, '_ROTULOS', rotulos)]
+    codigo = ["# Código gerado por compilacao.gera_codigo a partir da árvore de decisão ajustada.", ""]
+    if arvore.max_depth <= PROFUNDIDADE_MAX_CODIGO:
+        for nome, acesso, _, folha in funcoes:
+            codigo += [f"def {nome}(r):"] + _ifs(arvore, _expressoes(modelo, acesso), eh_categoria, folha) + ["", ""]
+    else:
+        codigo += [f"_ESQ = {arvore.children_left.tolist()!r}",
+                   f"_DIR = {arvore.children_right.tolist()!r}",
+                   f"_ATR = {arvore.feature.tolist()!r}",
+                   f"_LIM = {arvore.threshold.tolist()!r}",
+                   f"_ROTULOS = {rotulos!r}",
+                   f"_PROBA = {proba.tolist()!r}", ""]
+        for nome, acesso, tabela, _ in funcoes:
+            codigo += _caminhamento(arvore, _expressoes(modelo, acesso), eh_categoria, tabela, nome) + ["", ""]
+    return "\n".join(codigo)
+
+
+class ArvoreCompilada:
+    """Preditor de uma única linha gerado a partir de um ModeloRenda com árvore de decisão."""
+
+    def __init__(self, codigo):
+        self.codigo = codigo
+        escopo = {}
+        exec(compile(codigo, '<arvore_compilada>', 'exec'), escopo)
+        self.prediz = escopo['prediz']
+        self.prediz_proba = escopo['prediz_proba']
+        self.prediz_tupla = escopo['prediz_tupla']
+
+    def salva(self, caminho):
+        # Grava como um módulo Python independente.
+        with open(caminho, 'w') as f:
+            f.write(self.codigo)
+
+
+def compila(modelo):
+    return ArvoreCompilada(gera_codigo(modelo))
+
+
+def verifica(compilada, modelo, data):
+    """Compara o preditor compilado com o modelo (sklearn) em todas as linhas de 'data'.
+
+    Retorna o número de divergências nos rótulos e nas probabilidades, e o tempo médio de
+    cada chamada de prediz, em microssegundos.
+    """
+    esperado = modelo.rotulos(modelo.predict(data))
+    esperado_proba = modelo.predict_proba(data)
+    registros = data.astype(object).where(data.notna(), None).to_dict('records')
+    # As tuplas só podem ser montadas se as colunas estiverem na ordem de 'colunas'.
+    tuplas = [tuple(r.values()) for r in registros] if list(data.columns) == colunas[:len(data.columns)] else None
+    inicio = time.perf_counter()
+    obtido = [compilada.prediz(r) for r in registros]
+    microssegundos = (time.perf_counter() - inicio) / max(len(registros), 1) * 1e6
+    obtido_proba = np.array([compilada.prediz_proba(r) for r in registros])
+    divergencias = int(np.sum(np.asarray(obtido, dtype=object) != esperado))
+    divergencias += int(np.sum(obtido_proba != esperado_proba))
+    if tuplas is not None:
+        divergencias += int(np.sum(np.asarray([compilada.prediz_tupla(t) for t in tuplas], dtype=object) != esperado))
+    return divergencias, microssegundos
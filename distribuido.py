@@ -0,0 +1,471 @@
+# Treino distribuído da árvore de histogramas: cada trabalhador guarda um fragmento das linhas.
+#
+# O DecisionTreeClassifier.fit(X, y) (e a ArvoreHistograma) precisa de todo o arquivo em um
+# único processo. Aqui cada fragmento do arquivo (um arquivo por máquina, por exemplo) fica
+# em um processo trabalhador, ligado ao coordenador por um socket
+# (multiprocessing.connection, com chave de autenticação); processos locais fazem o papel
+# das máquinas, e trabalhadores remotos podem se conectar com
+#   python distribuido.py trabalhador HOST PORTA      (chave em DISTRIBUIDO_CHAVE, em hexadecimal)
+#
+# Preparação (o resultado é o mesmo de carregar o arquivo inteiro em um processo):
+#   - cada trabalhador lê o seu arquivo e devolve as categorias vistas; o coordenador ajusta
+#     o PreProcessamento com a união delas;
+#   - cada trabalhador filtra outliers e faltantes e devolve as impressões digitais das
+#     linhas (limpeza.impressoes, 16 bytes por linha); o coordenador decide as duplicatas
+#     percorrendo os fragmentos na ordem dos arquivos, como o LimpezaEmLotes, e devolve a
+#     cada um as posições a manter;
+#   - com a união das categorias presentes, o coordenador fixa o vocabulário do
+#     CodificadorOneHot; com a união das contagens de cada valor de cada coluna da matriz,
+#     os limiares das faixas (histograma.limites_contagens, os mesmos do Discretizador).
+# Treino, nível a nível:
+#   - os trabalhadores guardam as faixas (uint8) e o nó atual de cada linha e devolvem, para
+#     os nós pedidos, os histogramas de contagem por classe de cada atributo (só as faixas
+#     usadas de cada atributo, em int64);
+#   - o coordenador soma os histogramas, escolhe o corte de cada nó aberto como a
+#     ArvoreHistograma (histograma.escolhe_corte, com o mesmo sorteio de atributos por nó) e
+#     envia apenas os cortes: (nó, atributo, faixa, filho da esquerda, filho da direita).
+#     O limiar de cada corte sai do histograma somado do nó (histograma.limiar_corte).
+#     Só o filho menor de cada corte é pedido; o maior é o pai menos o irmão.
+# A árvore é numerada como a da ArvoreHistograma e é a mesma do treino em um processo.
+
+import os
+import sys
+import socket
+import secrets
+import argparse
+import threading
+import traceback
+import subprocess
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+from histograma import (ArvoreHistograma, Discretizador, EstruturaArvore, MAX_FAIXAS, escolhe_corte,
+                        extremos_faixas, limiar_corte, limites_contagens, _colunas)
+
+
+# Endereço padrão do coordenador: uma porta livre na própria máquina.
+ENDERECO = ('127.0.0.1', 0)
+VARIAVEL_CHAVE = 'DISTRIBUIDO_CHAVE'
+# Intervalo (segundos) entre as verificações dos trabalhadores locais enquanto as conexões são aceitas.
+INTERVALO_VERIFICACAO = 0.2
+
+
+class Fragmento:
+    """Estado de um trabalhador: o seu fragmento dos dados e o nó atual de cada linha.
+
+    Cada método é chamado pelo coordenador (Coordenador.chama) e devolve apenas agregados.
+    """
+
+    def carrega_arquivo(self, caminho, skiprows=0):
+        """Lê o arquivo do fragmento; devolve as categorias vistas em cada coluna categórica."""
+        from carregamento import carrega_adult
+
+        self.bruto = carrega_adult(caminho, skiprows=skiprows)
+        return {c: list(self.bruto[c].cat.categories) for c in self.bruto.select_dtypes('category').columns}
+
+    def impressoes(self, pre, remove_outliers=True):
+        """Filtra outliers e faltantes; devolve a impressão digital de cada linha restante."""
+        from limpeza import impressoes
+
+        self.filtrado = pre.filtra(self.bruto, remove_outliers)
+        del self.bruto
+        return impressoes(pre.chaves_duplicatas(self.filtrado))
+
+    def transforma(self, pre, posicoes, alvo='income'):
+        """Mantém as linhas em 'posicoes' e aplica pre.transform; devolve as colunas e as categorias presentes."""
+        from preprocessamento import _eh_categorica, _categorias
+
+        self.data = pre.transform(self.filtrado.iloc[posicoes])
+        del self.filtrado
+        return [(c, _categorias(self.data[c]) if _eh_categorica(self.data[c]) or c == alvo else None)
+                for c in self.data.columns]
+
+    def codifica(self, codificador):
+        """Codifica o fragmento com o codificador do coordenador (veja recebe_matriz)."""
+        X = codificador.transform(self.data, formato='denso', dtype=np.float32)
+        y = codificador.transforma_alvo(self.data)
+        del self.data
+        return self.recebe_matriz(X, y)
+
+    def recebe_matriz(self, X, y):
+        """Guarda a matriz do fragmento; devolve os valores distintos (e contagens) de cada coluna e as classes."""
+        self.X, self.y = X, np.asarray(y)
+        return [np.unique(col, return_counts=True) for col in _colunas(X)], np.unique(self.y)
+
+    def discretiza(self, limites, classes):
+        """Converte a matriz nas faixas definidas pelo coordenador; todas as linhas começam na raiz."""
+        discretizador = Discretizador()
+        discretizador.limites_ = limites
+        self.faixas = discretizador.transform(self.X)
+        self.codigos = np.searchsorted(classes, self.y)
+        self.n_classes = len(classes)
+        self.tamanhos = [len(limites_j) + 1 for limites_j in limites]
+        self.no = np.zeros(len(self.y), dtype=np.int32)
+        del self.X, self.y
+        return len(self.no)
+
+    def histogramas(self, cortes, pedidos):
+        """Aplica os cortes do último nível e devolve os histogramas (len(pedidos) x posições) dos nós pedidos.
+
+        cortes: array (k, 5) com (nó, atributo, faixa, filho da esquerda, filho da direita).
+        """
+        if len(cortes):
+            posicao = np.full(max(int(self.no.max(initial=0)), int(cortes[:, 0].max())) + 1, -1)
+            posicao[cortes[:, 0]] = np.arange(len(cortes))
+            linhas = np.flatnonzero(posicao[self.no] >= 0)
+            corte = cortes[posicao[self.no[linhas]]]
+            vai_esq = self.faixas[corte[:, 1], linhas] <= corte[:, 2]
+            self.no[linhas] = np.where(vai_esq, corte[:, 3], corte[:, 4])
+        pedidos = np.asarray(pedidos, dtype=np.int64)
+        # Um fragmento pode ficar sem linhas (todas duplicatas de outros fragmentos).
+        posicao = np.full(max(int(self.no.max(initial=0)), int(pedidos.max(initial=0))) + 1, -1)
+        posicao[pedidos] = np.arange(len(pedidos))
+        linhas = np.flatnonzero(posicao[self.no] >= 0)
+        indice = posicao[self.no[linhas]]
+        codigos = self.codigos[linhas]
+        partes = []
+        for j, tamanho in enumerate(self.tamanhos):
+            # Um bincount por atributo: (nó pedido, faixa, classe) de cada linha.
+            largura = tamanho * self.n_classes
+            chaves = indice * largura + self.faixas[j, linhas].astype(np.int64) * self.n_classes + codigos
+            partes.append(np.bincount(chaves, minlength=len(pedidos) * largura).reshape(len(pedidos), largura))
+        return np.concatenate(partes, axis=1)
+
+
+def _atende(conexao):
+    fragmento = Fragmento()
+    while True:
+        mensagem = conexao.recv()
+        if mensagem is None:
+            break
+        nome, argumentos = mensagem
+        try:
+            resposta = ('ok', getattr(fragmento, nome)(*argumentos))
+        except Exception:
+            resposta = ('erro', traceback.format_exc())
+        conexao.send(resposta)
+
+
+def trabalhador(endereco, chave):
+    """Conecta ao coordenador e atende aos pedidos até o fim do treino."""
+    with Client(tuple(endereco), authkey=chave) as conexao:
+        _atende(conexao)
+
+
+class Coordenador:
+    """Socket de escuta e uma conexão por trabalhador (um por fragmento).
+
+    with Coordenador(4) as coordenador:                  # 4 processos locais
+        respostas = coordenador.chama('metodo', [argumentos de cada trabalhador])
+
+    Com locais=False, espera n_trabalhadores conexões de trabalhadores iniciados à parte
+    (python distribuido.py trabalhador HOST PORTA), com a mesma chave (por padrão, a de
+    DISTRIBUIDO_CHAVE; sem ela, os trabalhadores locais recebem uma chave aleatória).
+    """
+
+    def __init__(self, n_trabalhadores, endereco=ENDERECO, locais=True, chave=None):
+        if chave is None and os.environ.get(VARIAVEL_CHAVE):
+            chave = bytes.fromhex(os.environ[VARIAVEL_CHAVE])
+        if chave is None and not locais:
+            raise ValueError(f"trabalhadores remotos precisam da chave: defina {VARIAVEL_CHAVE} nas duas pontas")
+        self.chave = chave or secrets.token_bytes(16)
+        self.ouvinte = Listener(tuple(endereco), authkey=self.chave)
+        # Os trabalhadores locais são iniciados como os remotos, pela linha de comando: não
+        # herdam o estado (threads do PyArrow, dados) do coordenador.
+        host, porta = self.ouvinte.address
+        ambiente = {**os.environ, VARIAVEL_CHAVE: self.chave.hex()}
+        self.processos = [subprocess.Popen([sys.executable, os.path.abspath(__file__), 'trabalhador', host, str(porta)],
+                                           env=ambiente)
+                          for _ in range(n_trabalhadores if locais else 0)]
+        self.conexoes = []
+        self._aceita(n_trabalhadores)
+
+    def _aceita(self, n_trabalhadores):
+        # O accept espera sem limite: se um trabalhador local termina antes de conectar, ele
+        # esperaria para sempre. As conexões são aceitas em uma thread, e os processos locais
+        # são verificados enquanto isso; se algum terminou, uma conexão sem autenticação
+        # acorda o accept, e o coordenador é encerrado com um erro.
+        erros, desiste = [], threading.Event()
+
+        def aceita():
+            while len(self.conexoes) < n_trabalhadores:
+                try:
+                    conexao = self.ouvinte.accept()
+                except Exception as erro:
+                    if not desiste.is_set():
+                        erros.append(erro)
+                    return
+                if desiste.is_set():
+                    conexao.close()
+                    return
+                self.conexoes.append(conexao)
+
+        aceitador = threading.Thread(target=aceita, daemon=True)
+        aceitador.start()
+        while aceitador.is_alive():
+            aceitador.join(INTERVALO_VERIFICACAO)
+            terminados = [p for p in self.processos if p.poll() is not None]
+            if terminados and aceitador.is_alive():
+                desiste.set()
+                with socket.create_connection(self.ouvinte.address):
+                    pass
+                aceitador.join()
+                self._aborta()
+                raise RuntimeError(f"trabalhador local terminou antes de conectar ao coordenador "
+                                   f"(código {terminados[0].returncode})")
+        if erros:
+            self._aborta()
+            raise erros[0]
+
+    def _aborta(self):
+        for conexao in self.conexoes:
+            conexao.close()
+        for processo in self.processos:
+            processo.kill()
+            processo.wait()
+        self.ouvinte.close()
+
+    @property
+    def endereco(self):
+        return self.ouvinte.address
+
+    def __len__(self):
+        return len(self.conexoes)
+
+    def chama(self, nome, argumentos):
+        """Chama Fragmento.nome em todos os trabalhadores ao mesmo tempo; devolve as respostas em ordem."""
+        for conexao, args in zip(self.conexoes, argumentos):
+            conexao.send((nome, tuple(args)))
+        respostas = [conexao.recv() for conexao in self.conexoes]
+        for i, (estado, resposta) in enumerate(respostas):
+            if estado == 'erro':
+                raise RuntimeError(f"falha no trabalhador {i} em {nome}:\n{resposta}")
+        return [resposta for _, resposta in respostas]
+
+    def fecha(self):
+        for conexao in self.conexoes:
+            try:
+                conexao.send(None)
+                conexao.close()
+            except OSError:
+                pass
+        for processo in self.processos:
+            processo.wait()
+        self.ouvinte.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fecha()
+
+
+class ArvoreDistribuida(ArvoreHistograma):
+    """ArvoreHistograma treinada nível a nível por trabalhadores com fragmentos das linhas.
+
+    Mesmos parâmetros da ArvoreHistograma (sem sample_weight) e n_trabalhadores. fit(X, y)
+    divide X em n_trabalhadores fragmentos contíguos, um por processo local; fit_coordenador
+    treina com fragmentos já carregados nos trabalhadores (treina_arquivos).
+    """
+
+    def __init__(self, max_depth=None, min_samples_split=2, min_samples_leaf=1, max_features=None,
+                 criterion='gini', max_faixas=MAX_FAIXAS, random_state=None, n_trabalhadores=None):
+        super().__init__(max_depth, min_samples_split, min_samples_leaf, max_features, criterion, max_faixas,
+                         random_state)
+        self.n_trabalhadores = n_trabalhadores
+
+    def fit(self, X, y):
+        n = min(self.n_trabalhadores or os.cpu_count() or 1, max(X.shape[0], 1))
+        limites = np.linspace(0, X.shape[0], n + 1).astype(int)
+        with Coordenador(n) as coordenador:
+            resumos = coordenador.chama('recebe_matriz', [(X[a:b], y[a:b]) for a, b in zip(limites[:-1], limites[1:])])
+            return self.fit_coordenador(coordenador, resumos)
+
+    def fit_coordenador(self, coordenador, resumos):
+        """Treina com as matrizes já guardadas nos trabalhadores; resumos: respostas de recebe_matriz/codifica."""
+        n_atributos = len(resumos[0][0])
+        self.discretizador_ = Discretizador(self.max_faixas)
+        limites, self.discretizador_.minimos_, self.discretizador_.maximos_ = [], [], []
+        for j in range(n_atributos):
+            valores, inversos = np.unique(np.concatenate([r[0][j][0] for r in resumos]), return_inverse=True)
+            contagens = np.bincount(inversos, weights=np.concatenate([r[0][j][1] for r in resumos])).astype(np.int64)
+            limites.append(limites_contagens(valores, contagens, self.max_faixas))
+            minimos, maximos = extremos_faixas(valores, limites[-1])
+            self.discretizador_.minimos_.append(minimos)
+            self.discretizador_.maximos_.append(maximos)
+        self.discretizador_.limites_ = limites
+        self.classes_ = np.unique(np.concatenate([r[1] for r in resumos]))
+        self.n_features_in_ = n_atributos
+        coordenador.chama('discretiza', [(limites, self.classes_)] * len(coordenador))
+        self.tree_ = self._cresce(coordenador)
+        return self
+
+    def _cresce(self, coordenador):
+        params = self._parametros()
+        n_classes = len(self.classes_)
+        tamanhos = [len(limites) + 1 for limites in self.discretizador_.limites_]
+        atributo_posicao = np.repeat(np.arange(len(tamanhos)), tamanhos)
+        faixa_posicao = np.concatenate([np.arange(t) for t in tamanhos])
+
+        def pede(cortes, pedidos):
+            # Histogramas somados dos trabalhadores, no formato (atributos, MAX_FAIXAS, classes).
+            cortes = np.array(cortes, dtype=np.int64).reshape(-1, 5)
+            soma = sum(coordenador.chama('histogramas', [(cortes, pedidos)] * len(coordenador)))
+            hists = {}
+            for i, no in enumerate(pedidos):
+                hist = np.zeros((len(tamanhos), MAX_FAIXAS, n_classes))
+                hist[atributo_posicao, faixa_posicao] = soma[i].reshape(-1, n_classes)
+                hists[no] = hist
+            return hists
+
+        def pode_cortar(no):
+            return (profundidade[no] < params['max_depth'] and valor[no].sum() >= params['min_samples_split']
+                    and np.count_nonzero(valor[no]) > 1)
+
+        hists = pede([], [0])
+        esquerda, direita, atributo, faixa, limiar = [-1], [-1], [-2], [0], [-2.0]
+        valor = [hists[0][0].sum(axis=0)]
+        profundidade = [0]
+        sementes = [np.random.SeedSequence(self.random_state)]
+        abertos = [0]
+        while abertos:
+            cortes, pedidos, derivados, proximos = [], [], [], []
+            for no in abertos:
+                hist = hists.pop(no)
+                corte = escolhe_corte(hist, valor[no], valor[no].sum(), profundidade[no], sementes[no], params)
+                if corte is None:
+                    continue
+                j, f = corte
+                contagens_esq = hist[j, :f + 1].sum(axis=0)
+                filhos = []
+                for contagens, semente in zip((contagens_esq, valor[no] - contagens_esq), sementes[no].spawn(2)):
+                    esquerda.append(-1)
+                    direita.append(-1)
+                    atributo.append(-2)
+                    faixa.append(0)
+                    limiar.append(-2.0)
+                    valor.append(contagens)
+                    profundidade.append(profundidade[no] + 1)
+                    sementes.append(semente)
+                    filhos.append(len(esquerda) - 1)
+                atributo[no], faixa[no] = int(j), int(f)
+                limiar[no] = float(limiar_corte(hist[j].sum(axis=-1), f, self.discretizador_.minimos_[j],
+                                                self.discretizador_.maximos_[j]))
+                esquerda[no], direita[no] = filhos
+                cortes.append((no, j, f, *filhos))
+                abertos_filhos = [filho for filho in filhos if pode_cortar(filho)]
+                if abertos_filhos:
+                    # Só o filho menor é contado pelos trabalhadores; o outro é pai - irmão.
+                    menor, maior = sorted(filhos, key=lambda filho: valor[filho].sum())
+                    pedidos.append(menor)
+                    if maior in abertos_filhos:
+                        derivados.append((maior, hist, menor))
+                    proximos += abertos_filhos
+            if proximos:
+                hists = pede(cortes, pedidos)
+                for maior, hist, menor in derivados:
+                    hists[maior] = hist - hists[menor]
+            abertos = proximos
+        return self._estrutura(esquerda, direita, atributo, faixa, limiar, valor)
+
+    def _estrutura(self, esquerda, direita, atributo, faixa, limiar, valor):
+        # Renumera os nós na ordem da ArvoreHistograma (pré-ordem, a esquerda antes da
+        # direita) e monta o tree_.
+        ordem, pilha = [], [0]
+        while pilha:
+            no = pilha.pop()
+            ordem.append(no)
+            if esquerda[no] != -1:
+                pilha += [direita[no], esquerda[no]]
+        novo = np.empty(len(ordem), dtype=np.intp)
+        novo[ordem] = np.arange(len(ordem))
+        esquerda, direita = np.array(esquerda)[ordem], np.array(direita)[ordem]
+        atributo, faixa = np.array(atributo, dtype=np.intp)[ordem], np.array(faixa, dtype=np.intp)[ordem]
+        folha = esquerda == -1
+        limiar = np.array(limiar)[ordem]
+        return EstruturaArvore(np.where(folha, -1, novo[np.where(folha, 0, esquerda)]),
+                               np.where(folha, -1, novo[np.where(folha, 0, direita)]),
+                               atributo, limiar, np.array(valor)[ordem][:, None, :], faixa)
+
+
+def treina_arquivos(arquivos, skiprows=0, remove_outliers=True, alvo='income', endereco=ENDERECO, locais=True,
+                    chave=None, **parametros):
+    """ModeloRenda treinado com um trabalhador por arquivo (fragmento), como o treino com os arquivos concatenados.
+
+    parametros: os da ArvoreDistribuida. Os arquivos são lidos pelos trabalhadores (com
+    locais=False, os caminhos são os das máquinas deles).
+    """
+    from limpeza import pre_de_categorias, primeiras_ocorrencias, ConjuntoImpressoes
+    from preprocessamento import CodificadorOneHot
+    from modelo import ModeloRenda
+
+    with Coordenador(len(arquivos), endereco, locais, chave) as coordenador:
+        vistas = {}
+        for categorias in coordenador.chama('carrega_arquivo', [(a, skiprows) for a in arquivos]):
+            for c, valores in categorias.items():
+                vistas.setdefault(c, set()).update(valores)
+        pre = pre_de_categorias(vistas)
+        # Duplicatas decididas na ordem dos arquivos: fica a primeira ocorrência de cada linha.
+        ja_vistas, posicoes = ConjuntoImpressoes(), []
+        for h in coordenador.chama('impressoes', [(pre, remove_outliers)] * len(arquivos)):
+            primeiras = primeiras_ocorrencias(h)
+            novas = primeiras[~ja_vistas.contem(h[primeiras])]
+            ja_vistas.adiciona(h[novas])
+            posicoes.append(novas)
+        colunas = coordenador.chama('transforma', [(pre, p, alvo) for p in posicoes])
+        presentes = {}
+        for fragmento in colunas:
+            for c, categorias in fragmento:
+                if categorias is not None:
+                    presentes.setdefault(c, set()).update(categorias)
+        codificador = CodificadorOneHot(alvo=alvo).define_vocabulario(
+            [c for c, categorias in colunas[0] if categorias is None and c != alvo],
+            {c: sorted(presentes[c]) for c, _ in colunas[0] if c in presentes and c != alvo},
+            sorted(presentes.get(alvo, [])))
+        resumos = coordenador.chama('codifica', [(codificador,)] * len(arquivos))
+        arvore = ArvoreDistribuida(**parametros).fit_coordenador(coordenador, resumos)
+    return ModeloRenda(pre, codificador, arvore)
+
+
+def fragmenta_arquivo(caminho, n_fragmentos, diretorio, skiprows=0):
+    """Divide o arquivo em n_fragmentos arquivos contíguos, cada um com uma linha de cabeçalho (lidos com skiprows=1)."""
+    with open(caminho, 'rb') as f:
+        linhas = f.read().splitlines(keepends=True)[skiprows:]
+    os.makedirs(diretorio, exist_ok=True)
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    limites = np.linspace(0, len(linhas), n_fragmentos + 1).astype(int)
+    caminhos = []
+    for i, (a, b) in enumerate(zip(limites[:-1], limites[1:])):
+        destino = os.path.join(diretorio, f"{nome}_{i:03d}.data")
+        with open(destino, 'wb') as f:
+            f.write(f"|fragmento {i}\n".encode())
+            f.writelines(linhas[a:b])
+        caminhos.append(destino)
+    return caminhos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Treino distribuído da árvore de histogramas.')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    p = comandos.add_parser('trabalhador', help='conecta a um coordenador e atende aos pedidos')
+    p.add_argument('host')
+    p.add_argument('porta', type=int)
+    p = comandos.add_parser('fragmenta', help='divide um arquivo no formato do adult.data em fragmentos')
+    p.add_argument('arquivo')
+    p.add_argument('n_fragmentos', type=int)
+    p.add_argument('diretorio')
+    p.add_argument('--skiprows', type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.comando == 'trabalhador':
+        chave = os.environ.get(VARIAVEL_CHAVE)
+        if not chave:
+            parser.error(f"defina a chave do coordenador em {VARIAVEL_CHAVE}")
+        trabalhador((args.host, args.porta), bytes.fromhex(chave))
+    elif args.comando == 'fragmenta':
+        for caminho in fragmenta_arquivo(args.arquivo, args.n_fragmentos, args.diretorio, args.skiprows):
+            print(caminho)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
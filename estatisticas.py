@@ -0,0 +1,330 @@
+# Estatísticas da análise exploratória calculadas em uma única passada pelas colunas.
+#
+# A análise exploratória (relatorio.py, seções 3 a 6) usa value_counts, unique, isnull().sum(),
+# Counter da renda, pivot_table por renda, describe, corr e um countplot com hue='income' por
+# variável: cada um percorre o DataFrame de novo. Aqui cada coluna é percorrida uma vez: um
+# pd.factorize e um np.bincount dão, para cada valor distinto (nan incluído), o número de
+# linhas em cada classe de renda e a primeira linha em que o valor aparece. Dessa tabela
+# saem as contagens, os valores únicos (na ordem de aparição), os faltantes e as tabelas
+# cruzadas com a renda; como as colunas numéricas do dataset são inteiras, também saem dela
+# o describe (com os quantis exatos), os histogramas e as médias por renda. As correlações
+# vêm da matriz de co-momentos das colunas numéricas, calculada com um único produto de matrizes.
+#
+# Todas as estatísticas podem ser somadas (junta): linhas acrescentadas ao fim do dataset
+# são processadas sozinhas e juntadas às estatísticas anteriores (atualiza). Os resultados
+# ficam em um cache em disco, indexado pela assinatura dos dados (hashes das linhas) e pela
+# versão do pré-processamento aplicado antes; para arquivos, se o arquivo apenas cresceu
+# desde a última leitura, só as linhas novas são lidas.
+
+import os
+import json
+import mmap
+import pickle
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from carregamento import colunas, carrega_adult, _pula_linhas, _le_bloco
+
+
+# Versão do formato das estatísticas; alterá-la invalida os caches gravados anteriormente.
+VERSAO = 1
+
+DIRETORIO = os.path.join('.cache', 'estatisticas')
+
+
+class Estatisticas:
+    """Contagens, tabelas por renda, momentos e correlações de um dataset, juntáveis.
+
+    est = Estatisticas().fit(data)
+    est.contagem('workclass'), est.por_renda('sex'), est.descreve(), est.correlacao()
+    est.atualiza(novas_linhas)
+    """
+
+    def __init__(self, alvo='income'):
+        self.alvo = alvo
+
+    def fit(self, data):
+        n = len(data)
+        self.colunas_ = list(data.columns)
+        self.numericas_ = [c for c in data.columns if c != self.alvo and pd.api.types.is_numeric_dtype(data[c])]
+        self.n_linhas_ = n
+        self.assinatura_ = assinatura(data)
+        if self.alvo in data.columns:
+            rotulos, classes = pd.factorize(data[self.alvo], use_na_sentinel=False)
+            self.classes_ = list(np.asarray(classes, dtype=object))
+        else:
+            rotulos, self.classes_ = np.zeros(n, dtype=np.intp), ['todas']
+        K = len(self.classes_)
+        self.tabelas_ = {c: _tabela(data[c], rotulos, K, self.classes_) for c in data.columns}
+        X = data[self.numericas_].to_numpy(dtype=np.float64)
+        X = X[~np.isnan(X).any(axis=1)]
+        self.n_completas_ = len(X)
+        self.medias_ = X.mean(axis=0) if len(X) else np.zeros(len(self.numericas_))
+        centrado = X - self.medias_
+        self.comomentos_ = centrado.T @ centrado
+        return self
+
+    def junta(self, outra):
+        """Soma as estatísticas de 'outra' (linhas que vêm depois das desta) a estas."""
+        if outra.colunas_ != self.colunas_:
+            raise ValueError('as estatísticas têm colunas diferentes')
+        deslocamento = self.n_linhas_
+        classes = self.classes_ + [c for c in outra.classes_ if c not in self.classes_]
+        for c in self.colunas_:
+            a = self.tabelas_[c].reindex(columns=classes + ['primeira'], fill_value=0)
+            b = outra.tabelas_[c].reindex(columns=classes + ['primeira'], fill_value=0)
+            b = b.assign(primeira=b['primeira'] + deslocamento)
+            juntas = pd.concat([a, b]).groupby(level=0, dropna=False, sort=False)
+            self.tabelas_[c] = juntas[classes].sum().join(juntas['primeira'].min())
+        self.classes_ = classes
+        # Junção dos co-momentos (Chan et al.).
+        n1, n2 = self.n_completas_, outra.n_completas_
+        if n2:
+            delta = outra.medias_ - self.medias_
+            n = n1 + n2
+            self.comomentos_ = self.comomentos_ + outra.comomentos_ + np.outer(delta, delta) * (n1 * n2 / n)
+            self.medias_ = self.medias_ + delta * (n2 / n)
+            self.n_completas_ = n
+        self.n_linhas_ += outra.n_linhas_
+        self.assinatura_ = junta_assinaturas(self.assinatura_, outra.assinatura_)
+        return self
+
+    def atualiza(self, data):
+        """Acrescenta linhas novas (que vêm depois das já contadas)."""
+        return self.junta(Estatisticas(self.alvo).fit(data))
+
+    # Consultas, no formato das funções do Pandas que substituem.
+
+    def contagem(self, coluna, dropna=True):
+        """Como data[coluna].value_counts()."""
+        tabela = self.tabelas_[coluna]
+        total = tabela[self.classes_].sum(axis=1)
+        if dropna:
+            total = total[total.index.notna()]
+        total = total[total > 0].sort_values(ascending=False, kind='stable')
+        return total.rename('count').rename_axis(coluna)
+
+    def unicos(self, coluna):
+        """Como data[coluna].unique(): valores distintos na ordem em que aparecem."""
+        return list(self.tabelas_[coluna]['primeira'].sort_values(kind='stable').index)
+
+    def faltantes(self):
+        """Como data.isnull().sum()."""
+        return pd.Series({c: int(t.loc[t.index.isna(), self.classes_].to_numpy().sum()) for c, t in self.tabelas_.items()})
+
+    def por_renda(self, coluna):
+        """Tabela cruzada valor x classe de renda (como pd.crosstab(data[coluna], data[alvo]))."""
+        tabela = self.tabelas_[coluna]
+        tabela = tabela.loc[tabela.index.notna(), self.classes_]
+        return tabela.sort_index().rename_axis(index=coluna, columns=self.alvo)
+
+    def _valores(self, coluna, classe=None):
+        # Valores distintos (ordenados, sem nan) e o número de linhas de cada um.
+        tabela = self.tabelas_[coluna]
+        tabela = tabela[tabela.index.notna()]
+        contagens = tabela[self.classes_].sum(axis=1) if classe is None else tabela[classe]
+        ordem = np.argsort(tabela.index.to_numpy(dtype=np.float64), kind='stable')
+        return tabela.index.to_numpy(dtype=np.float64)[ordem], contagens.to_numpy()[ordem]
+
+    def descreve(self, colunas=None):
+        """Como data[colunas].describe() para colunas numéricas."""
+        colunas = self.numericas_ if colunas is None else colunas
+        linhas = {}
+        for c in colunas:
+            valores, contagens = self._valores(c)
+            n = contagens.sum()
+            media = (valores * contagens).sum() / n
+            desvio = np.sqrt((contagens * (valores - media) ** 2).sum() / (n - 1)) if n > 1 else np.nan
+            q1, q2, q3 = quantis(valores, contagens, [0.25, 0.5, 0.75])
+            linhas[c] = [n, media, desvio, valores[0], q1, q2, q3, valores[-1]]
+        return pd.DataFrame(linhas, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'], dtype=np.float64)
+
+    def medias_por_renda(self, colunas=None):
+        """Como pd.pivot_table(data, index=[alvo], values=colunas)."""
+        colunas = self.numericas_ if colunas is None else colunas
+        medias = {}
+        for c in sorted(colunas):
+            medias[c] = {}
+            for classe in self.classes_:
+                valores, contagens = self._valores(c, classe)
+                medias[c][classe] = (valores * contagens).sum() / contagens.sum() if contagens.sum() else np.nan
+        return pd.DataFrame(medias).sort_index().rename_axis(self.alvo)
+
+    def correlacao(self, colunas=None):
+        """Como data[colunas].corr() (Pearson), nas linhas sem faltantes nas colunas numéricas."""
+        colunas = self.numericas_ if colunas is None else colunas
+        indices = [self.numericas_.index(c) for c in colunas]
+        C = self.comomentos_[np.ix_(indices, indices)]
+        desvios = np.sqrt(np.diag(C))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = C / np.outer(desvios, desvios)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(np.clip(corr, -1, 1), index=colunas, columns=colunas)
+
+    def histograma(self, coluna, bins=10, classe=None):
+        """Contagens e limites de bins faixas iguais entre o mínimo e o máximo (como np.histogram)."""
+        valores, contagens = self._valores(coluna, classe)
+        todos, _ = self._valores(coluna)
+        return np.histogram(valores, bins=bins, range=(todos[0], todos[-1]), weights=contagens)
+
+
+def _tabela(col, rotulos, K, classes):
+    # Uma passada pela coluna: linhas de cada classe e primeira linha de cada valor distinto.
+    codigos, valores = pd.factorize(col, use_na_sentinel=False)
+    m = len(valores)
+    contagens = np.bincount(codigos * K + rotulos, minlength=m * K).reshape(m, K)
+    primeira = np.empty(m, dtype=np.int64)
+    primeira[codigos[::-1]] = np.arange(len(codigos) - 1, -1, -1)
+    indice = pd.Index(np.asarray(valores, dtype=object if not pd.api.types.is_numeric_dtype(col) else None), name=col.name)
+    tabela = pd.DataFrame(contagens, index=indice, columns=classes)
+    tabela['primeira'] = primeira
+    return tabela
+
+
+def quantis(valores, contagens, qs):
+    """Quantis com interpolação linear (como Series.quantile) a partir de valores ordenados e contagens."""
+    acumulado = np.cumsum(contagens)
+    n = acumulado[-1]
+    resultado = []
+    for q in qs:
+        h = (n - 1) * q
+        baixo, alto = int(np.floor(h)), int(np.ceil(h))
+        v_baixo = valores[np.searchsorted(acumulado, baixo, side='right')]
+        v_alto = valores[np.searchsorted(acumulado, alto, side='right')]
+        resultado.append(v_baixo + (h - baixo) * (v_alto - v_baixo))
+    return resultado
+
+
+# Assinatura dos dados: número de linhas e duas somas (módulo 2**64) dos hashes das linhas,
+# uma delas ponderada pela posição. Pode ser estendida com linhas acrescentadas sem reler as anteriores.
+
+def assinatura(data, inicio=0):
+    hashes = pd.util.hash_pandas_object(data, index=False).to_numpy(dtype=np.uint64)
+    posicoes = np.arange(inicio + 1, inicio + len(hashes) + 1, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        return [len(hashes), int(hashes.sum(dtype=np.uint64)), int((hashes * posicoes).sum(dtype=np.uint64))]
+
+
+def junta_assinaturas(a, b):
+    # b foi calculada como se começasse na linha 0; desloca as posições para depois de a.
+    n = a[0] + b[0]
+    soma = (a[1] + b[1]) % (1 << 64)
+    ponderada = (a[2] + b[2] + a[0] * b[1]) % (1 << 64)
+    return [n, soma, ponderada]
+
+
+def chave(estatisticas_ou_data, versao='bruto'):
+    """Chave de cache: assinatura dos dados, versão do pré-processamento e versão do formato."""
+    sig = estatisticas_ou_data.assinatura_ if isinstance(estatisticas_ou_data, Estatisticas) else assinatura(estatisticas_ou_data)
+    h = hashlib.blake2b(json.dumps([sig, versao, VERSAO]).encode(), digest_size=16)
+    return h.hexdigest()
+
+
+def versao_pre(pre):
+    """Versão de um PreProcessamento ajustado: hash da configuração e das tabelas de agrupamento."""
+    estado = {'agrupamentos': {c: [[list(o), g] for o, g in v] for c, v in pre.agrupamentos.items()},
+              'padroes': pre.padroes, 'descartadas': list(pre.descartadas), 'limite_ganho': pre.limite_ganho,
+              'colunas': list(pre.colunas_),
+              'tabelas': {c: [list(map(str, pre.categorias_[c].categories)), pre.tabelas_[c].tolist()] for c in pre.tabelas_}}
+    return 'pre-' + hashlib.blake2b(json.dumps(estado, sort_keys=True, default=str).encode(), digest_size=8).hexdigest()
+
+
+def _le_pkl(caminho):
+    try:
+        with open(caminho, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def _grava_pkl(caminho, obj):
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, caminho)
+
+
+def estatisticas_cache(data, versao='bruto', diretorio=DIRETORIO, alvo='income'):
+    """Estatísticas de um DataFrame, lidas do cache se já tiverem sido calculadas.
+
+    versao identifica o pré-processamento aplicado aos dados ('bruto' ou versao_pre(pre)).
+    """
+    caminho = os.path.join(diretorio, f"{chave(data, versao)}.pkl")
+    est = _le_pkl(caminho)
+    if est is None:
+        est = Estatisticas(alvo).fit(data)
+        _grava_pkl(caminho, est)
+    return est
+
+
+def estatisticas_arquivo(caminho, skiprows=0, diretorio=None, alvo='income'):
+    """Estatísticas dos dados brutos de um arquivo no formato do dataset Adult, com cache.
+
+    Se o arquivo só cresceu desde a última chamada (os bytes lidos da outra vez não mudaram),
+    apenas as linhas novas são lidas e juntadas às estatísticas guardadas. O cache é indexado
+    pelo hash do conteúdo do arquivo junto com skiprows e alvo.
+    """
+    diretorio = diretorio or os.path.join(os.path.dirname(os.path.abspath(caminho)), '.cache', 'estatisticas')
+    indice_caminho = os.path.join(diretorio, 'indice.json')
+    try:
+        with open(indice_caminho) as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        indice = {}
+    nome = f"{os.path.abspath(caminho)}:s{skiprows}:{alvo}"
+    anterior = indice.get(nome)
+
+    with open(caminho, 'rb') as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if tamanho else b''
+    try:
+        est, h = _estatisticas_anteriores(buf, anterior, diretorio, skiprows, alvo)
+        if est is None:
+            h = _hash_arquivo(skiprows, alvo)
+            h.update(memoryview(buf))
+            est = _le_pkl(os.path.join(diretorio, f"{h.hexdigest()}.pkl"))
+            if est is None:
+                est = Estatisticas(alvo).fit(carrega_adult(caminho, skiprows=skiprows))
+    finally:
+        if tamanho:
+            buf.close()
+    digest = h.hexdigest()
+    _grava_pkl(os.path.join(diretorio, f"{digest}.pkl"), est)
+    indice[nome] = {'tamanho': tamanho, 'hash': digest}
+    tmp = f"{indice_caminho}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(indice, f)
+    os.replace(tmp, indice_caminho)
+    return est
+
+
+def _hash_arquivo(skiprows, alvo):
+    # blake2b iniciado com as opções de leitura: o mesmo arquivo lido com outro skiprows (ou
+    # outro alvo) tem outras estatísticas e outra entrada no cache.
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps({'skiprows': skiprows, 'alvo': alvo, 'versao': VERSAO}).encode())
+    return h
+
+
+def _estatisticas_anteriores(buf, anterior, diretorio, skiprows, alvo):
+    # Estatísticas guardadas de um prefixo do arquivo, atualizadas com as linhas novas, e o
+    # hash do arquivo inteiro; (None, None) se o arquivo não é uma extensão do lido antes.
+    if anterior is None or not 0 < anterior['tamanho'] <= len(buf):
+        return None, None
+    visto = anterior['tamanho']
+    h = _hash_arquivo(skiprows, alvo)
+    h.update(memoryview(buf)[:visto])
+    # A última linha lida precisa estar completa para que as novas comecem em uma linha nova.
+    if h.hexdigest() != anterior['hash'] or buf[visto - 1:visto] != b'\n':
+        return None, None
+    est = _le_pkl(os.path.join(diretorio, f"{anterior['hash']}.pkl"))
+    if est is None:
+        return None, None
+    if len(buf) > visto:
+        inicio = max(visto, _pula_linhas(buf, skiprows))
+        est.atualiza(_le_bloco(buf[inicio:], list(colunas)))
+        h.update(memoryview(buf)[visto:])
+    return est, h
@@ -0,0 +1,120 @@
+# Floresta aleatória treinada em vários processos com a matriz codificada compartilhada.
+#
+# Com o RandomForestClassifier(n_jobs=-1) em processos (ou com um pool de processos
+# qualquer), cada processo recebe a sua cópia da matriz codificada, e a memória cresce com
+# o número de núcleos. Aqui a matriz (float32, o tipo usado internamente pelo sklearn) e o
+# alvo são gravados uma única vez como .npy em /dev/shm (memória compartilhada; ou no
+# diretório temporário, se não existir) e cada processo os abre com
+# np.load(mmap_mode='r'): todos leem as mesmas páginas.
+#
+# Cada árvore sorteia as linhas do bootstrap como pesos (quantas vezes cada linha foi
+# sorteada, sample_weight) e os atributos de cada nó com max_features, sem copiar a
+# matriz. As sementes e o sorteio são os mesmos do RandomForestClassifier, de modo que,
+# com os mesmos parâmetros e random_state, as árvores são as mesmas.
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+
+# Diretório em memória para os buffers compartilhados, se existir.
+DIRETORIO_COMPARTILHADO = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+class FlorestaCompartilhada:
+    """Floresta de DecisionTreeClassifier treinada em n_jobs processos com X e y compartilhados.
+
+    Mesmos parâmetros principais do RandomForestClassifier. estimators_ e classes_ seguem o
+    mesmo formato, de modo que a floresta pode ser usada no ModeloRenda e gravada como
+    artefato (artefato.salva_artefato).
+    """
+
+    def __init__(self, n_estimators=300, max_depth=None, min_samples_leaf=1, max_features='sqrt',
+                 criterion='gini', bootstrap=True, n_jobs=-1, random_state=None):
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.max_features = max_features
+        self.criterion = criterion
+        self.bootstrap = bootstrap
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        self.classes_, codigos = np.unique(y, return_inverse=True)
+        self.n_features_in_ = X.shape[1]
+        # Mesmas sementes do RandomForestClassifier: uma por árvore, sorteadas em sequência.
+        rng = np.random.RandomState(self.random_state) if not isinstance(self.random_state, np.random.RandomState) else self.random_state
+        sementes = [int(s) for s in rng.randint(np.iinfo(np.int32).max, size=self.n_estimators)]
+        parametros = dict(max_depth=self.max_depth, min_samples_leaf=self.min_samples_leaf,
+                          max_features=self.max_features, criterion=self.criterion)
+        n_jobs = self.n_jobs if self.n_jobs and self.n_jobs > 0 else (os.cpu_count() or 1)
+        n_jobs = min(n_jobs, self.n_estimators)
+        diretorio = tempfile.mkdtemp(prefix='floresta-', dir=DIRETORIO_COMPARTILHADO)
+        try:
+            compartilha(X, codigos, diretorio)
+            lotes = [(sementes[i::n_jobs], parametros, self.bootstrap) for i in range(n_jobs)]
+            if n_jobs == 1:
+                _abre(diretorio)
+                resultados = [_treina_lote(lotes[0])]
+            else:
+                with ProcessPoolExecutor(n_jobs, initializer=_abre, initargs=(diretorio,)) as pool:
+                    resultados = list(pool.map(_treina_lote, lotes))
+        finally:
+            shutil.rmtree(diretorio, ignore_errors=True)
+        # Volta à ordem das sementes (o lote i tem as árvores i, i + n_jobs, ...).
+        self.estimators_ = [None] * self.n_estimators
+        for i, arvores in enumerate(resultados):
+            self.estimators_[i::n_jobs] = arvores
+        return self
+
+    def predict_proba(self, X):
+        X = _float32(X)
+        return np.mean([arvore.predict_proba(X) for arvore in self.estimators_], axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def compartilha(X, codigos, diretorio):
+    """Grava a matriz (float32 densa) e os códigos do alvo como .npy em 'diretorio'."""
+    np.save(os.path.join(diretorio, 'X.npy'), _float32(X))
+    np.save(os.path.join(diretorio, 'y.npy'), codigos.astype(np.float64))
+
+
+# Matriz e alvo abertos em cada processo (por _abre).
+_X = None
+_y = None
+
+
+def _abre(diretorio):
+    global _X, _y
+    _X = np.load(os.path.join(diretorio, 'X.npy'), mmap_mode='r')
+    _y = np.load(os.path.join(diretorio, 'y.npy'), mmap_mode='r')
+
+
+def _treina_lote(lote):
+    from sklearn.tree import DecisionTreeClassifier
+
+    sementes, parametros, bootstrap = lote
+    n = _X.shape[0]
+    arvores = []
+    for semente in sementes:
+        arvore = DecisionTreeClassifier(random_state=semente, **parametros)
+        pesos = None
+        if bootstrap:
+            # Mesmo sorteio do RandomForestClassifier (_generate_sample_indices).
+            linhas = np.random.RandomState(semente).randint(0, n, n, dtype=np.int32)
+            pesos = np.bincount(linhas, minlength=n).astype(np.float64)
+        arvores.append(arvore.fit(_X, _y, sample_weight=pesos))
+    return arvores
+
+
+def _float32(X):
+    if sparse.issparse(X):
+        X = X.toarray()
+    return np.ascontiguousarray(X, dtype=np.float32)
@@ -0,0 +1,461 @@
+# Árvore de decisão e floresta treinadas sobre atributos discretizados em histogramas.
+#
+# Depois do pré-processamento quase todos os atributos têm domínios pequenos (age de 17 a
+# 90, education-num de 1 a 16, hours-per-week de 1 a 99 e dummies 0/1); apenas o
+# capital-gain combinado é largo. Em vez de ordenar as colunas float64 em cada nó, como o
+# DecisionTreeClassifier(splitter='best'), cada atributo é discretizado uma única vez em
+# até 256 faixas (uint8). Em cada nó, os cortes são procurados em histogramas de contagem
+# por classe de cada atributo; o histograma do filho maior é obtido pela subtração
+# pai - irmão, de modo que apenas o filho menor percorre as linhas.
+#
+# Os atributos sorteados em cada nó (max_features) vêm de um gerador próprio do nó, criado a
+# partir da semente do pai (SeedSequence.spawn) quando ele é cortado: a árvore não depende da
+# ordem em que os nós são expandidos (em profundidade aqui, nível a nível em distribuido.py).
+#
+# O limiar de cada corte é, como no sklearn, o ponto médio entre o maior valor à esquerda e o
+# menor valor à direita presentes no nó, e os nós são numerados em pré-ordem, como no
+# DepthFirstTreeBuilder. A árvore ajustada é exposta no mesmo formato do atributo tree_ do
+# sklearn (children_left, children_right, feature, threshold, value, node_count, max_depth):
+# pode ser usada no ModeloRenda, gravada como artefato (artefato.salva_artefato) e compilada
+# (compilacao.compila).
+#
+# Diferenças esperadas em relação ao DecisionTreeClassifier(splitter='best'), mesmo com
+# max_features=None:
+#   - empates: quando dois cortes têm o mesmo custo, o sklearn fica com o primeiro na ordem
+#     de um sorteio interno dos atributos, que não é reproduzido aqui. No adult.data, com
+#     max_depth=8, 3 dos 109 nós internos cortam por outro atributo de mesmo custo, e a
+#     previsão difere em 1 das 16281 linhas do adult.test; sem limite de profundidade, 547
+#     nós (todos empates exatos, em nós de poucas linhas) e 1,8% das previsões do adult.test;
+#   - atributos com mais de max_faixas valores distintos são cortados apenas entre faixas
+#     de quantis, e os limiares usam os extremos da faixa no treino todo, não no nó.
+
+import numpy as np
+from scipy import sparse
+
+
+# Número máximo de faixas por atributo (o código da faixa cabe em um uint8).
+MAX_FAIXAS = 256
+
+# Nós com até este número de (linhas x atributos) têm o histograma calculado num único bincount.
+LIMITE_LOTE = 1 << 18
+
+
+class Discretizador:
+    """Converte cada atributo no código (uint8) da sua faixa.
+
+    Atributos com até max_faixas valores distintos recebem uma faixa por valor; os demais,
+    faixas por quantis. limites_[j] guarda os limiares entre faixas consecutivas do
+    atributo j: a faixa de x é o número de limiares menores que x, de modo que
+    'faixa <= i' equivale a 'x <= limites_[j][i]'. minimos_[j] e maximos_[j] guardam o
+    menor e o maior valor do treino em cada faixa (o próprio valor, nas faixas de um valor).
+    """
+
+    def __init__(self, max_faixas=MAX_FAIXAS):
+        if not 2 <= max_faixas <= MAX_FAIXAS:
+            raise ValueError(f"max_faixas deve estar entre 2 e {MAX_FAIXAS}, não {max_faixas}")
+        self.max_faixas = max_faixas
+
+    def fit(self, X):
+        self._ajusta(X)
+        return self
+
+    def transform(self, X):
+        """Matriz de faixas (n_atributos x n_linhas, uint8): cada atributo é contíguo."""
+        colunas = list(_colunas(X))
+        faixas = np.empty((len(colunas), len(colunas[0]) if colunas else 0), dtype=np.uint8)
+        for j, col in enumerate(colunas):
+            faixas[j] = np.searchsorted(self.limites_[j], col, side='left')
+        return faixas
+
+    def fit_transform(self, X):
+        # Uma única passada por coluna: os limiares e as faixas do treino.
+        faixas = np.empty((X.shape[1], X.shape[0]), dtype=np.uint8)
+        self._ajusta(X, faixas)
+        return faixas
+
+    def _ajusta(self, X, faixas=None):
+        self.limites_, self.minimos_, self.maximos_ = [], [], []
+        for j, col in enumerate(_colunas(X)):
+            inteiros = _inteiros(col)
+            if inteiros is not None:
+                # Atributos inteiros de faixa curta (quase todos, após o pré-processamento):
+                # valores presentes contados com bincount, sem ordenar a coluna.
+                menor, deslocada = inteiros
+                presentes = np.bincount(deslocada) > 0
+                valores = np.flatnonzero(presentes) + menor
+            else:
+                valores = np.unique(col)
+            distintos = valores
+            por_quantis = len(valores) > self.max_faixas
+            if por_quantis:
+                quantis = np.quantile(col, np.linspace(0, 1, self.max_faixas + 1)[1:-1], method='lower')
+                valores = np.unique(np.append(quantis, valores[-1]))
+            # Pontos médios entre valores consecutivos, como os limiares do sklearn.
+            limites = (valores[:-1] + valores[1:]) / 2
+            self.limites_.append(limites)
+            minimos, maximos = extremos_faixas(distintos, limites)
+            self.minimos_.append(minimos)
+            self.maximos_.append(maximos)
+            if faixas is None:
+                continue
+            if inteiros is not None and not por_quantis:
+                # Faixa de cada valor = número de valores presentes menores que ele.
+                faixas[j] = (np.cumsum(presentes) - 1).astype(np.uint8)[deslocada]
+            else:
+                faixas[j] = np.searchsorted(limites, col, side='left')
+
+
+def limites_contagens(valores, contagens, max_faixas=MAX_FAIXAS):
+    """Limiares do Discretizador de uma coluna dada pelos valores distintos (em ordem) e as suas contagens.
+
+    Mesmo resultado do Discretizador.fit sobre a coluna completa (inclusive os quantis
+    'lower'); permite discretizar uma coluna espalhada em vários fragmentos (distribuido.py).
+    """
+    if len(valores) > max_faixas:
+        n = contagens.sum()
+        posicoes = np.floor((n - 1) * np.linspace(0, 1, max_faixas + 1)[1:-1]).astype(np.intp)
+        quantis = valores[np.searchsorted(np.cumsum(contagens), posicoes, side='right')]
+        valores = np.unique(np.append(quantis, valores[-1]))
+    return (valores[:-1] + valores[1:]) / 2
+
+
+def extremos_faixas(valores, limites):
+    """Menor e maior dos valores distintos (em ordem) de uma coluna em cada faixa definida por 'limites'."""
+    fronteiras = np.searchsorted(valores, limites, side='right')
+    return valores[np.concatenate([[0], fronteiras])], valores[np.concatenate([fronteiras, [len(valores)]]) - 1]
+
+
+def limiar_corte(contagens_faixas, faixa, minimos, maximos):
+    """Limiar do corte 'faixa <= faixa' de um atributo em um nó, dadas as contagens de cada faixa no nó.
+
+    Como no sklearn, é o ponto médio entre o maior valor à esquerda e o menor valor à
+    direita presentes no nó, e não entre valores vizinhos no treino todo: a faixa seguinte
+    com linhas no nó pode não ser a faixa + 1. Nas faixas por quantis, os extremos são os
+    da faixa no treino todo.
+    """
+    seguinte = faixa + 1 + np.flatnonzero(contagens_faixas[faixa + 1:] > 0)[0]
+    return (maximos[faixa] + minimos[seguinte]) / 2
+
+
+class EstruturaArvore:
+    """Vetores de nós no formato do atributo tree_ do sklearn."""
+
+    def __init__(self, children_left, children_right, feature, threshold, value, faixa):
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        # Limiar em código de faixa, usado na previsão sobre a matriz discretizada.
+        self.faixa = faixa
+        self.node_count = len(children_left)
+        self.max_depth = _profundidade(children_left, children_right)
+
+
+class ArvoreHistograma:
+    """Árvore de decisão (classificação) com busca de cortes em histogramas.
+
+    Mesmos parâmetros principais do DecisionTreeClassifier: max_depth, min_samples_split,
+    min_samples_leaf, max_features (None, 'sqrt', 'log2', int ou fração) e random_state;
+    criterion 'gini' ou 'entropy'. min_samples_leaf é comparado com o peso das linhas.
+    """
+
+    def __init__(self, max_depth=None, min_samples_split=2, min_samples_leaf=1, max_features=None,
+                 criterion='gini', max_faixas=MAX_FAIXAS, random_state=None):
+        self.max_depth = max_depth
+        self.min_samples_split = min_samples_split
+        self.min_samples_leaf = min_samples_leaf
+        self.max_features = max_features
+        self.criterion = criterion
+        self.max_faixas = max_faixas
+        self.random_state = random_state
+
+    def fit(self, X, y, sample_weight=None):
+        self.discretizador_ = Discretizador(self.max_faixas)
+        return self.fit_faixas(self.discretizador_.fit_transform(X), y, sample_weight)
+
+    def fit_faixas(self, faixas, y, sample_weight=None, discretizador=None):
+        """Ajusta a árvore sobre uma matriz já discretizada (Discretizador.transform).
+
+        Usado pela floresta, que discretiza os dados uma única vez para todas as árvores.
+        """
+        if discretizador is not None:
+            self.discretizador_ = discretizador
+        classes, codigos = np.unique(y, return_inverse=True)
+        return self._fit_chaves(_chaves(faixas, codigos, len(classes)), classes, sample_weight)
+
+    def _fit_chaves(self, chaves, classes, sample_weight=None):
+        self.classes_ = classes
+        self.n_features_in_ = chaves.shape[0]
+        self.tree_ = _cresce(chaves, len(classes), sample_weight, self.discretizador_, self._parametros(),
+                             np.random.SeedSequence(self.random_state))
+        return self
+
+    def _parametros(self):
+        if self.criterion not in _criterios:
+            raise ValueError(f"criterion deve ser um de {sorted(_criterios)}, não {self.criterion!r}")
+        return {
+            'max_depth': np.inf if self.max_depth is None else self.max_depth,
+            'min_samples_split': self.min_samples_split,
+            'min_samples_leaf': self.min_samples_leaf,
+            'max_features': _n_atributos(self.max_features, self.n_features_in_),
+            'impureza': _criterios[self.criterion],
+        }
+
+    def proba_faixas(self, faixas):
+        return self._proba(self.nos_faixas(faixas))
+
+    def nos_faixas(self, faixas):
+        """Folha alcançada por cada linha da matriz discretizada (as linhas do treino)."""
+        return _percorre(self.tree_, faixas, self.tree_.faixa)
+
+    def nos_colunas(self, colunas):
+        """Folha alcançada por cada linha, comparando os valores (atributos x linhas) com os limiares do tree_.
+
+        Os limiares ficam entre os valores presentes em cada nó no treino; um valor novo que
+        caia entre eles pode estar em outra faixa do Discretizador.
+        """
+        return _percorre(self.tree_, colunas, self.tree_.threshold)
+
+    def _proba(self, nos):
+        valores = self.tree_.value[nos, 0, :]
+        return valores / valores.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, X):
+        return self._proba(self.nos_colunas(_matriz_colunas(X)))
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class FlorestaHistograma:
+    """Floresta aleatória de ArvoreHistograma, com a discretização feita uma única vez.
+
+    O bootstrap é feito com pesos (quantas vezes cada linha foi sorteada), sem copiar a
+    matriz; cada árvore sorteia max_features atributos em cada nó, como o
+    RandomForestClassifier.
+    """
+
+    def __init__(self, n_estimators=100, max_depth=None, min_samples_split=2, min_samples_leaf=1,
+                 max_features='sqrt', criterion='gini', bootstrap=True, max_faixas=MAX_FAIXAS, random_state=None):
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.min_samples_split = min_samples_split
+        self.min_samples_leaf = min_samples_leaf
+        self.max_features = max_features
+        self.criterion = criterion
+        self.bootstrap = bootstrap
+        self.max_faixas = max_faixas
+        self.random_state = random_state
+
+    def fit(self, X, y, sample_weight=None):
+        self.discretizador_ = Discretizador(self.max_faixas)
+        faixas = self.discretizador_.fit_transform(X)
+        self.classes_, codigos = np.unique(y, return_inverse=True)
+        chaves = _chaves(faixas, codigos, len(self.classes_))
+        n = faixas.shape[1]
+        rng = np.random.default_rng(self.random_state)
+        self.estimators_ = []
+        for semente in rng.integers(np.iinfo(np.int32).max, size=self.n_estimators):
+            arvore = ArvoreHistograma(self.max_depth, self.min_samples_split, self.min_samples_leaf,
+                                      self.max_features, self.criterion, self.max_faixas, random_state=semente)
+            arvore.discretizador_ = self.discretizador_
+            pesos = sample_weight
+            if self.bootstrap:
+                pesos = np.bincount(np.random.default_rng(semente).integers(n, size=n), minlength=n).astype(np.float64)
+                if sample_weight is not None:
+                    pesos *= sample_weight
+            self.estimators_.append(arvore._fit_chaves(chaves, self.classes_, pesos))
+        self.n_features_in_ = faixas.shape[0]
+        return self
+
+    def predict_proba(self, X):
+        colunas = _matriz_colunas(X)
+        return np.mean([arvore._proba(arvore.nos_colunas(colunas)) for arvore in self.estimators_], axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _gini(contagens, total):
+    p = contagens / np.maximum(total, 1e-300)[..., None]
+    return 1.0 - (p * p).sum(axis=-1)
+
+
+def _entropia(contagens, total):
+    p = contagens / np.maximum(total, 1e-300)[..., None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        termos = np.where(p > 0, p * np.log2(p), 0.0)
+    return -termos.sum(axis=-1)
+
+
+_criterios = {'gini': _gini, 'entropy': _entropia}
+
+
+def _n_atributos(max_features, n):
+    if max_features is None:
+        return n
+    if max_features == 'sqrt':
+        return max(1, int(np.sqrt(n)))
+    if max_features == 'log2':
+        return max(1, int(np.log2(n)))
+    if isinstance(max_features, float):
+        return max(1, int(max_features * n))
+    return min(int(max_features), n)
+
+
+def _colunas(X):
+    # Percorre as colunas de uma matriz densa ou esparsa como vetores float64 densos.
+    if sparse.issparse(X):
+        X = X.tocsc()
+        for j in range(X.shape[1]):
+            yield X[:, j].toarray().ravel()
+    else:
+        X = np.asarray(X)
+        for j in range(X.shape[1]):
+            yield X[:, j].astype(np.float64)
+
+
+def _matriz_colunas(X):
+    # Matriz (atributos x linhas) float64: cada atributo é contíguo, como na matriz de faixas.
+    colunas = list(_colunas(X))
+    return np.array(colunas) if colunas else np.empty((0, X.shape[0]))
+
+
+def _percorre(arvore, matriz, limiares):
+    # Folha de cada linha, descendo um nível por vez: vai à esquerda se matriz[atributo, linha] <= limiar do nó.
+    no = np.zeros(matriz.shape[1], dtype=np.intp)
+    linhas = np.arange(matriz.shape[1])
+    for _ in range(arvore.max_depth):
+        interno = arvore.children_left[no] != -1
+        if not interno.any():
+            break
+        atributo = np.where(interno, arvore.feature[no], 0)
+        vai_esq = matriz[atributo, linhas] <= limiares[no]
+        no = np.where(interno, np.where(vai_esq, arvore.children_left[no], arvore.children_right[no]), no)
+    return no
+
+
+def _inteiros(col):
+    # (menor valor, coluna - menor como intp) se a coluna só tem inteiros numa faixa curta.
+    if len(col) == 0:
+        return None
+    menor, maior = col.min(), col.max()
+    if maior - menor > 1 << 20 or not np.array_equal(col, np.floor(col)):
+        return None
+    return menor, (col - menor).astype(np.intp)
+
+
+def _chaves(faixas, codigos, n_classes):
+    # faixa * n_classes + classe de cada linha, calculado uma vez por ajuste: em cada nó o
+    # histograma de um atributo é um único bincount sobre estas chaves.
+    tipo = np.uint16 if MAX_FAIXAS * n_classes <= 1 << 16 else np.uint32
+    chaves = faixas.astype(tipo)
+    chaves *= n_classes
+    chaves += codigos.astype(tipo)
+    return chaves
+
+
+def _histograma(chaves, pesos, linhas, n_classes):
+    """Contagem (ou peso) de cada classe em cada faixa de cada atributo: (atributos, 256, classes)."""
+    n_atributos = chaves.shape[0]
+    tamanho = MAX_FAIXAS * n_classes
+    p = None if pesos is None else pesos[linhas]
+    if len(linhas) * n_atributos <= LIMITE_LOTE:
+        # Nós pequenos: um único bincount para todos os atributos.
+        deslocadas = chaves[:, linhas] + (np.arange(n_atributos) * tamanho)[:, None]
+        hist = np.bincount(deslocadas.ravel(), weights=None if p is None else np.tile(p, n_atributos),
+                           minlength=n_atributos * tamanho)
+        return hist.reshape(n_atributos, MAX_FAIXAS, n_classes).astype(np.float64)
+    hist = np.empty((n_atributos, MAX_FAIXAS, n_classes))
+    for j in range(n_atributos):
+        hist[j] = np.bincount(chaves[j, linhas], weights=p, minlength=tamanho).reshape(MAX_FAIXAS, n_classes)
+    return hist
+
+
+def _melhor_corte(hist, atributos, params):
+    """Melhor (atributo, faixa) entre 'atributos', ou None se nenhum corte for válido."""
+    h = hist[atributos]
+    esq = np.cumsum(h, axis=1)[:, :-1, :]
+    total = h[0].sum(axis=0)
+    dir_ = total - esq
+    n_esq, n_dir = esq.sum(axis=-1), dir_.sum(axis=-1)
+    # Só faixas não vazias no nó: cortes em faixas vazias repetiriam a mesma partição.
+    validos = (h[:, :-1, :].sum(axis=-1) > 0) & (n_esq >= params['min_samples_leaf']) & (n_dir >= params['min_samples_leaf'])
+    validos &= (n_esq > 0) & (n_dir > 0)
+    if not validos.any():
+        return None
+    impureza = params['impureza']
+    custo = n_esq * impureza(esq, n_esq) + n_dir * impureza(dir_, n_dir)
+    custo = np.where(validos, custo, np.inf)
+    k, faixa = np.unravel_index(np.argmin(custo), custo.shape)
+    return atributos[k], faixa
+
+
+def escolhe_corte(hist, contagens, n_linhas, profundidade, semente, params):
+    """Corte (atributo, faixa) de um nó a partir do seu histograma, ou None se o nó for folha.
+
+    semente: SeedSequence do nó, de onde sai a ordem de sorteio dos atributos.
+    """
+    if (profundidade >= params['max_depth'] or n_linhas < params['min_samples_split']
+            or np.count_nonzero(contagens) <= 1):
+        return None
+    n_atributos = hist.shape[0]
+    ordem = np.random.default_rng(semente).permutation(n_atributos)
+    k = params['max_features']
+    corte = _melhor_corte(hist, ordem[:k], params)
+    # Como o sklearn, continua procurando nos demais atributos se nenhum dos sorteados
+    # permite um corte (por ex., todos constantes no nó).
+    while corte is None and k < n_atributos:
+        corte = _melhor_corte(hist, ordem[k:k + params['max_features']], params)
+        k += params['max_features']
+    return corte
+
+
+def _cresce(chaves, n_classes, pesos, discretizador, params, semente):
+    # Em profundidade, como o DepthFirstTreeBuilder do sklearn: cada nó é numerado ao sair da
+    # pilha (em pré-ordem, a esquerda antes da direita) e ligado ao pai nesse momento.
+    esquerda, direita, atributo, limiar, faixa_no, valor = [], [], [], [], [], []
+    raiz_linhas = np.flatnonzero(pesos > 0) if pesos is not None else np.arange(chaves.shape[1])
+    pilha = [(-1, None, raiz_linhas, _histograma(chaves, pesos, raiz_linhas, n_classes), 0, semente)]
+    while pilha:
+        pai, lado, linhas, hist, profundidade, semente = pilha.pop()
+        no = len(esquerda)
+        esquerda.append(-1)
+        direita.append(-1)
+        atributo.append(-2)
+        limiar.append(-2.0)
+        faixa_no.append(0)
+        valor.append(hist[0].sum(axis=0))
+        if pai >= 0:
+            lado[pai] = no
+        corte = escolhe_corte(hist, valor[no], len(linhas), profundidade, semente, params)
+        if corte is None:
+            continue
+        j, f = corte
+        vai_esq = chaves[j, linhas] < (f + 1) * n_classes
+        linhas_esq, linhas_dir = linhas[vai_esq], linhas[~vai_esq]
+        # Apenas o filho com menos linhas é recontado; o outro é pai - irmão.
+        if len(linhas_esq) <= len(linhas_dir):
+            hist_esq = _histograma(chaves, pesos, linhas_esq, n_classes)
+            hist_dir = hist - hist_esq
+        else:
+            hist_dir = _histograma(chaves, pesos, linhas_dir, n_classes)
+            hist_esq = hist - hist_dir
+        atributo[no], faixa_no[no] = int(j), int(f)
+        limiar[no] = float(limiar_corte(hist[j].sum(axis=-1), f, discretizador.minimos_[j], discretizador.maximos_[j]))
+        semente_esq, semente_dir = semente.spawn(2)
+        pilha.append((no, direita, linhas_dir, hist_dir, profundidade + 1, semente_dir))
+        pilha.append((no, esquerda, linhas_esq, hist_esq, profundidade + 1, semente_esq))
+    return EstruturaArvore(np.array(esquerda, dtype=np.intp), np.array(direita, dtype=np.intp),
+                           np.array(atributo, dtype=np.intp), np.array(limiar), np.array(valor)[:, None, :],
+                           np.array(faixa_no, dtype=np.intp))
+
+
+def _profundidade(esquerda, direita):
+    profundidade = np.zeros(len(esquerda), dtype=np.intp)
+    # Os filhos sempre têm índice maior que o pai.
+    for no in range(len(esquerda)):
+        if esquerda[no] != -1:
+            profundidade[esquerda[no]] = profundidade[direita[no]] = profundidade[no] + 1
+    return int(profundidade.max()) if len(profundidade) else 0
@@ -0,0 +1,181 @@
+# Importância dos atributos por permutação, em lote, sobre a matriz codificada.
+#
+# O permutation_importance do sklearn (e o laço equivalente com DataFrames) copia a matriz
+# inteira e chama o predict uma vez por atributo e por repetição. Aqui:
+#   - o conjunto (por ex., o adult.test) é limpo e codificado uma única vez, como matriz
+#     densa float32;
+#   - com árvores (a árvore de decisão, a floresta ou as de histograma.py), só as colunas
+#     em que alguma árvore faz um corte podem mudar a previsão: os atributos não usados têm
+#     importância exatamente zero, sem nenhuma previsão; a matriz ainda é reduzida a essas
+#     colunas e as árvores são percorridas por inferencia.InferenciaEmLote com os índices
+#     remapeados;
+#   - as n_repeticoes permutações de um atributo são avaliadas em uma única chamada: as
+#     cópias da matriz reduzida são empilhadas e apenas a coluna permutada (ou as colunas
+#     de um grupo, com por_coluna=True) é reescrita com os índices da permutação;
+#   - os atributos são avaliados em paralelo em threads (o NumPy libera o GIL nos gathers
+#     da inferência).
+# A métrica de cada repetição vem de validacao.Metricas (matriz de confusão e histograma
+# das probabilidades), e o intervalo de confiança da queda média usa a distribuição t.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from validacao import Metricas, metricas
+
+
+N_REPETICOES = 5
+CONFIANCA = 0.95
+# Maior número de valores da matriz empilhada avaliados de uma vez (as repetições de um
+# atributo são divididas em grupos abaixo deste limite).
+MAX_VALORES = 1 << 24
+
+
+def colunas_usadas(estimador):
+    """Índices das colunas da matriz em que alguma árvore do estimador faz um corte (None se não for árvore)."""
+    arvores = _arvores(estimador)
+    if arvores is None:
+        return None
+    usados = set()
+    for arvore in arvores:
+        usados.update(int(f) for f in arvore.feature[arvore.children_left != -1])
+    return sorted(usados)
+
+
+def _arvores(estimador):
+    if hasattr(estimador, 'tree_'):
+        return [estimador.tree_]
+    if hasattr(estimador, 'estimators_') and all(hasattr(e, 'tree_') for e in estimador.estimators_):
+        return [e.tree_ for e in estimador.estimators_]
+    return None
+
+
+def _preditor(estimador, usados, n_atributos):
+    # (colunas da matriz empilhada, função matriz -> proba). As árvores são percorridas pelo
+    # InferenciaEmLote só nas colunas usadas; os demais estimadores recebem todas as colunas
+    # no próprio predict_proba.
+    from inferencia import InferenciaEmLote
+
+    arvores = _arvores(estimador)
+    if arvores is None:
+        return list(range(n_atributos)), estimador.predict_proba
+    from artefato import vetores_arvores
+
+    vetores = vetores_arvores(arvores)
+    local = np.full(n_atributos, -1)
+    local[usados] = np.arange(len(usados))
+    interno = vetores['atributo'] != -1
+    vetores['atributo'] = np.where(interno, local[np.where(interno, vetores['atributo'], 0)], -1).astype(vetores['atributo'].dtype)
+    motor = InferenciaEmLote(vetores, max(a.max_depth for a in arvores), n_threads=1)
+    return usados, motor.proba_matriz
+
+
+class ImportanciaPermutacao:
+    """Queda da métrica quando cada atributo (coluna da matriz codificada) é permutado.
+
+    importancia = ImportanciaPermutacao(n_repeticoes=10).fit(modelo, test)
+    importancia.resumo()      # DataFrame ordenado pela importância, com o intervalo de confiança
+
+    modelo: ModeloRenda ajustado; data: dataset bruto (carrega_adult), limpo com
+    pre.limpa(..., remove_outliers=False) como na avaliação. Com por_coluna=True, os dummies
+    de cada coluna original são permutados juntos (a mesma permutação de linhas), e a
+    importância é a da coluna original.
+
+    Depois do fit: nomes_ (atributos ou colunas), base_ (métrica sem permutação) e
+    importancias_ (n_atributos x n_repeticoes, queda da métrica em cada repetição).
+    """
+
+    def __init__(self, n_repeticoes=N_REPETICOES, metrica='acuracia', por_coluna=False, n_jobs=None,
+                 random_state=42, confianca=CONFIANCA):
+        if metrica not in metricas:
+            raise ValueError(f"metrica deve ser uma de {metricas}, não {metrica!r}")
+        self.n_repeticoes = n_repeticoes
+        self.metrica = metrica
+        self.por_coluna = por_coluna
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.confianca = confianca
+
+    def fit(self, modelo, data):
+        limpo = modelo.pre.transform(modelo.pre.limpa(data, remove_outliers=False))
+        X = modelo.codificador.transform(limpo, formato='denso', dtype=np.float32)
+        y = modelo.codificador.transforma_alvo(limpo)
+        return self.fit_matriz(modelo.estimador, X, y, modelo.codificador)
+
+    def fit_matriz(self, estimador, X, y, codificador):
+        """Como o fit, para uma matriz já codificada por 'codificador' e o alvo binário y."""
+        n, m = X.shape
+        grupos = _grupos(codificador, self.por_coluna)
+        self.nomes_ = list(grupos)
+        usados = colunas_usadas(estimador)
+        if usados is None:
+            usados = list(range(m))
+        self.colunas_usadas_ = [codificador.nomes_[j] for j in usados]
+        cortes = set(usados)
+        pilha, proba = _preditor(estimador, usados, m)
+        local = {j: i for i, j in enumerate(pilha)}
+        Xu = np.ascontiguousarray(X[:, pilha], dtype=np.float32)
+        self.base_ = self._pontua(y, proba(Xu))
+
+        # Cada atributo sorteia as suas permutações com uma semente própria: o resultado não
+        # depende da ordem em que as threads avaliam os atributos.
+        sementes = np.random.SeedSequence(self.random_state).spawn(len(self.nomes_))
+        self.importancias_ = np.zeros((len(self.nomes_), self.n_repeticoes))
+
+        def avalia(i):
+            # Atributos em que nenhuma árvore faz um corte ficam com importância zero.
+            colunas = [local[j] for j in grupos[self.nomes_[i]] if j in cortes]
+            if colunas:
+                rng = np.random.default_rng(sementes[i])
+                self.importancias_[i] = self.base_ - self._permutadas(Xu, y, proba, colunas, rng)
+
+        n_jobs = self.n_jobs or os.cpu_count() or 1
+        if n_jobs > 1:
+            with ThreadPoolExecutor(n_jobs) as executor:
+                list(executor.map(avalia, range(len(self.nomes_))))
+        else:
+            for i in range(len(self.nomes_)):
+                avalia(i)
+        return self
+
+    def _permutadas(self, Xu, y, proba, colunas, rng):
+        # Métrica em cada repetição: as cópias permutadas são avaliadas em grupos empilhados.
+        n = len(Xu)
+        por_grupo = max(1, MAX_VALORES // max(Xu.size, 1))
+        pontos = []
+        for inicio in range(0, self.n_repeticoes, por_grupo):
+            grupo = min(por_grupo, self.n_repeticoes - inicio)
+            pilha = np.tile(Xu, (grupo, 1))
+            for r in range(grupo):
+                pilha[r * n:(r + 1) * n, colunas] = Xu[np.ix_(rng.permutation(n), colunas)]
+            p = proba(pilha)
+            pontos += [self._pontua(y, p[r * n:(r + 1) * n]) for r in range(grupo)]
+        return np.array(pontos)
+
+    def _pontua(self, y, proba):
+        return getattr(Metricas.de_previsoes(y, proba), self.metrica)
+
+    def resumo(self):
+        """DataFrame com a importância média, o desvio e o intervalo de confiança de cada atributo."""
+        from scipy import stats
+
+        media = self.importancias_.mean(axis=1)
+        desvio = self.importancias_.std(axis=1, ddof=1) if self.n_repeticoes > 1 else np.zeros(len(media))
+        margem = stats.t.ppf((1 + self.confianca) / 2, max(self.n_repeticoes - 1, 1)) * desvio / np.sqrt(self.n_repeticoes)
+        resumo = pd.DataFrame({'atributo': self.nomes_, 'importancia': media, 'desvio': desvio,
+                               'ic_inferior': media - margem, 'ic_superior': media + margem})
+        return resumo.sort_values('importancia', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _grupos(codificador, por_coluna):
+    # nome -> colunas da matriz permutadas juntas.
+    if not por_coluna:
+        return {nome: [j] for j, nome in enumerate(codificador.nomes_)}
+    grupos = {c: [j] for j, c in enumerate(codificador.numericas_)}
+    for c in codificador.categoricas_:
+        inicio = 1 if codificador.drop_first else 0
+        n_categorias = len(codificador.vocabulario_[c].categories)
+        grupos[c] = [codificador.deslocamentos_[c] + k for k in range(inicio, n_categorias)]
+    return grupos
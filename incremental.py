@@ -0,0 +1,211 @@
+# Árvore de decisão incremental (Hoeffding / VFDT) para novos registros rotulados do censo.
+#
+# Com o DecisionTreeClassifier (ou a ArvoreHistograma), qualquer lote novo de dados
+# rotulados obriga a rodar o script de novo e reajustar a árvore com todo o histórico. A
+# ArvoreIncremental guarda, em cada folha, estatísticas suficientes para escolher o corte:
+# o histograma de contagens por classe de cada atributo discretizado (as mesmas faixas do
+# histograma.Discretizador, fixadas no primeiro ajuste). Em cada partial_fit:
+#   - as linhas novas são discretizadas, levadas até as folhas e somadas aos histogramas
+#     delas (um bincount por folha);
+#   - uma folha que recebeu pelo menos 'periodo' linhas desde a última avaliação procura o
+#     melhor corte de cada atributo nos seus histogramas. O corte só é feito se a
+#     diferença de ganho entre o melhor atributo e o segundo (ou não cortar) superar o
+#     limite de Hoeffding, sqrt(R² ln(1/delta) / 2n), ou se esse limite ficar abaixo de
+#     'empate' (atributos quase equivalentes);
+#   - os filhos começam com as contagens por classe do corte, e as linhas do próprio lote
+#     que chegaram à folha são redistribuídas a eles, de modo que um lote grande (o ajuste
+#     inicial com o histórico) desce pela árvore como num ajuste em lote. As contagens que
+#     a folha herdou do seu próprio corte não têm histogramas e não podem ser divididas:
+#     ficam no nó cortado, e os filhos contam só as linhas recebidas pela folha.
+# O tempo de cada atualização depende só do número de linhas novas e de folhas. A árvore
+# é exposta no formato do atributo tree_ do sklearn, como a ArvoreHistograma: pode ser
+# usada no ModeloRenda, gravada como artefato e compilada.
+
+import numpy as np
+
+from histograma import ArvoreHistograma, Discretizador, EstruturaArvore, MAX_FAIXAS, _criterios
+
+
+# Linhas recebidas por uma folha entre duas avaliações de corte.
+PERIODO = 200
+# Probabilidade de o atributo escolhido não ser o melhor (no limite de Hoeffding).
+DELTA = 1e-7
+# Limite de Hoeffding abaixo do qual o melhor atributo é escolhido mesmo empatado.
+EMPATE = 0.05
+
+
+class _Folha:
+    # Estatísticas de uma folha: histograma (faixa de cada atributo x classe) e contagens
+    # por classe das linhas recebidas desde a criação, e as contagens herdadas do corte.
+    __slots__ = ('hist', 'classes', 'base', 'avaliadas', 'profundidade')
+
+    def __init__(self, n_posicoes, base, profundidade):
+        self.hist = np.zeros(n_posicoes, dtype=np.int64)
+        self.classes = np.zeros(len(base), dtype=np.int64)
+        self.base = base
+        self.avaliadas = 0
+        self.profundidade = profundidade
+
+    @property
+    def linhas(self):
+        return int(self.classes.sum())
+
+
+class ArvoreIncremental(ArvoreHistograma):
+    """Árvore de Hoeffding sobre atributos discretizados, atualizada com partial_fit.
+
+    arvore = ArvoreIncremental(max_depth=3).fit(X, y)     # histórico: fixa as faixas
+    arvore.partial_fit(X_novo, y_novo)                    # cada lote novo
+
+    max_depth, min_samples_leaf, criterion e max_faixas: como na ArvoreHistograma. periodo,
+    delta e empate controlam quando uma folha é cortada. Depois do ajuste: tree_ (formato do
+    sklearn; a raiz soma todas as linhas absorvidas), linhas_ (linhas absorvidas) e n_cortes_.
+    """
+
+    def __init__(self, max_depth=None, min_samples_leaf=1, criterion='gini', periodo=PERIODO, delta=DELTA,
+                 empate=EMPATE, max_faixas=MAX_FAIXAS):
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.criterion = criterion
+        self.periodo = periodo
+        self.delta = delta
+        self.empate = empate
+        self.max_faixas = max_faixas
+
+    def fit(self, X, y, classes=None):
+        """Descarta a árvore atual, fixa as faixas com X e absorve (X, y) como primeiro lote."""
+        if self.criterion not in _criterios:
+            raise ValueError(f"criterion deve ser um de {sorted(_criterios)}, não {self.criterion!r}")
+        self.discretizador_ = Discretizador(self.max_faixas)
+        faixas = self.discretizador_.fit_transform(X)
+        self._inicia(np.unique(y) if classes is None else np.asarray(classes))
+        return self._absorve(faixas, np.asarray(y))
+
+    def partial_fit(self, X, y, classes=None):
+        """Absorve um lote novo; na primeira chamada, equivale ao fit."""
+        if not hasattr(self, 'tree_'):
+            return self.fit(X, y, classes)
+        return self._absorve(self.discretizador_.transform(X), np.asarray(y))
+
+    def _inicia(self, classes):
+        self.classes_ = classes
+        tamanhos = np.array([len(limites) + 1 for limites in self.discretizador_.limites_])
+        self.n_features_in_ = len(tamanhos)
+        # Os histogramas de todos os atributos ficam lado a lado: a faixa f do atributo j
+        # ocupa a posição inicios_[j] + f.
+        self.inicios_ = np.concatenate([[0], np.cumsum(tamanhos)[:-1]]).astype(np.int64)
+        self._atributo_posicao = np.repeat(np.arange(len(tamanhos)), tamanhos)
+        self._ultima_posicao = np.zeros(tamanhos.sum(), dtype=bool)
+        self._ultima_posicao[np.cumsum(tamanhos) - 1] = True
+        self.esquerda_, self.direita_, self.atributo_, self.faixa_ = [-1], [-1], [-2], [0]
+        self.folhas_ = {0: _Folha(tamanhos.sum() * len(classes), np.zeros(len(classes)), 0)}
+        # Nó cortado -> contagens herdadas pela folha, que não passam para os filhos.
+        self.restos_ = {}
+        self.linhas_ = 0
+        self.n_cortes_ = 0
+        self._monta()
+
+    def _absorve(self, faixas, y):
+        n_classes = len(self.classes_)
+        codigos = np.searchsorted(self.classes_, y)
+        if len(y) and not np.array_equal(self.classes_[np.minimum(codigos, n_classes - 1)], y):
+            raise ValueError(f"o lote tem classes fora de {list(self.classes_)}")
+        # Posição (atributo, faixa, classe) de cada linha em cada atributo.
+        chaves = (faixas.astype(np.int64) + self.inicios_[:, None]) * n_classes + codigos
+        nos = self.nos_faixas(faixas)
+        ordem = np.argsort(nos, kind='stable')
+        folhas, inicios = np.unique(nos[ordem], return_index=True)
+        fila = list(zip(folhas, np.split(ordem, inicios[1:])))
+        max_depth = np.inf if self.max_depth is None else self.max_depth
+        while fila:
+            no, linhas = fila.pop()
+            folha = self.folhas_[no]
+            folha.hist += np.bincount(chaves[:, linhas].ravel(), minlength=len(folha.hist))
+            folha.classes += np.bincount(codigos[linhas], minlength=n_classes)
+            if folha.linhas - folha.avaliadas < self.periodo or folha.profundidade >= max_depth:
+                continue
+            folha.avaliadas = folha.linhas
+            corte = self._corte(folha)
+            if corte is None:
+                continue
+            j, f, contagens_esq, contagens_dir = corte
+            vai_esq = faixas[j, linhas] <= f
+            for lado, contagens, parte in ((0, contagens_esq, linhas[vai_esq]), (1, contagens_dir, linhas[~vai_esq])):
+                # As linhas deste lote são contadas de novo no filho, ao serem redistribuídas.
+                base = contagens - np.bincount(codigos[parte], minlength=n_classes)
+                filho = self._novo_no(_Folha(len(folha.hist), base, folha.profundidade + 1))
+                (self.esquerda_ if lado == 0 else self.direita_)[no] = filho
+                if len(parte):
+                    fila.append((filho, parte))
+            self.atributo_[no], self.faixa_[no] = int(j), int(f)
+            if folha.base.any():
+                self.restos_[no] = folha.base
+            del self.folhas_[no]
+            self.n_cortes_ += 1
+        self.linhas_ += len(y)
+        self._monta()
+        return self
+
+    def _novo_no(self, folha):
+        self.esquerda_.append(-1)
+        self.direita_.append(-1)
+        self.atributo_.append(-2)
+        self.faixa_.append(0)
+        no = len(self.esquerda_) - 1
+        self.folhas_[no] = folha
+        return no
+
+    def _corte(self, folha):
+        """(atributo, faixa, contagens da esquerda, contagens da direita), ou None se o teste de Hoeffding não permitir o corte."""
+        n_classes = len(self.classes_)
+        total = folha.classes.astype(np.float64)
+        if np.count_nonzero(total) <= 1:
+            return None
+        h = folha.hist.reshape(-1, n_classes).astype(np.float64)
+        acumulado = np.cumsum(h, axis=0)
+        antes = np.vstack([np.zeros(n_classes), acumulado])[self.inicios_]
+        esq = acumulado - antes[self._atributo_posicao]
+        dir_ = total - esq
+        n_esq, n_dir = esq.sum(axis=-1), dir_.sum(axis=-1)
+        n = total.sum()
+        # Como na ArvoreHistograma: só faixas não vazias, e nunca a última de cada atributo.
+        validos = (~self._ultima_posicao & (h.sum(axis=-1) > 0)
+                   & (n_esq >= self.min_samples_leaf) & (n_dir >= self.min_samples_leaf))
+        if not validos.any():
+            return None
+        impureza = _criterios[self.criterion]
+        ganho = impureza(total, np.array(n)) - (n_esq * impureza(esq, n_esq) + n_dir * impureza(dir_, n_dir)) / n
+        ganho = np.where(validos, ganho, -np.inf)
+        por_atributo = np.maximum.reduceat(ganho, self.inicios_)
+        ordem = np.argsort(por_atributo)[::-1]
+        melhor = por_atributo[ordem[0]]
+        # O segundo colocado inclui a opção de não cortar (ganho zero).
+        segundo = max(por_atributo[ordem[1]] if len(ordem) > 1 else -np.inf, 0.0)
+        if melhor <= 0:
+            return None
+        amplitude = np.log2(n_classes) if self.criterion == 'entropy' else 1.0
+        limite = np.sqrt(amplitude ** 2 * np.log(1 / self.delta) / (2 * n))
+        if melhor - segundo <= limite and limite >= self.empate:
+            return None
+        j = ordem[0]
+        fim = self.inicios_[j + 1] if j + 1 < len(self.inicios_) else len(ganho)
+        posicao = self.inicios_[j] + int(np.argmax(ganho[self.inicios_[j]:fim]))
+        return j, posicao - self.inicios_[j], esq[posicao], dir_[posicao]
+
+    def _monta(self):
+        # tree_ no formato do sklearn: as folhas com as contagens herdadas e recebidas, os nós
+        # internos com a soma dos filhos (que sempre têm índice maior que o pai) e as
+        # contagens herdadas que ficaram neles.
+        n = len(self.esquerda_)
+        valor = np.zeros((n, len(self.classes_)))
+        for no in range(n - 1, -1, -1):
+            if self.esquerda_[no] == -1:
+                folha = self.folhas_[no]
+                valor[no] = folha.base + folha.classes
+            else:
+                valor[no] = valor[self.esquerda_[no]] + valor[self.direita_[no]] + self.restos_.get(no, 0)
+        limites = self.discretizador_.limites_
+        limiar = [float(limites[a][f]) if a >= 0 else -2.0 for a, f in zip(self.atributo_, self.faixa_)]
+        self.tree_ = EstruturaArvore(np.array(self.esquerda_, dtype=np.intp), np.array(self.direita_, dtype=np.intp),
+                                     np.array(self.atributo_, dtype=np.intp), np.array(limiar), valor[:, None, :],
+                                     np.array(self.faixa_, dtype=np.intp))
@@ -0,0 +1,212 @@
+# Instrumentação das etapas do pipeline (carga, limpeza, engenharia, codificação, treino, avaliação).
+#
+# Cada etapa roda dentro de instrumentacao.etapa(nome, linhas_entrada) e gera um registro
+# (dict) com o tempo de relógio e de CPU, a memória (RSS atual e o quanto o pico de RSS do
+# processo subiu durante a etapa), as linhas de entrada e de saída e, quando a etapa o
+# informa, o tamanho dos dados que ela produz (dados_mb, memoria.tamanho_mb). Os registros são
+# entregues aos receptores configurados: uma função qualquer que recebe o dict, o
+# receptor_log (uma linha no logging) ou o ReceptorArquivo (JSON lines em um arquivo local).
+#
+# Opcionalmente:
+#   memoria=True  mede também, com o tracemalloc, a memória alocada pelo Python na etapa
+#                 (aumento e pico); deixa o código mais lento, por isso é opcional;
+#   perfil=True   roda cada etapa sob o cProfile e inclui no registro as funções com maior
+#                 tempo acumulado; com diretorio_perfil, grava um .prof por etapa (pstats,
+#                 snakeviz etc.).
+#
+# Sem instrumentação (instrumentacao=None nas funções do pipeline) usa-se SEM_INSTRUMENTACAO,
+# cujas etapas não medem nada.
+
+import os
+import io
+import json
+import time
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Número de funções do cProfile incluídas no registro de cada etapa.
+N_FUNCOES = 15
+
+log = logging.getLogger('instrumentacao')
+
+
+def rss_atual():
+    """Memória residente do processo, em bytes (None se /proc não estiver disponível)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def rss_pico():
+    """Pico de memória residente do processo desde o início, em bytes."""
+    if resource is None:
+        return None
+    # No Linux ru_maxrss vem em KiB.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Instrumentacao:
+    """Mede as etapas do pipeline e entrega um registro por etapa aos receptores.
+
+    instrumentacao = Instrumentacao([receptor_log, ReceptorArquivo('etapas.jsonl')], memoria=True)
+    with instrumentacao.etapa('limpeza', len(data)) as registro:
+        data = pre.limpa(data)
+        registro['linhas_saida'] = len(data)
+    """
+
+    def __init__(self, receptores=(), memoria=False, perfil=False, diretorio_perfil=None, n_funcoes=N_FUNCOES):
+        self.receptores = list(receptores)
+        self.memoria = memoria
+        self.perfil = perfil or diretorio_perfil is not None
+        self.diretorio_perfil = diretorio_perfil
+        self.n_funcoes = n_funcoes
+        self.registros = []
+        self._trava = threading.Lock()
+
+    def adiciona(self, receptor):
+        self.receptores.append(receptor)
+        return self
+
+    @contextmanager
+    def etapa(self, nome, linhas_entrada=None, **extras):
+        registro = {'etapa': nome, 'linhas_entrada': linhas_entrada, 'linhas_saida': None, **extras}
+        rastreando = self.memoria and not tracemalloc.is_tracing()
+        if rastreando:
+            tracemalloc.start()
+        if self.memoria:
+            tracemalloc.reset_peak()
+            alocado_antes = tracemalloc.get_traced_memory()[0]
+        perfil = cProfile.Profile() if self.perfil else None
+        pico_antes = rss_pico()
+        cpu = time.process_time()
+        inicio = time.perf_counter()
+        if perfil is not None:
+            perfil.enable()
+        try:
+            yield registro
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            registro['segundos'] = time.perf_counter() - inicio
+            registro['cpu_segundos'] = time.process_time() - cpu
+            pico = rss_pico()
+            registro['rss_mb'] = _mb(rss_atual())
+            registro['rss_pico_mb'] = _mb(pico)
+            registro['rss_pico_aumento_mb'] = _mb(pico - pico_antes) if pico is not None else None
+            if self.memoria:
+                alocado, pico_alocado = tracemalloc.get_traced_memory()
+                registro['tracemalloc_aumento_mb'] = _mb(alocado - alocado_antes)
+                registro['tracemalloc_pico_mb'] = _mb(pico_alocado - alocado_antes)
+                if rastreando:
+                    tracemalloc.stop()
+            if perfil is not None:
+                registro['funcoes'] = funcoes_mais_lentas(perfil, self.n_funcoes)
+                if self.diretorio_perfil is not None:
+                    os.makedirs(self.diretorio_perfil, exist_ok=True)
+                    registro['perfil'] = os.path.join(self.diretorio_perfil, f"{nome}.prof")
+                    perfil.dump_stats(registro['perfil'])
+            self._entrega(registro)
+
+    def _entrega(self, registro):
+        with self._trava:
+            self.registros.append(registro)
+        for receptor in self.receptores:
+            try:
+                receptor(registro)
+            except Exception:
+                # Um receptor com defeito não interrompe o pipeline.
+                log.exception('falha no receptor de instrumentação %r', receptor)
+
+    def resumo(self):
+        """Registros de todas as etapas medidas até aqui (sem as listas de funções)."""
+        return [{k: v for k, v in r.items() if k != 'funcoes'} for r in self.registros]
+
+    def relatorio_memoria(self):
+        """Tabela (texto) com a memória de cada etapa e o pico de RSS do processo, para dimensionar contêineres."""
+        return relatorio_memoria(self.registros)
+
+
+class _SemInstrumentacao:
+    # Mesma interface de Instrumentacao, sem medir nada.
+    registros = []
+
+    @contextmanager
+    def etapa(self, nome, linhas_entrada=None, **extras):
+        yield {}
+
+    def resumo(self):
+        return []
+
+
+SEM_INSTRUMENTACAO = _SemInstrumentacao()
+
+
+def funcoes_mais_lentas(perfil, n=N_FUNCOES):
+    """As n funções com maior tempo acumulado em um cProfile.Profile, como dicts."""
+    estatisticas = pstats.Stats(perfil, stream=io.StringIO())
+    funcoes = []
+    for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _) in estatisticas.stats.items():
+        funcoes.append({'funcao': f"{os.path.basename(arquivo)}:{linha}({funcao})", 'chamadas': chamadas,
+                        'segundos_proprio': proprio, 'segundos_acumulado': acumulado})
+    funcoes.sort(key=lambda f: f['segundos_acumulado'], reverse=True)
+    return funcoes[:n]
+
+
+def receptor_log(registro, nivel=logging.INFO):
+    """Receptor que escreve uma linha por etapa no logger 'instrumentacao'."""
+    partes = [f"{registro['etapa']}: {registro['segundos']:.3f}s (cpu {registro['cpu_segundos']:.3f}s)"]
+    if registro.get('linhas_entrada') is not None or registro.get('linhas_saida') is not None:
+        partes.append(f"linhas {registro.get('linhas_entrada')} -> {registro.get('linhas_saida')}")
+    if registro.get('rss_mb') is not None and registro.get('rss_pico_aumento_mb') is not None:
+        partes.append(f"rss {registro['rss_mb']:.0f}MB (pico +{registro['rss_pico_aumento_mb']:.0f}MB)")
+    if 'tracemalloc_pico_mb' in registro:
+        partes.append(f"python pico {registro['tracemalloc_pico_mb']:.1f}MB")
+    if registro.get('dados_mb') is not None:
+        partes.append(f"dados {registro['dados_mb']:.1f}MB")
+    log.log(nivel, ', '.join(partes))
+    for f in registro.get('funcoes', []):
+        log.log(nivel, '    %8.3fs %8.3fs %9d  %s', f['segundos_acumulado'], f['segundos_proprio'], f['chamadas'], f['funcao'])
+
+
+def relatorio_memoria(registros):
+    """Memória de cada etapa (dados produzidos, RSS ao final, pico de RSS e pico do Python) e o maior pico de RSS."""
+    campos = [('dados_mb', 'dados'), ('rss_mb', 'rss'), ('rss_pico_mb', 'rss pico'),
+              ('rss_pico_aumento_mb', 'aumento'), ('tracemalloc_pico_mb', 'python pico')]
+    largura = max([len('etapa')] + [len(r['etapa']) for r in registros])
+    linhas = [f"{'etapa':<{largura}} " + ' '.join(f"{titulo:>11}" for _, titulo in campos) + '  (MB)']
+    for r in registros:
+        valores = [r.get(campo) for campo, _ in campos]
+        linhas.append(f"{r['etapa']:<{largura}} " + ' '.join(f"{'-':>11}" if v is None else f"{v:11.1f}" for v in valores))
+    picos = [r['rss_pico_mb'] for r in registros if r.get('rss_pico_mb') is not None]
+    if picos:
+        linhas.append(f"pico de RSS do processo: {max(picos):.0f} MB")
+    return '\n'.join(linhas)
+
+
+class ReceptorArquivo:
+    """Receptor que acrescenta cada registro, como uma linha JSON, a um arquivo local."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._trava = threading.Lock()
+
+    def __call__(self, registro):
+        linha = json.dumps({'hora': time.strftime('%Y-%m-%dT%H:%M:%S'), 'pid': os.getpid(), **registro})
+        with self._trava, open(self.caminho, 'a') as f:
+            f.write(linha + '\n')
+
+
+def _mb(n_bytes):
+    return None if n_bytes is None else n_bytes / (1 << 20)
@@ -0,0 +1,282 @@
+# Limpeza da seção 6 (outliers, faltantes e duplicatas) lote a lote, fora da memória.
+#
+# Uso:
+#   python limpeza.py dump_censo.data dump_censo_limpo.data --skiprows 1
+#   python limpeza.py dump_censo.data dump_censo_limpo.data --aproximada --capacidade 500000000
+#
+# PreProcessamento.limpa precisa do DataFrame inteiro na memória para o drop_duplicates.
+# Aqui o arquivo é lido em lotes (carregamento.le_em_lotes); em cada lote os outliers e as
+# linhas com faltantes são descartados por PreProcessamento.filtra, que decide cada linha
+# isoladamente, e cada linha restante é reduzida a uma impressão digital de 128 bits (dois
+# hashes de 64 bits de pd.util.hash_pandas_object sobre as mesmas colunas comparadas por
+# limpa). Uma linha é mantida se a impressão não apareceu antes, no lote ou nos anteriores,
+# o que equivale ao duplicated(keep='first') da versão em memória: o resultado, inclusive o
+# índice, é o mesmo de pre.limpa(carrega_adult(...)).
+#
+# As impressões já vistas ficam em um ConjuntoImpressoes: 16 bytes por linha distinta,
+# em arrays ordenados de tamanhos geométricos (consultados com searchsorted e fundidos
+# como em uma LSM tree). Para arquivos com mais linhas distintas do que cabe na memória,
+# aproximada=True troca o conjunto por um FiltroBloom de tamanho fixo: a memória não cresce
+# com o arquivo e nenhuma duplicata passa, mas uma fração (taxa_falsos) das linhas novas
+# pode ser descartada como se fosse duplicata.
+
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from carregamento import colunas, tipos, le_em_lotes
+from preprocessamento import PreProcessamento
+
+
+TAMANHO_LOTE = 500000
+
+# Chaves dos dois hashes que formam a impressão digital de cada linha (16 caracteres cada).
+CHAVES_HASH = ('limpeza-adult-01', 'limpeza-adult-02')
+
+# Taxa de falsos positivos padrão do modo aproximado.
+TAXA_FALSOS = 0.001
+
+# Primeira linha dos arquivos gravados, descartada na leitura com skiprows=1 (como no adult.test).
+CABECALHO = '|limpo'
+
+
+def impressoes(data):
+    """Impressão digital de 128 bits de cada linha, como um array uint64 (n, 2)."""
+    saida = np.empty((len(data), 2), dtype=np.uint64)
+    for j, chave in enumerate(CHAVES_HASH):
+        saida[:, j] = pd.util.hash_pandas_object(data, index=False, hash_key=chave).to_numpy()
+    return saida
+
+
+def primeiras_ocorrencias(impressoes):
+    """Posições, em ordem crescente, da primeira ocorrência de cada impressão distinta."""
+    ordem = np.lexsort((impressoes[:, 1], impressoes[:, 0]))
+    ordenadas = impressoes[ordem]
+    # lexsort é estável: em cada sequência de impressões iguais a primeira é a de menor posição.
+    inicio = np.ones(len(ordem), dtype=bool)
+    inicio[1:] = (ordenadas[1:] != ordenadas[:-1]).any(axis=1)
+    return np.sort(ordem[inicio])
+
+
+class ConjuntoImpressoes:
+    """Conjunto exato de impressões digitais, em arrays ordenados de tamanhos geométricos.
+
+    Cada nível guarda a primeira metade das impressões (uint64) ordenada, em que a busca é um
+    searchsorted numérico, e a segunda metade alinhada a ela, comparada só nas posições em
+    que a primeira coincide.
+    """
+
+    def __init__(self):
+        self.niveis = []
+
+    def __len__(self):
+        return sum(len(primeira) for primeira, _ in self.niveis)
+
+    @property
+    def nbytes(self):
+        return sum(primeira.nbytes + segunda.nbytes for primeira, segunda in self.niveis)
+
+    def contem(self, impressoes):
+        """Máscara booleana: quais impressões já estão no conjunto."""
+        # Com as chaves ordenadas, o searchsorted percorre o nível quase sequencialmente.
+        ordem = np.argsort(impressoes[:, 0])
+        chaves = impressoes[ordem, 0]
+        segundas = impressoes[ordem, 1]
+        presente = np.zeros(len(impressoes), dtype=bool)
+        for primeira, segunda in self.niveis:
+            inicio = np.searchsorted(primeira, chaves, side='left')
+            fim = np.searchsorted(primeira, chaves, side='right')
+            unica = fim - inicio == 1
+            presente[unica] |= segunda[inicio[unica]] == segundas[unica]
+            # Primeira metade repetida no nível (raro): procura a segunda metade no intervalo.
+            for i in np.flatnonzero(fim - inicio > 1):
+                presente[i] |= bool((segunda[inicio[i]:fim[i]] == segundas[i]).any())
+        saida = np.empty_like(presente)
+        saida[ordem] = presente
+        return saida
+
+    def adiciona(self, impressoes):
+        primeira, segunda = impressoes[:, 0], impressoes[:, 1]
+        # Funde com os níveis de tamanho comparável: cada impressão é reordenada O(log n) vezes.
+        while self.niveis and len(self.niveis[-1][0]) <= 2 * len(primeira):
+            p, s = self.niveis.pop()
+            primeira, segunda = np.concatenate([p, primeira]), np.concatenate([s, segunda])
+        ordem = np.argsort(primeira)
+        self.niveis.append((primeira[ordem], segunda[ordem]))
+
+
+class FiltroBloom:
+    """Filtro de Bloom sobre as impressões digitais, com memória fixa.
+
+    capacidade: número esperado de linhas distintas; taxa_falsos: fração das linhas novas
+    dadas como já vistas quando o filtro recebe 'capacidade' impressões.
+    """
+
+    def __init__(self, capacidade, taxa_falsos=TAXA_FALSOS):
+        self.capacidade = int(capacidade)
+        self.taxa_falsos = taxa_falsos
+        bits = max(64, int(np.ceil(-self.capacidade * np.log(taxa_falsos) / np.log(2) ** 2)))
+        self.n_bits = np.uint64(bits)
+        self.n_hashes = max(1, int(round(bits / max(self.capacidade, 1) * np.log(2))))
+        self.bits = np.zeros((bits + 7) // 8, dtype=np.uint8)
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def _posicoes(self, impressoes):
+        # Hash duplo (Kirsch e Mitzenmacher): posição i = h1 + i * h2 (mod n_bits).
+        h = impressoes
+        i = np.arange(self.n_hashes, dtype=np.uint64)
+        return (h[:, :1] + i * (h[:, 1:] | np.uint64(1))) % self.n_bits
+
+    def contem(self, impressoes):
+        posicoes = self._posicoes(impressoes)
+        ligados = self.bits[posicoes >> np.uint64(3)] >> (posicoes & np.uint64(7)).astype(np.uint8) & 1
+        return ligados.all(axis=1)
+
+    def adiciona(self, impressoes):
+        posicoes = self._posicoes(impressoes).ravel()
+        np.bitwise_or.at(self.bits, posicoes >> np.uint64(3), np.left_shift(1, posicoes & np.uint64(7)).astype(np.uint8))
+        self.n += len(impressoes)
+
+
+class LimpezaEmLotes:
+    """Aplica pre.limpa a uma sequência de lotes, guardando apenas as impressões já vistas.
+
+    limpeza = LimpezaEmLotes(pre)
+    for lote in le_em_lotes('dump.data', skiprows=1):
+        limpo = limpeza.limpa(lote)
+
+    Os contadores (linhas, outliers_e_faltantes, duplicadas, saida) acumulam os lotes.
+    """
+
+    def __init__(self, pre, remove_outliers=True, aproximada=False, capacidade=None, taxa_falsos=TAXA_FALSOS):
+        if aproximada and capacidade is None:
+            raise ValueError('aproximada=True requer a capacidade (número esperado de linhas distintas)')
+        self.pre = pre
+        self.remove_outliers = remove_outliers
+        self.vistas = FiltroBloom(capacidade, taxa_falsos) if aproximada else ConjuntoImpressoes()
+        self.linhas = 0
+        self.outliers_e_faltantes = 0
+        self.duplicadas = 0
+        self.saida = 0
+
+    def limpa(self, lote):
+        """Linhas do lote que pre.limpa manteria no arquivo inteiro (com o índice original)."""
+        filtrado = self.pre.filtra(lote, self.remove_outliers)
+        h = impressoes(self.pre.chaves_duplicatas(filtrado))
+        # Primeira ocorrência de cada impressão dentro do lote, na ordem original...
+        primeiras = primeiras_ocorrencias(h)
+        # ...que não tenha aparecido nos lotes anteriores.
+        novas = primeiras[~self.vistas.contem(h[primeiras])]
+        self.vistas.adiciona(h[novas])
+        self.linhas += len(lote)
+        self.outliers_e_faltantes += len(lote) - len(filtrado)
+        self.duplicadas += len(filtrado) - len(novas)
+        self.saida += len(novas)
+        return filtrado.iloc[novas]
+
+    def contadores(self):
+        return {'linhas': self.linhas, 'outliers_e_faltantes': self.outliers_e_faltantes,
+                'duplicadas': self.duplicadas, 'saida': self.saida,
+                'impressoes': len(self.vistas), 'memoria_impressoes_mb': self.vistas.nbytes / (1 << 20)}
+
+
+def ajusta_em_lotes(caminho, skiprows=0, tamanho_lote=TAMANHO_LOTE, pre=None):
+    """PreProcessamento ajustado com as categorias de todo o arquivo, sem carregá-lo inteiro.
+
+    O fit só usa o conjunto de categorias de cada coluna: elas são acumuladas lote a lote
+    e o fit é feito em um DataFrame vazio com essas categorias.
+    """
+    categoricas = [c for c in colunas if tipos[c] == 'category']
+    vistas = {c: set() for c in categoricas}
+    for lote in le_em_lotes(caminho, tamanho_lote, skiprows, usecols=categoricas):
+        for c in categoricas:
+            vistas[c].update(lote[c].cat.categories)
+    return pre_de_categorias(vistas, pre)
+
+
+def pre_de_categorias(vistas, pre=None):
+    """PreProcessamento ajustado com o conjunto de categorias vistas em cada coluna categórica."""
+    vazio = pd.DataFrame({c: (pd.Categorical([], categories=sorted(vistas[c])) if c in vistas
+                              else np.empty(0, dtype=tipos[c])) for c in colunas})
+    return (pre or PreProcessamento()).fit(vazio)
+
+
+def limpa_em_lotes(caminho, pre=None, skiprows=0, tamanho_lote=TAMANHO_LOTE, **opcoes):
+    """Gerador dos lotes limpos do arquivo; opcoes vão para LimpezaEmLotes.
+
+    Sem 'pre', o PreProcessamento é ajustado antes com ajusta_em_lotes (uma leitura a mais
+    do arquivo, apenas das colunas categóricas).
+    """
+    if pre is None:
+        pre = ajusta_em_lotes(caminho, skiprows, tamanho_lote)
+    limpeza = LimpezaEmLotes(pre, **opcoes)
+    for lote in le_em_lotes(caminho, tamanho_lote, skiprows):
+        yield limpeza.limpa(lote)
+
+
+def prepara_em_lotes(caminho, pre=None, skiprows=0, tamanho_lote=TAMANHO_LOTE, **opcoes):
+    """(pre, dataset limpo e transformado), como pre.transform(pre.limpa(carrega_adult(...))), lote a lote.
+
+    Só os lotes transformados (sem as colunas descartadas, com as categorias agrupadas)
+    são guardados até o fim; opcoes vão para LimpezaEmLotes.
+    """
+    if pre is None:
+        pre = ajusta_em_lotes(caminho, skiprows, tamanho_lote)
+    limpeza = LimpezaEmLotes(pre, **opcoes)
+    lotes = [pre.transform(limpeza.limpa(lote)) for lote in le_em_lotes(caminho, tamanho_lote, skiprows)]
+    return pre, pd.concat(lotes) if len(lotes) > 1 else lotes[0]
+
+
+def limpa_arquivo(origem, destino, pre=None, skiprows=0, tamanho_lote=TAMANHO_LOTE, **opcoes):
+    """Grava em 'destino', no formato do adult.data, as linhas de 'origem' que pre.limpa manteria.
+
+    Retorna os contadores da limpeza. O arquivo gravado tem uma linha de cabeçalho (lido
+    com skiprows=1), e os faltantes mantidos (native-country) são gravados como '?'.
+    """
+    if pre is None:
+        pre = ajusta_em_lotes(origem, skiprows, tamanho_lote)
+    limpeza = LimpezaEmLotes(pre, **opcoes)
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(CABECALHO + '\n')
+        for lote in le_em_lotes(origem, tamanho_lote, skiprows):
+            limpeza.limpa(lote).to_csv(f, header=False, index=False, na_rep='?')
+    os.replace(tmp, destino)
+    return limpeza.contadores()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Limpeza da seção 6 (outliers, faltantes e duplicatas) lote a lote.')
+    parser.add_argument('origem')
+    parser.add_argument('destino')
+    parser.add_argument('--skiprows', type=int, default=0)
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE)
+    parser.add_argument('--mantem-outliers', action='store_true', help='não remove os outliers de ganho de capital')
+    parser.add_argument('--aproximada', action='store_true',
+                        help='procura as duplicatas com um filtro de Bloom de memória fixa')
+    parser.add_argument('--capacidade', type=int, help='linhas distintas esperadas (modo aproximado)')
+    parser.add_argument('--taxa-falsos', type=float, default=TAXA_FALSOS,
+                        help=f"fração de linhas novas descartadas por engano no modo aproximado (padrão: {TAXA_FALSOS})")
+    args = parser.parse_args(argv)
+    if args.aproximada and args.capacidade is None:
+        parser.error('--aproximada requer --capacidade')
+    contadores = limpa_arquivo(args.origem, args.destino, skiprows=args.skiprows, tamanho_lote=args.tamanho_lote,
+                               remove_outliers=not args.mantem_outliers, aproximada=args.aproximada,
+                               capacidade=args.capacidade, taxa_falsos=args.taxa_falsos)
+    print(', '.join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}" for k, v in contadores.items()),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
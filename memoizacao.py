@@ -0,0 +1,169 @@
+# Memoização das previsões do modelo de renda.
+#
+# A árvore (ou floresta) só olha para poucas colunas da matriz codificada e, em cada uma,
+# só importa de que lado de cada limiar o valor está. A chave de uma linha é, para cada
+# coluna usada pelas árvores, o intervalo entre limiares consecutivos em que o valor cai
+# (comparando em float32, como o sklearn): duas linhas com a mesma chave seguem o mesmo
+# caminho em todas as árvores e têm exatamente a mesma probabilidade. Com a árvore da
+# seção 7 (6 colunas usadas) as ~30 mil linhas do treino se reduzem a algumas dezenas de chaves.
+#
+# As linhas de um lote são agrupadas por chave e o modelo avalia uma única linha de cada
+# grupo; os resultados ficam em um cache LRU de tamanho limitado, reaproveitado entre lotes.
+# Para estimadores que não são árvores, a chave é a linha codificada inteira.
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from inferencia import _limiar_float32
+
+
+# Número máximo de chaves guardadas no cache.
+CAPACIDADE = 100000
+
+
+class PreditorMemoizado:
+    """Envolve um ModeloRenda ou um PreditorArtefato, com a mesma interface de pontuação.
+
+    modelo = PreditorMemoizado(ModeloRenda.carrega('modelos/arvore_decisao.pkl'))
+    previsoes, proba = modelo.pontua(lote)
+    modelo.taxa_acerto, modelo.contadores()
+    """
+
+    def __init__(self, modelo, capacidade=CAPACIDADE):
+        self.modelo = modelo
+        self.pre = modelo.pre
+        self.codificador = modelo.codificador
+        self.capacidade = capacidade
+        self.colunas, self.limiares = limiares_por_coluna(modelo)
+        self.cache = OrderedDict()
+        # Linhas recebidas, chaves distintas nos lotes, chaves encontradas no cache e linhas avaliadas pelo modelo.
+        self.linhas = 0
+        self.distintas = 0
+        self.acertos = 0
+        self.avaliacoes = 0
+
+    @property
+    def taxa_acerto(self):
+        """Fração das chaves distintas de cada lote encontradas no cache."""
+        return self.acertos / self.distintas if self.distintas else 0.0
+
+    @property
+    def reducao(self):
+        """Linhas recebidas por avaliação do modelo."""
+        return self.linhas / self.avaliacoes if self.avaliacoes else 0.0
+
+    def contadores(self):
+        return {'linhas': self.linhas, 'distintas': self.distintas, 'acertos': self.acertos,
+                'avaliacoes': self.avaliacoes, 'taxa_acerto': self.taxa_acerto, 'reducao': self.reducao,
+                'tamanho_cache': len(self.cache)}
+
+    def chaves(self, X):
+        """Matriz de chaves (uma linha por linha de X) para uma matriz já codificada."""
+        if self.colunas is None:
+            return X.toarray() if sparse.issparse(X) else np.asarray(X)
+        usadas = X[:, self.colunas]
+        usadas = np.asarray(usadas.toarray() if sparse.issparse(usadas) else usadas, dtype=np.float32)
+        chaves = np.empty(usadas.shape, dtype=np.int32)
+        for j, limiares in enumerate(self.limiares):
+            # Número de limiares abaixo do valor: define o lado de cada comparação x > limiar.
+            chaves[:, j] = np.searchsorted(limiares, usadas[:, j], side='left')
+        return chaves
+
+    def proba(self, data):
+        """Probabilidade de cada classe, avaliando no modelo apenas as chaves que não estão no cache."""
+        X = self.codificador.transform(self.pre.transform(data))
+        chaves = self.chaves(X)
+        grupos, primeiras = agrupa_linhas(chaves)
+        proba = np.empty((len(primeiras), len(self.codificador.classes_)))
+        bytes_ = [chaves[i].tobytes() for i in primeiras]
+        faltam = []
+        for g, chave in enumerate(bytes_):
+            valor = self.cache.get(chave)
+            if valor is None:
+                faltam.append(g)
+            else:
+                self.cache.move_to_end(chave)
+                proba[g] = valor
+        if faltam:
+            proba[faltam] = self._proba_modelo(X[primeiras[faltam]])
+            for g in faltam:
+                self.cache[bytes_[g]] = proba[g]
+            while len(self.cache) > self.capacidade:
+                self.cache.popitem(last=False)
+        self.linhas += len(data)
+        self.distintas += len(primeiras)
+        self.acertos += len(primeiras) - len(faltam)
+        self.avaliacoes += len(faltam)
+        return proba[grupos]
+
+    def _proba_modelo(self, X):
+        if hasattr(self.modelo, 'proba_matriz'):
+            # PreditorArtefato.
+            return self.modelo.proba_matriz(X)
+        return self.modelo.estimador.predict_proba(X)
+
+    def predict_proba(self, data):
+        """Probabilidade de alta renda (>50K)."""
+        return self.proba(data)[:, 1]
+
+    def predict(self, data):
+        return self.pontua(data)[0]
+
+    def pontua(self, data):
+        proba = self.proba(data)
+        return proba[:, 1] > proba[:, 0], proba[:, 1]
+
+    def rotulos(self, previsoes):
+        return self.modelo.rotulos(previsoes)
+
+
+def limiares_por_coluna(modelo):
+    """Colunas da matriz usadas pelas árvores do modelo e os limiares float32 (ordenados) de cada uma.
+
+    Retorna (None, None) se o estimador não for uma árvore ou floresta.
+    """
+    if hasattr(modelo, 'proba_matriz'):
+        atributo, limiar = np.asarray(modelo.atributo), np.asarray(modelo.limiar)
+    else:
+        estimador = modelo.estimador
+        if hasattr(estimador, 'estimators_'):
+            arvores = [e.tree_ for e in estimador.estimators_]
+        elif hasattr(estimador, 'tree_'):
+            arvores = [estimador.tree_]
+        else:
+            return None, None
+        from artefato import vetores_arvores
+        vetores = vetores_arvores(arvores)
+        atributo, limiar = vetores['atributo'], vetores['limiar']
+    interno = atributo >= 0
+    atributo, limiar = atributo[interno], _limiar_float32(limiar[interno])
+    colunas = np.unique(atributo)
+    return colunas, [np.unique(limiar[atributo == c]) for c in colunas]
+
+
+def agrupa_linhas(chaves):
+    """Agrupa as linhas iguais de uma matriz de chaves.
+
+    Retorna o grupo de cada linha e a primeira linha de cada grupo (na ordem em que os
+    grupos aparecem). As colunas são combinadas uma a uma com pd.factorize (tabela hash),
+    sem ordenar as linhas.
+    """
+    n = chaves.shape[0]
+    grupos = np.zeros(n, dtype=np.int64)
+    n_grupos = 1
+    for j in range(chaves.shape[1]):
+        valores, unicos = pd.factorize(chaves[:, j])
+        if n_grupos * len(unicos) >= 1 << 62:
+            # Renumera os grupos antes que a combinação estoure o int64.
+            grupos, unicos_grupos = pd.factorize(grupos)
+            n_grupos = len(unicos_grupos)
+        grupos = grupos * len(unicos) + valores
+        n_grupos *= len(unicos)
+    grupos, unicos = pd.factorize(grupos)
+    primeiras = np.empty(len(unicos), dtype=np.intp)
+    # Atribuindo de trás para frente, cada grupo fica com a sua primeira linha.
+    primeiras[grupos[::-1]] = np.arange(n - 1, -1, -1)
+    return grupos, primeiras
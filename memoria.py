@@ -0,0 +1,71 @@
+# Orçamento de memória do pipeline de treino e tamanho dos dados em cada etapa.
+#
+# O carrega_treino lê o arquivo inteiro, limpa e transforma na memória; o pico de memória
+# cresce com o tamanho do arquivo (medido: cerca de 2,9 vezes o tamanho do arquivo na
+# primeira leitura e 2,1 vezes com o cache colunar, sobretudo na procura de duplicatas). Com
+# um orçamento (orcamento_mb), o pico é estimado antes da leitura a partir do tamanho do
+# arquivo; se ele não couber, o carregamento, a limpeza e a engenharia passam a ser feitos
+# em lotes (limpeza.prepara_em_lotes), com o tamanho do lote escolhido para caber no
+# orçamento, e só o dataset transformado (categorias em códigos int8, inteiros reduzidos)
+# fica inteiro na memória. O resultado é o mesmo do carregamento em memória.
+#
+# O orçamento cobre só essas etapas. A codificação (CodificadorOneHot) e o ajuste do
+# estimador continuam em memória e não entram na estimativa: a matriz codificada ocupa
+# cerca de 0,8 vez o tamanho do arquivo no adult.data (4,5 vezes o dataset transformado),
+# e o estimador pode copiá-la no ajuste. Com um orçamento apertado, esse é o pico do treino.
+#
+# tamanho_mb mede o que cada etapa produz (DataFrame, matriz densa ou esparsa) e é gravado
+# nos registros da instrumentação, junto com o RSS, para dimensionar os contêineres.
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+# Pico de memória do carregamento em memória, em múltiplos do tamanho do arquivo.
+FATOR_MEMORIA = 3.0
+# Fração do orçamento reservada a cada lote; o resto fica para o dataset transformado e
+# para as impressões digitais das linhas já vistas.
+FRACAO_LOTE = 0.25
+# Bytes lidos do início do arquivo para estimar o tamanho médio de uma linha.
+AMOSTRA = 1 << 16
+MIN_LINHAS_LOTE = 10000
+
+
+def tamanho_mb(obj):
+    """Memória ocupada por um DataFrame, Series, array ou matriz esparsa, em MB (None para outros objetos)."""
+    if isinstance(obj, pd.DataFrame):
+        n_bytes = obj.memory_usage(deep=True, index=True).sum()
+    elif isinstance(obj, pd.Series):
+        n_bytes = obj.memory_usage(deep=True, index=True)
+    elif sparse.issparse(obj):
+        obj = obj.tocsr()
+        n_bytes = obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes
+    elif isinstance(obj, np.ndarray):
+        n_bytes = obj.nbytes
+    else:
+        return None
+    return n_bytes / (1 << 20)
+
+
+def estima_pico_mb(caminho):
+    """Pico de memória estimado para carregar, limpar e transformar o arquivo inteiro na memória."""
+    return FATOR_MEMORIA * os.path.getsize(caminho) / (1 << 20)
+
+
+def bytes_por_linha(caminho):
+    with open(caminho, 'rb') as f:
+        amostra = f.read(AMOSTRA)
+    return len(amostra) / max(amostra.count(b'\n'), 1)
+
+
+def cabe_no_orcamento(caminho, orcamento_mb):
+    return orcamento_mb is None or estima_pico_mb(caminho) <= orcamento_mb
+
+
+def tamanho_lote(caminho, orcamento_mb):
+    """Linhas por lote para que o processamento de um lote use até FRACAO_LOTE do orçamento."""
+    por_linha = FATOR_MEMORIA * bytes_por_linha(caminho)
+    return max(MIN_LINHAS_LOTE, int(FRACAO_LOTE * orcamento_mb * (1 << 20) / por_linha))
@@ -0,0 +1,48 @@
+# Modelo de renda completo: o pré-processamento, o codificador e o estimador ajustados no
+# treino, aplicáveis diretamente a lotes de dados brutos no formato do dataset Adult.
+
+import os
+import pickle
+
+import numpy as np
+
+
+class ModeloRenda:
+    """Encadeia PreProcessamento, CodificadorOneHot e o estimador (por ex. a árvore de decisão)."""
+
+    def __init__(self, pre, codificador, estimador):
+        self.pre = pre
+        self.codificador = codificador
+        self.estimador = estimador
+
+    def matriz(self, data):
+        # Dados brutos -> matriz CSR com as colunas do treino.
+        return self.codificador.transform(self.pre.transform(data))
+
+    def predict(self, data):
+        """Classe prevista: True para alta renda (>50K)."""
+        return np.asarray(self.estimador.predict(self.matriz(data)), dtype=bool)
+
+    def predict_proba(self, data):
+        """Probabilidade de alta renda (>50K)."""
+        return self.estimador.predict_proba(self.matriz(data))[:, 1]
+
+    def pontua(self, data):
+        """Classe prevista e probabilidade de alta renda, com uma única transformação do lote."""
+        proba = self.estimador.predict_proba(self.matriz(data))
+        # Mesmo critério do predict do sklearn: em caso de empate, a primeira classe.
+        return proba[:, 1] > proba[:, 0], proba[:, 1]
+
+    def rotulos(self, previsoes):
+        # Converte as previsões booleanas nos rótulos de renda ('<=50K' / '>50K').
+        return np.asarray(self.codificador.classes_, dtype=object)[np.asarray(previsoes, dtype=np.intp)]
+
+    def salva(self, caminho):
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        with open(caminho, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def carrega(caminho):
+        with open(caminho, 'rb') as f:
+            return pickle.load(f)
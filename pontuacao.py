@@ -0,0 +1,196 @@
+# Pontuação em lotes de arquivos no formato do dataset Adult, com memória constante.
+#
+# Uso:
+#   python pontuacao.py modelos/arvore_decisao.pkl data/adult.test previsoes.csv --skiprows 1
+#   python pontuacao.py modelos/arvore_decisao data/adult.test previsoes.csv --skiprows 1
+#   python pontuacao.py modelos/arvore_decisao data/adult.test previsoes.csv --skiprows 1 --memoiza 100000
+#
+# O modelo pode ser um ModeloRenda salvo (.pkl) ou um diretório de artefato (artefato.py);
+# neste caso o sklearn nem chega a ser importado.
+#
+# O arquivo é lido em lotes de tamanho fixo, que passam pelo pré-processamento e pelo
+# modelo ajustados e são gravados (CSV ou Parquet) assim que ficam prontos. Leitura,
+# transformação/previsão e escrita rodam em threads separadas ligadas por filas pequenas,
+# de modo que a memória máxima depende do tamanho do lote e não do tamanho do arquivo.
+# Com --memoiza, as linhas repetidas são avaliadas uma única vez (memoizacao.py). Uma entrada
+# .parquet é lida em RecordBatches do Arrow e pontuada diretamente deles (colunar.py), sem
+# passar por DataFrames.
+
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+
+import pandas as pd
+
+from carregamento import le_em_lotes
+from modelo import ModeloRenda
+from artefato import carrega_artefato
+from memoizacao import PreditorMemoizado
+from colunar import PreditorColunar
+
+
+# Número máximo de lotes aguardando em cada fila entre as threads.
+TAMANHO_FILA = 2
+
+_FIM = object()
+
+
+class _Erro:
+    def __init__(self, erro):
+        self.erro = erro
+
+
+def em_thread(iteravel, tamanho_fila=TAMANHO_FILA):
+    """Consome 'iteravel' em uma thread separada, devolvendo os itens por uma fila limitada.
+
+    Exceções levantadas na thread são relançadas em quem consome os itens.
+    """
+    fila = queue.Queue(tamanho_fila)
+
+    def roda():
+        try:
+            for item in iteravel:
+                fila.put(item)
+        except BaseException as e:
+            fila.put(_Erro(e))
+            return
+        fila.put(_FIM)
+
+    thread = threading.Thread(target=roda, daemon=True)
+    thread.start()
+    while True:
+        item = fila.get()
+        if item is _FIM:
+            break
+        if isinstance(item, _Erro):
+            raise item.erro
+        yield item
+    thread.join()
+
+
+def _pontua_lotes(modelo, lotes):
+    for lote in lotes:
+        classe, proba = modelo.pontua(lote)
+        yield pd.DataFrame({'income': modelo.rotulos(classe), 'probabilidade': proba},
+                           index=pd.Index(lote.index, name='linha'))
+
+
+def le_parquet_em_lotes(caminho, tamanho_lote=100000):
+    """Lê um .parquet no esquema do dataset Adult em RecordBatches de até 'tamanho_lote' linhas."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # As colunas de texto são lidas já codificadas por dicionário.
+    esquema = pq.read_schema(caminho)
+    texto = [f.name for f in esquema if pa.types.is_string(f.type) or pa.types.is_large_string(f.type)]
+    yield from pq.ParquetFile(caminho, read_dictionary=texto).iter_batches(batch_size=tamanho_lote)
+
+
+def _como_dataframes(batches):
+    # Com a memoização, que trabalha sobre DataFrames; o índice segue a posição no arquivo.
+    inicio = 0
+    for batch in batches:
+        lote = batch.to_pandas()
+        lote.index = pd.RangeIndex(inicio, inicio + len(lote))
+        inicio += len(lote)
+        yield lote
+
+
+def _pontua_batches(modelo, batches):
+    preditor = PreditorColunar(modelo)
+    inicio = 0
+    for batch in batches:
+        classe, proba = preditor.pontua(batch)
+        linhas = pd.RangeIndex(inicio, inicio + batch.num_rows, name='linha')
+        inicio += batch.num_rows
+        yield pd.DataFrame({'income': modelo.rotulos(classe), 'probabilidade': proba}, index=linhas)
+
+
+class EscritorCSV:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.cabecalho = True
+
+    def escreve(self, previsoes):
+        previsoes.to_csv(self.caminho, mode='w' if self.cabecalho else 'a', header=self.cabecalho)
+        self.cabecalho = False
+
+    def fecha(self):
+        if self.cabecalho:
+            # Arquivo de entrada vazio: grava apenas o cabeçalho.
+            pd.DataFrame(columns=['income', 'probabilidade']).rename_axis('linha').to_csv(self.caminho)
+
+
+class EscritorParquet:
+    def __init__(self, caminho):
+        import pyarrow.parquet as pq
+        self.pq = pq
+        self.caminho = caminho
+        self.escritor = None
+
+    def escreve(self, previsoes):
+        import pyarrow as pa
+        tabela = pa.Table.from_pandas(previsoes.reset_index(), preserve_index=False)
+        if self.escritor is None:
+            self.escritor = self.pq.ParquetWriter(self.caminho, tabela.schema)
+        self.escritor.write_table(tabela)
+
+    def fecha(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+
+def escritor_para(caminho):
+    return EscritorParquet(caminho) if caminho.endswith('.parquet') else EscritorCSV(caminho)
+
+
+def pontua_arquivo(modelo, entrada, saida, tamanho_lote=100000, skiprows=0):
+    """Pontua 'entrada' lote a lote e grava as previsões em 'saida'.
+
+    Retorna o número de linhas pontuadas e o tempo total, em segundos.
+    """
+    inicio = time.perf_counter()
+    if entrada.endswith('.parquet') and not isinstance(modelo, PreditorMemoizado):
+        previsoes = em_thread(_pontua_batches(modelo, em_thread(le_parquet_em_lotes(entrada, tamanho_lote))))
+    elif entrada.endswith('.parquet'):
+        lotes = em_thread(_como_dataframes(le_parquet_em_lotes(entrada, tamanho_lote)))
+        previsoes = em_thread(_pontua_lotes(modelo, lotes))
+    else:
+        lotes = em_thread(le_em_lotes(entrada, tamanho_lote, skiprows=skiprows))
+        previsoes = em_thread(_pontua_lotes(modelo, lotes))
+    escritor = escritor_para(saida)
+    linhas = 0
+    try:
+        for lote in previsoes:
+            escritor.escreve(lote)
+            linhas += len(lote)
+    finally:
+        escritor.fecha()
+    return linhas, time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pontuação em lotes de arquivos no formato do dataset Adult.')
+    parser.add_argument('modelo', help='modelo salvo com ModeloRenda.salva ou diretório de artefato')
+    parser.add_argument('entrada', help='arquivo no formato adult.data / adult.test, ou .parquet com as mesmas colunas')
+    parser.add_argument('saida', help='arquivo de previsões (.csv ou .parquet)')
+    parser.add_argument('--tamanho-lote', type=int, default=100000, help='linhas por lote (padrão: 100000)')
+    parser.add_argument('--skiprows', type=int, default=0, help='linhas iniciais a ignorar (1 para o adult.test)')
+    parser.add_argument('--memoiza', type=int, default=0, metavar='N',
+                        help='avalia cada vetor distinto uma única vez, com cache LRU de N vetores entre lotes')
+    args = parser.parse_args(argv)
+
+    modelo = carrega_artefato(args.modelo) if os.path.isdir(args.modelo) else ModeloRenda.carrega(args.modelo)
+    if args.memoiza:
+        modelo = PreditorMemoizado(modelo, args.memoiza)
+    linhas, segundos = pontua_arquivo(modelo, args.entrada, args.saida, args.tamanho_lote, args.skiprows)
+    print(f"{linhas} linhas pontuadas em {segundos:.2f}s ({linhas / max(segundos, 1e-9):,.0f} linhas/s)", file=sys.stderr)
+    if args.memoiza:
+        print(f"memoização: {modelo.avaliacoes} avaliações do modelo ({modelo.reducao:.1f} linhas por avaliação), "
+              f"taxa de acerto do cache {modelo.taxa_acerto:.1%}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+# Pré-processamento do dataset "Adult" usado pelo modelo de árvore de decisão.
+#
+# Reúne em um único objeto (fit/transform) a engenharia de atributos das seções 5 e 6 do
+# script, que antes era escrita duas vezes (para o treino e para o teste) como uma série
+# de Series.replace(..., inplace=True) e um data.apply(..., axis=1) linha a linha.
+#
+# No fit, os agrupamentos de cada coluna são compilados em uma tabela de consulta
+# (código da categoria original -> código da categoria agrupada). No transform, cada
+# coluna é agrupada em uma única passada vetorizada sobre os códigos categóricos.
+#
+# O CodificadorOneHot substitui o pd.get_dummies(..., drop_first=True): o vocabulário de
+# cada coluna é fixado no fit, de modo que qualquer lote gera as mesmas colunas, na mesma
+# ordem, como uma matriz esparsa CSR (ou como códigos inteiros, para árvores).
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+# Agrupamentos por afinidade (seção 5). Categorias não listadas permanecem como estão.
+agrupamentos = {
+    'workclass': [
+        (['State-gov', 'Federal-gov', 'Local-gov'], 'Government'),
+        (['Self-emp-not-inc', 'Self-emp-inc'], 'Self'),
+        (['Without-pay', 'Never-worked'], 'Others'),
+    ],
+    'education': [
+        (['11th', '9th', '7th-8th', '5th-6th', '10th', '1st-4th', 'Preschool', '12th'], 'School-Dropout'),
+        (['Some-college', 'Assoc-acdm', 'Assoc-voc'], 'College'),
+        (['Prof-school'], 'Masters'),
+    ],
+    'marital-status': [
+        (['Married-AF-spouse', 'Married-civ-spouse', 'Married-spouse-absent'], 'Married'),
+        (['Divorced'], 'Separated'),
+    ],
+    'occupation': [
+        (['Tech-support', 'Craft-repair', 'Handlers-cleaners', 'Transport-moving', 'Machine-op-inspct'], 'Blue-collar'),
+        (['Exec-managerial', 'Adm-clerical'], 'White-collar'),
+        (['Prof-specialty'], 'Gold-collar'),
+        (['Other-service', 'Sales', 'Priv-house-serv', 'Protective-serv'], 'Pink-collar'),
+        (['Farming-fishing'], 'Green-collar'),
+        (['Armed-Forces'], 'Brown-collar'),
+    ],
+    'native-country': [
+        (['United-States'], 'US'),
+    ],
+    # O adult.test traz a renda com um ponto no final ('>50K.').
+    'income': [
+        (['<=50K.'], '<=50K'),
+        (['>50K.'], '>50K'),
+    ],
+}
+
+# Valor atribuído às categorias não listadas (inclusive nan) nas colunas em que todas as
+# categorias são agrupadas, como em data['native-country'].map(lambda country: 'US' if ... else 'Other').
+padroes = {
+    'native-country': 'Other',
+}
+
+# Colunas descartadas na seção 6.
+descartadas = ['fnlwgt', 'education', 'capital-loss']
+
+# Limite de ganho de capital acima do qual um registro é considerado outlier.
+LIMITE_GANHO = 40000
+
+
+class PreProcessamento:
+    """Limpeza e engenharia de atributos das seções 5 e 6, ajustada uma vez e reaplicável.
+
+    pre = PreProcessamento().fit(data)
+    data = pre.transform(pre.limpa(data))
+    test = pre.transform(pre.limpa(test, remove_outliers=False))
+    """
+
+    def __init__(self, agrupamentos=agrupamentos, padroes=padroes, descartadas=descartadas, limite_ganho=LIMITE_GANHO):
+        self.agrupamentos = agrupamentos
+        self.padroes = padroes
+        self.descartadas = descartadas
+        self.limite_ganho = limite_ganho
+
+    def fit(self, data):
+        """Registra as categorias de cada coluna e compila as tabelas de agrupamento."""
+        self.colunas_ = [c for c in data.columns if c not in self.descartadas]
+        self.categorias_ = {}
+        self.saida_ = {}
+        self.tabelas_ = {}
+        for c in data.columns:
+            if c in self.descartadas and c not in self.agrupamentos:
+                continue
+            col = data[c]
+            if not _eh_categorica(col):
+                continue
+            mapa = {original: grupo for originais, grupo in self.agrupamentos.get(c, []) for original in originais}
+            vistas = col.cat.categories if isinstance(col.dtype, pd.CategoricalDtype) else col.dropna().unique()
+            categorias = sorted(set(vistas) | set(mapa))
+            padrao = self.padroes.get(c)
+            grupos = [mapa.get(original, original if padrao is None else padrao) for original in categorias]
+            saida = sorted(set(grupos) | ({padrao} if padrao is not None else set()))
+            codigo = {grupo: i for i, grupo in enumerate(saida)}
+            # A última posição da tabela recebe o código -1 (nan ou categoria não vista no fit).
+            tabela = np.array([codigo[g] for g in grupos] + [codigo[padrao] if padrao is not None else -1])
+            self.categorias_[c] = pd.CategoricalDtype(categorias)
+            self.saida_[c] = pd.CategoricalDtype(saida)
+            self.tabelas_[c] = tabela.astype(np.int8 if len(saida) < 127 else np.int32)
+        return self
+
+    def agrupa(self, col):
+        """Agrupa as categorias de uma coluna (Series) com a tabela compilada no fit."""
+        c = col.name
+        codigos = codigos_categoria(col, self.categorias_[c])
+        # Códigos -1 indexam a última posição da tabela.
+        return pd.Series(pd.Categorical.from_codes(self.tabelas_[c][codigos], dtype=self.saida_[c]),
+                         index=col.index, name=c)
+
+    def limpa(self, data, remove_outliers=True):
+        """Remove outliers de ganho de capital, linhas com valores faltantes e duplicadas (seção 6).
+
+        Deve ser chamado com os dados originais, antes do transform. Os valores faltantes
+        das colunas que recebem um valor padrão no agrupamento (native-country) não
+        descartam a linha.
+        """
+        data = self.filtra(data, remove_outliers)
+        return data[~self.chaves_duplicatas(data).duplicated()]
+
+    def filtra(self, data, remove_outliers=True):
+        """Remove os outliers de ganho de capital e as linhas com valores faltantes (sem as duplicatas).
+
+        Cada linha é decidida isoladamente, de modo que o filtro pode ser aplicado lote a lote
+        (limpeza.py).
+        """
+        if remove_outliers and self.limite_ganho is not None:
+            data = data[~(data['capital-gain'] > self.limite_ganho)]
+        return data.dropna(how='any', axis=0, subset=[c for c in data.columns if c not in self.padroes])
+
+    def chaves_duplicatas(self, data):
+        """Colunas comparadas na procura de duplicatas: as originais, com as categorias já agrupadas (seção 6)."""
+        return data.assign(**{c: self.agrupa(data[c]) for c in self.tabelas_ if c in data.columns})
+
+    def transform(self, data):
+        """Agrupa as categorias, combina ganho e perda de capital e descarta as colunas sem uso."""
+        saida = {}
+        for c in self.colunas_:
+            if c not in data.columns:
+                continue
+            if c == 'capital-gain' and 'capital-loss' in data.columns:
+                # Em int64, qualquer que seja o tipo (reduzido) das duas colunas.
+                saida[c] = pd.to_numeric(data['capital-gain'].astype(np.int64) - data['capital-loss'], downcast='signed')
+            elif c in self.tabelas_:
+                saida[c] = self.agrupa(data[c])
+            else:
+                saida[c] = data[c]
+        return pd.DataFrame(saida, index=data.index)
+
+    def fit_transform(self, data):
+        return self.fit(data).transform(data)
+
+
+class CodificadorOneHot:
+    """One-hot com vocabulário fixado no fit, equivalente a pd.get_dummies(data, drop_first=True).
+
+    As colunas numéricas vêm primeiro, seguidas dos dummies de cada coluna categórica, na
+    mesma ordem e com os mesmos nomes ('coluna_categoria') que o get_dummies geraria no
+    treino. Categorias não vistas no fit (e nan) ficam com todos os dummies iguais a zero.
+    """
+
+    def __init__(self, alvo='income', drop_first=True):
+        self.alvo = alvo
+        self.drop_first = drop_first
+
+    def fit(self, data):
+        colunas = [c for c in data.columns if c != self.alvo]
+        numericas = [c for c in colunas if not _eh_categorica(data[c])]
+        vocabulario = {c: _categorias(data[c]) for c in colunas if _eh_categorica(data[c])}
+        classes = _categorias(data[self.alvo]) if self.alvo in data.columns else None
+        return self.define_vocabulario(numericas, vocabulario, classes)
+
+    def define_vocabulario(self, numericas, vocabulario, classes=None):
+        """Fixa as colunas numéricas, o vocabulário de cada coluna categórica e as classes do alvo.
+
+        Usado pelo fit e para reconstruir um codificador já ajustado (por ex., de um artefato).
+        """
+        self.numericas_ = list(numericas)
+        self.categoricas_ = list(vocabulario)
+        self.vocabulario_ = {c: pd.CategoricalDtype(list(v)) for c, v in vocabulario.items()}
+        self.nomes_ = list(self.numericas_)
+        self.deslocamentos_ = {}
+        for c in self.categoricas_:
+            categorias = list(self.vocabulario_[c].categories)
+            inicio = 1 if self.drop_first else 0
+            # Coluna da matriz correspondente ao código 0 da categoria.
+            self.deslocamentos_[c] = len(self.nomes_) - inicio
+            self.nomes_ += [f"{c}_{cat}" for cat in categorias[inicio:]]
+        if classes is not None:
+            self.classes_ = list(classes)
+        return self
+
+    def codigos(self, data):
+        """Códigos inteiros de cada coluna categórica (-1 para nan ou categoria não vista)."""
+        return {c: codigos_categoria(data[c], self.vocabulario_[c]) for c in self.categoricas_}
+
+    def transform(self, data, formato='csr', dtype=np.float64):
+        """Codifica um lote.
+
+        formato: 'csr' (scipy.sparse.csr_matrix, colunas em self.nomes_), 'denso'
+        (np.ndarray do tipo dtype com as mesmas colunas) ou 'codigos' (np.ndarray com as
+        colunas numéricas seguidas de um código inteiro por coluna categórica, colunas em
+        self.nomes_codigos).
+        """
+        n = len(data)
+        codigos = self.codigos(data)
+        if formato == 'codigos':
+            saida = np.empty((n, len(self.numericas_) + len(self.categoricas_)), dtype=np.int64)
+            for j, c in enumerate(self.numericas_):
+                saida[:, j] = data[c].to_numpy()
+            for j, c in enumerate(self.categoricas_, start=len(self.numericas_)):
+                saida[:, j] = codigos[c]
+            return saida
+        if formato == 'denso':
+            # Preenchida diretamente, sem passar pela CSR nem por uma cópia em float64.
+            saida = np.zeros((n, len(self.nomes_)), dtype=dtype)
+            for j, c in enumerate(self.numericas_):
+                saida[:, j] = data[c].to_numpy()
+            for c in self.categoricas_:
+                cod = codigos[c]
+                linhas = np.flatnonzero(cod >= (1 if self.drop_first else 0))
+                saida[linhas, cod[linhas] + self.deslocamentos_[c]] = 1
+            return saida
+        linhas, colunas, valores = [], [], []
+        for j, c in enumerate(self.numericas_):
+            v = data[c].to_numpy(dtype=np.float64)
+            nz = np.flatnonzero(v)
+            linhas.append(nz)
+            colunas.append(np.full(len(nz), j))
+            valores.append(v[nz])
+        for c in self.categoricas_:
+            cod = codigos[c]
+            # Com drop_first, o código 0 (primeira categoria) não gera dummy.
+            nz = np.flatnonzero(cod >= (1 if self.drop_first else 0))
+            linhas.append(nz)
+            colunas.append(cod[nz] + self.deslocamentos_[c])
+            valores.append(np.ones(len(nz)))
+        matriz = sparse.csr_matrix((np.concatenate(valores), (np.concatenate(linhas), np.concatenate(colunas))),
+                                   shape=(n, len(self.nomes_)))
+        return matriz
+
+    def transforma_alvo(self, data):
+        """Alvo binário: True para a última classe (como a coluna 'income_>50K' do get_dummies)."""
+        return (data[self.alvo] == self.classes_[-1]).to_numpy()
+
+    @property
+    def nomes_codigos(self):
+        return self.numericas_ + self.categoricas_
+
+
+def codigos_categoria(col, dtype):
+    """Códigos de col nas categorias de dtype (-1 para nan ou categoria fora de dtype).
+
+    Para o Pandas, dois CategoricalDtype não ordenados com as mesmas categorias em ordens
+    diferentes são iguais, e col.astype(dtype) não recodifica a coluna: os códigos ficariam
+    na ordem de col (por ex., em lotes do le_em_lotes). set_categories recodifica pelos valores.
+    """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.set_categories(dtype.categories).cat.codes.to_numpy()
+    return col.astype(dtype).cat.codes.to_numpy()
+
+
+def _eh_categorica(col):
+    return isinstance(col.dtype, pd.CategoricalDtype) or col.dtype == object
+
+
+def _categorias(col):
+    # Categorias em ordem alfabética e apenas as presentes, como o get_dummies faria.
+    return sorted(col.dropna().unique())
@@ -0,0 +1,333 @@
+# Relatório exploratório do dataset "Adult" (seções 3 a 7 do notebook arvore_decisao_marcelo_danilo.ipynb).
+#
+# Os gráficos (contagens por categoria, histogramas, heatmaps e a árvore ajustada) e as
+# tabelas da análise exploratória são gerados aqui, sem interface gráfica (backend Agg), e
+# gravados em um diretório: um .png por figura, um resumo.txt com as tabelas e um
+# relatorio.html com as tabelas e as figuras. O texto com as observações de cada seção
+# continua no notebook.
+#
+# Este é o único módulo que importa o matplotlib e o seaborn; o treino e a pontuação não
+# dependem dele.
+#
+# As tabelas (contagens, valores únicos, faltantes, describe, correlações e médias por renda)
+# vêm das estatísticas calculadas em uma única passada por estatisticas.py, e não de uma
+# varredura do DataFrame para cada tabela. As figuras também: cada gráfico recebe apenas a
+# tabela de contagens (valor x renda), o histograma ou a matriz de correlação já agregados,
+# com poucas linhas, em vez do DataFrame completo; os agrupamentos da seção 5 e as faixas
+# de idade e de horas são aplicados aos valores distintos de cada coluna, somando as
+# contagens. As figuras são desenhadas em paralelo, em processos separados.
+
+import os
+import html
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from estatisticas import Estatisticas
+
+
+# Níveis desenhados na figura das árvores que não são do sklearn (_desenha_vetores_arvore).
+PROFUNDIDADE_FIGURA = 4
+
+
+# Criando uma função para avaliar a simetria entre os valores de cada categoria de renda no dataset.
+
+def calcula_porcent_renda(est):
+    contador = est.contagem(est.alvo).reindex(est.unicos(est.alvo))
+    linhas = []
+    for key, value in contador.items():
+        porcentagem = value / est.n_linhas_ * 100
+        linhas.append(f"A Classe: {key}, tem o total de {value} indivíduos, o que representa {porcentagem:.2f}% dos dados coletados.")
+    return "\n".join(linhas)
+
+
+# Criando função para calcular os número e a percentagem de valores faltantes em cada coluna
+
+def valoresFaltantes(est):
+    valores_faltantes = est.faltantes()
+    valores_faltantes = pd.DataFrame(valores_faltantes, columns=['Valores Faltantes'])
+    sum_total = est.n_linhas_
+    valores_faltantes['Porcentagem (%)'] = round(((valores_faltantes['Valores Faltantes'] / sum_total) * 100), 1)
+    return valores_faltantes.sort_values('Porcentagem (%)', ascending=False)
+
+
+# Criando Função para gerar o heatmap com as correlações das variáveis numéricas.
+
+def heatMap(corr, ax=None):
+    sns.heatmap(corr, annot=True, fmt='.3f', ax=ax)
+
+
+def contagens(est, coluna, mapa=None):
+    """Tabela valor x classe de renda de uma coluna, a partir das estatísticas.
+
+    mapa (opcional): função aplicada à Series de valores distintos (nan incluído) que
+    devolve o novo valor de cada um (por ex. pre.agrupa ou pd.cut); as contagens dos
+    valores que vão para o mesmo grupo são somadas.
+    """
+    tabela = est.tabelas_[coluna]
+    if mapa is None:
+        # Mesma ordem de um countplot: a das categorias, se houver, ou a de aparição.
+        tabela = tabela[tabela.index.notna()].sort_values('primeira', kind='stable')
+        return tabela[est.classes_].rename_axis(coluna)
+    grupos = mapa(pd.Series(tabela.index, name=coluna))
+    somadas = tabela[est.classes_].reset_index(drop=True).groupby(grupos.reset_index(drop=True), observed=False, sort=True).sum()
+    return somadas[somadas.index.notna()].rename_axis(coluna)
+
+
+class Relatorio:
+    """Acumula as tabelas do resumo e as figuras, gravadas em 'diretorio'.
+
+    As figuras são apenas registradas (nome, tipo de desenho e dados já agregados) e são
+    desenhadas todas juntas, em paralelo, por renderiza.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.secoes = []
+        self.figuras = []
+        os.makedirs(diretorio, exist_ok=True)
+
+    def tabela(self, titulo, conteudo):
+        self.secoes.append((titulo, conteudo))
+
+    def figura(self, nome, desenho, figsize=(16, 4), **argumentos):
+        self.figuras.append((os.path.join(self.diretorio, f"{nome}.png"), desenho, figsize, argumentos))
+
+    def contagem(self, nome, tabela, hue=None, figsize=(16, 4)):
+        self.figura(nome, 'contagem', figsize, tabela=tabela, hue=hue)
+
+    def renderiza(self, n_jobs=None):
+        """Desenha as figuras registradas, em n_jobs processos (padrão: um por núcleo)."""
+        n_jobs = min(n_jobs or os.cpu_count() or 1, len(self.figuras))
+        # As figuras mais demoradas (a árvore, os histogramas) primeiro.
+        ordem = sorted(self.figuras, key=lambda f: -f[2][0] * f[2][1])
+        if n_jobs <= 1:
+            for figura in ordem:
+                _renderiza(figura)
+        else:
+            with ProcessPoolExecutor(n_jobs) as pool:
+                list(pool.map(_renderiza, ordem))
+
+    def grava_resumo(self):
+        with open(os.path.join(self.diretorio, 'resumo.txt'), 'w') as f:
+            f.write("\n".join(f"## {titulo}\n\n{conteudo}\n" for titulo, conteudo in self.secoes))
+        partes = ['<!DOCTYPE html>', '<html><head><meta charset="utf-8"><title>Relatório - Adult</title></head><body>']
+        for titulo, conteudo in self.secoes:
+            partes.append(f"<h2>{html.escape(titulo)}</h2>\n<pre>{html.escape(conteudo)}</pre>")
+        for caminho, _, _, _ in self.figuras:
+            nome = os.path.basename(caminho)
+            partes.append(f'<h3>{html.escape(nome[:-4])}</h3>\n<img src="{html.escape(nome)}" style="max-width: 100%">')
+        partes.append('</body></html>')
+        with open(os.path.join(self.diretorio, 'relatorio.html'), 'w') as f:
+            f.write("\n".join(partes))
+
+
+# Desenhos, executados nos processos de renderização a partir dos dados já agregados.
+
+def _desenha_contagem(ax, tabela, hue=None):
+    # Equivalente a sns.countplot(data, x=tabela.index.name, hue=hue) sobre as linhas originais.
+    x = tabela.index.name
+    longo = tabela.rename(index=str).rename_axis(x).reset_index().melt(id_vars=x, var_name=hue or 'classe', value_name='count')
+    ordem = [str(v) for v in tabela.index]
+    if hue is None:
+        totais = longo.groupby(x, sort=False)['count'].sum().reindex(ordem).reset_index()
+        sns.barplot(data=totais, x=x, y='count', order=ordem, errorbar=None, ax=ax)
+    else:
+        sns.barplot(data=longo, x=x, y='count', hue=hue, order=ordem, hue_order=[str(c) for c in tabela.columns],
+                    errorbar=None, ax=ax)
+
+
+def _desenha_histogramas(fig, histogramas):
+    # Equivalente a DataFrame.hist(bins=20, histtype='step'): um eixo por coluna.
+    n = len(histogramas)
+    k = int(np.ceil(np.sqrt(n)))
+    linhas = k - 1 if (k - 1) * k >= n else k
+    eixos = fig.subplots(linhas, k, squeeze=False).ravel()
+    for ax, (coluna, (contagens, limites)) in zip(eixos, histogramas.items()):
+        ax.hist(limites[:-1], bins=limites, weights=contagens, histtype='step')
+        ax.set_title(coluna)
+        ax.grid(True)
+    for ax in eixos[n:]:
+        ax.set_visible(False)
+
+
+def _desenha_heatmap(ax, corr):
+    heatMap(corr, ax)
+
+
+def _desenha_arvore(ax, estimador, nomes):
+    from sklearn.tree import plot_tree
+
+    plot_tree(estimador, ax=ax, feature_names=nomes, rounded=True, filled=True, precision=2, class_names=['Pobre', 'Rico'])
+
+
+def _desenha_vetores_arvore(ax, arvore, nomes, max_depth=PROFUNDIDADE_FIGURA):
+    # Como o plot_tree, a partir dos vetores de um tree_ (as árvores de histograma.py,
+    # incremental.py e distribuido.py, que o plot_tree não aceita), até max_depth níveis.
+    posicoes, arestas, folhas = {}, [], [0]
+
+    def posiciona(no, profundidade):
+        if arvore.children_left[no] == -1 or profundidade == max_depth:
+            x = folhas[0]
+            folhas[0] += 1
+        else:
+            filhos = (arvore.children_left[no], arvore.children_right[no])
+            x = sum(posiciona(f, profundidade + 1) for f in filhos) / 2
+            arestas.extend((no, f) for f in filhos)
+        posicoes[no] = (x, -profundidade)
+        return x
+
+    posiciona(0, 0)
+    for a, b in arestas:
+        ax.plot(*zip(posicoes[a], posicoes[b]), color='black', linewidth=0.8, zorder=1)
+    cores = [np.array([229, 129, 57]) / 255, np.array([57, 157, 229]) / 255]
+    for no, (x, y) in posicoes.items():
+        valor = np.asarray(arvore.value[no]).ravel()
+        proporcao = valor / valor.sum() if valor.sum() else valor
+        classe = int(np.argmax(proporcao))
+        if arvore.children_left[no] != -1 and -y == max_depth:
+            texto = '(...)'
+        else:
+            linhas = [f"value = [{', '.join(f'{v:.2f}' for v in valor)}]", f"class = {['Pobre', 'Rico'][classe]}"]
+            if arvore.children_left[no] != -1:
+                linhas.insert(0, f"{nomes[arvore.feature[no]]} <= {arvore.threshold[no]:.2f}")
+            texto = '\n'.join(linhas)
+        cor = (*cores[classe], float(abs(proporcao[1] - proporcao[0])) if len(proporcao) == 2 else 0.0)
+        ax.text(x, y, texto, ha='center', va='center', zorder=2,
+                bbox={'boxstyle': 'round', 'facecolor': cor, 'edgecolor': 'black'})
+    ax.set_xlim(-0.5, folhas[0] - 0.5)
+    ax.set_ylim(min(y for _, y in posicoes.values()) - 0.5, 0.5)
+    ax.axis('off')
+
+
+def _desenha_confusao(ax, matriz):
+    from sklearn.metrics import ConfusionMatrixDisplay
+
+    ConfusionMatrixDisplay(confusion_matrix=matriz, display_labels=['Pobre', 'Rico']).plot(ax=ax)
+
+
+desenhos = {'contagem': _desenha_contagem, 'heatmap': _desenha_heatmap, 'arvore': _desenha_arvore,
+            'vetores_arvore': _desenha_vetores_arvore, 'confusao': _desenha_confusao}
+
+
+def _renderiza(figura):
+    caminho, desenho, figsize, argumentos = figura
+    if desenho == 'histogramas':
+        fig = plt.figure(figsize=figsize)
+        _desenha_histogramas(fig, **argumentos)
+    else:
+        fig, ax = plt.subplots(figsize=figsize)
+        desenhos[desenho](ax, **argumentos)
+    try:
+        fig.savefig(caminho, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return caminho
+
+
+def secao_dataset(rel, data, est):
+    # 3. O Dataset
+    rel.tabela('Primeiras linhas', data.head().to_string())
+    rel.tabela('Formato', str(data.shape))
+    rel.tabela('Distribuição da renda', est.contagem('income').to_string())
+    rel.tabela('Porcentagem de cada categoria de renda', calcula_porcent_renda(est))
+    rel.tabela('Tipos de dados', data.dtypes.to_string())
+    for c in ['workclass', 'occupation', 'native-country']:
+        rel.tabela(f"Dados únicos do {c}", ", ".join(map(str, est.unicos(c))))
+    rel.tabela('Valores faltantes', valoresFaltantes(est).to_string())
+
+
+def secao_variaveis(rel, data, est):
+    # 4. Explorando as variáveis
+    rel.tabela('Países de origem', est.contagem('native-country').to_string())
+    num_data = ['age', 'fnlwgt', 'education-num', 'capital-gain', 'capital-loss', 'hours-per-week']
+    cat_data = [c for c in data.columns if c not in est.numericas_]
+
+    # 4.1 Variáveis numéricas
+    rel.tabela('Sumário das variáveis numéricas', est.descreve().to_string(float_format='%.3f'))
+    rel.figura('4_1_histogramas', 'histogramas', (20, 15), histogramas={c: est.histograma(c, 20) for c in num_data})
+    rel.figura('4_1_correlacoes', 'heatmap', (8, 6), corr=est.correlacao(num_data))
+    rel.tabela('Médias das variáveis numéricas por renda', est.medias_por_renda(num_data).to_string())
+
+    # 4.2 Variáveis categóricas
+    for i in cat_data:
+        if i == 'native-country':
+            tabela = contagens(est, i, lambda col: col.map(lambda country: country if country == 'United-States' else 'Others'))
+        else:
+            tabela = contagens(est, i, _categorias if isinstance(data[i].dtype, pd.CategoricalDtype) else None)
+        rel.contagem(f"4_2_{i}", tabela, figsize=(25, 5))
+
+
+def _categorias(col):
+    # Valores como categorias ordenadas, como numa coluna 'category' do carrega_adult.
+    return col.astype(pd.CategoricalDtype(sorted(col.dropna().unique())))
+
+
+def secao_engenharia(rel, data, pre, est):
+    # 5. Engenharia de atributos: cada agrupamento de preprocessamento.PreProcessamento, coluna a coluna.
+    for c in ['workclass', 'education', 'marital-status', 'occupation', 'native-country']:
+        if c == 'education':
+            # Só a coluna education-num é agrupada, e não todas as colunas do DataFrame.
+            rel.tabela('Interseção entre educação e escolaridade',
+                       data.groupby('education', observed=True)['education-num'].nunique().to_string())
+        tabela = contagens(est, c, pre.agrupa)
+        rel.contagem(f"5_{c}", tabela)
+        rel.contagem(f"5_{c}_renda", tabela, hue='income')
+    rel.contagem('5_age-range_renda', contagens(est, 'age', lambda col: pd.cut(col, 10)).rename_axis('age-range'), hue='income')
+    for c in ['relationship', 'sex', 'race']:
+        rel.contagem(f"5_{c}_renda", contagens(est, c, _categorias), hue='income')
+    rel.contagem('5_h-w-range_renda', contagens(est, 'hours-per-week', lambda col: pd.cut(col, 5)).rename_axis('h/w-range'), hue='income')
+
+
+def secao_processamento(rel, est):
+    # 6. Processamento dos dados (estatísticas do dataset já limpo e transformado)
+    rel.tabela('Sumário após o processamento', est.descreve().to_string(float_format='%.3f'))
+    rel.figura('6_correlacoes', 'heatmap', (8, 6), corr=est.correlacao(['age', 'education-num', 'capital-gain', 'hours-per-week']))
+
+
+def secao_modelo(rel, modelo, X, y):
+    # 7. Construção do modelo: a árvore ajustada e a matriz de confusão
+    from sklearn.metrics import confusion_matrix
+    from sklearn.tree import BaseDecisionTree
+
+    estimador = modelo.estimador
+    if isinstance(estimador, BaseDecisionTree):
+        rel.figura('tree', 'arvore', (30, 30), estimador=estimador, nomes=modelo.codificador.nomes_)
+    elif hasattr(estimador, 'tree_'):
+        rel.figura('tree', 'vetores_arvore', (30, 30), arvore=estimador.tree_, nomes=modelo.codificador.nomes_)
+    else:
+        rel.tabela('Árvore ajustada', f"figura omitida: o estimador ({type(estimador).__name__}) não é uma árvore única")
+    rel.figura('confusion_decision_tree', 'confusao', (6, 6), matriz=confusion_matrix(y, modelo.estimador.predict(X)))
+
+
+def gera_relatorio(data, pre, diretorio='relatorio', modelo=None, teste=None, estatisticas=None,
+                   estatisticas_processado=None, n_jobs=None):
+    """Gera todas as figuras e tabelas da análise exploratória em 'diretorio'.
+
+    data: dataset de treino bruto (carrega_adult); pre: PreProcessamento ajustado.
+    modelo e teste (opcionais): ModeloRenda ajustado e dataset de testes bruto, para as
+    figuras da árvore e da matriz de confusão.
+    estatisticas, estatisticas_processado (opcionais): Estatisticas (estatisticas.py) do
+    dataset bruto e do dataset limpo e transformado, por ex. lidas do cache; calculadas
+    aqui se não forem informadas.
+    n_jobs: processos usados para desenhar as figuras (padrão: um por núcleo).
+    """
+    rel = Relatorio(diretorio)
+    est = estatisticas or Estatisticas().fit(data)
+    secao_dataset(rel, data, est)
+    secao_variaveis(rel, data, est)
+    secao_engenharia(rel, data, pre, est)
+    if estatisticas_processado is None:
+        estatisticas_processado = Estatisticas().fit(pre.transform(pre.limpa(data)))
+    secao_processamento(rel, estatisticas_processado)
+    if modelo is not None and teste is not None:
+        teste = modelo.pre.transform(modelo.pre.limpa(teste, remove_outliers=False))
+        secao_modelo(rel, modelo, modelo.codificador.transform(teste), modelo.codificador.transforma_alvo(teste))
+    rel.renderiza(n_jobs)
+    rel.grava_resumo()
+    return rel
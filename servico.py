@@ -0,0 +1,321 @@
+# Serviço HTTP de pontuação com micro-lotes (asyncio, apenas biblioteca padrão).
+#
+# Uso:
+#   python servico.py modelos/arvore_decisao --porta 8000 --max-lote 512 --espera-max 5
+#   python carga.py --porta 8000 --conexoes 64 --duracao 10
+#
+# Rotas:
+#   POST /pontua    um registro (objeto JSON com as colunas do dataset Adult) ou vários
+#                   (lista de objetos); responde {"income": ..., "probabilidade": ...} ou a lista.
+#   GET  /metricas  requisições, linhas, lotes, latência p50/p99 e vazão desde o início.
+#
+# Chamar o modelo a cada requisição gasta quase todo o tempo no custo fixo de cada chamada
+# (montar o DataFrame, pré-processar, codificar, chamar o estimador). Aqui as requisições
+# que chegam ao mesmo tempo entram em uma fila; um único consumidor junta até max_lote
+# linhas, esperando no máximo espera_max desde a primeira da fila, e pontua o lote inteiro
+# com uma única chamada a modelo.pontua, em uma thread à parte para não travar o laço de
+# eventos. Enquanto um lote é pontuado, o próximo se forma na fila.
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from carregamento import colunas, colunas_numericas, colunas_categoricas, valores_faltantes
+from modelo import ModeloRenda
+from artefato import carrega_artefato
+
+
+# Linhas por lote e espera máxima (segundos) desde a primeira requisição do lote.
+MAX_LOTE = 512
+ESPERA_MAX = 0.005
+# Número de latências guardadas para o cálculo dos percentis.
+JANELA_LATENCIAS = 100000
+# Maior corpo de requisição aceito (bytes).
+MAX_CORPO = 64 << 20
+# Colunas numéricas que podem faltar nos registros: o pré-processamento as descarta sem usá-las.
+numericas_opcionais = ['fnlwgt']
+
+
+class RegistroInvalido(ValueError):
+    pass
+
+
+def valida_registros(registros):
+    """Confere os registros de uma requisição (em Python puro, sem montar DataFrame).
+
+    Converte as colunas numéricas para int; levanta RegistroInvalido se algum registro não
+    for um objeto JSON, tiver uma coluna numérica ausente (exceto as de numericas_opcionais,
+    que podem faltar ou ser null) ou que não seja um inteiro (37.9 e true são recusados; 37.0
+    e "37" são aceitos) ou uma coluna categórica que não seja texto ou null.
+    """
+    if not isinstance(registros, list):
+        raise RegistroInvalido('o corpo deve ser um objeto JSON ou uma lista de objetos')
+    for r in registros:
+        if not isinstance(r, dict):
+            raise RegistroInvalido('cada registro deve ser um objeto JSON')
+        for c in colunas_numericas:
+            if c in numericas_opcionais and r.get(c) is None:
+                r.pop(c, None)
+                continue
+            r[c] = _inteiro(r.get(c), c)
+        for c in colunas_categoricas:
+            if not isinstance(r.get(c), (str, type(None))):
+                raise RegistroInvalido(f"coluna categórica '{c}' deve ser texto ou null")
+    return registros
+
+
+def _inteiro(valor, c):
+    if isinstance(valor, bool):
+        valor = None
+    elif isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    if isinstance(valor, (int, str)):
+        try:
+            return int(valor)
+        except ValueError:
+            pass
+    raise RegistroInvalido(f"coluna numérica '{c}' ausente ou inválida")
+
+
+def registros_para_data(registros):
+    """DataFrame no formato de carregamento.carrega_adult a partir de registros já validados.
+
+    Uma coluna de numericas_opcionais que falte em algum registro fica fora do DataFrame.
+    """
+    data = {}
+    for c in colunas:
+        if c == 'income' or (c in numericas_opcionais and not all(c in r for r in registros)):
+            continue
+        if c in colunas_numericas:
+            data[c] = np.fromiter((r[c] for r in registros), dtype=np.int64, count=len(registros))
+        else:
+            valores = [r.get(c) for r in registros]
+            data[c] = pd.Series([None if v in valores_faltantes else v for v in valores], dtype=object)
+    return pd.DataFrame(data)
+
+
+class Microlotes:
+    """Junta as requisições concorrentes em lotes e pontua cada lote com uma chamada ao modelo.
+
+    lotes = Microlotes(modelo)
+    resultados = await lotes.pontua(registros)   # dentro do laço de eventos
+    """
+
+    def __init__(self, modelo, max_lote=MAX_LOTE, espera_max=ESPERA_MAX):
+        self.modelo = modelo
+        self.max_lote = max_lote
+        self.espera_max = espera_max
+        self.fila = asyncio.Queue()
+        self.latencias = deque(maxlen=JANELA_LATENCIAS)
+        self.requisicoes = 0
+        self.linhas = 0
+        self.lotes = 0
+        self.inicio = time.perf_counter()
+        self._consumidor = None
+
+    def inicia(self):
+        self._consumidor = asyncio.get_running_loop().create_task(self._consome())
+
+    async def para(self):
+        if self._consumidor is not None:
+            self._consumidor.cancel()
+            try:
+                await self._consumidor
+            except asyncio.CancelledError:
+                pass
+
+    async def pontua(self, registros):
+        """Lista de resultados ({'income', 'probabilidade'}) para os registros, na mesma ordem."""
+        valida_registros(registros)
+        # Uma lista vazia não entra na fila: não há o que pontuar.
+        if not registros:
+            return []
+        futuro = asyncio.get_running_loop().create_future()
+        await self.fila.put((registros, futuro, time.perf_counter()))
+        return await futuro
+
+    async def _consome(self):
+        laco = asyncio.get_running_loop()
+        while True:
+            itens = [await self.fila.get()]
+            linhas = len(itens[0][0])
+            limite = laco.time() + self.espera_max
+            while linhas < self.max_lote:
+                restante = limite - laco.time()
+                if restante <= 0:
+                    # Sem espera: leva o que já está na fila.
+                    if self.fila.empty():
+                        break
+                    item = self.fila.get_nowait()
+                else:
+                    try:
+                        item = await asyncio.wait_for(self.fila.get(), restante)
+                    except asyncio.TimeoutError:
+                        break
+                itens.append(item)
+                linhas += len(item[0])
+            try:
+                resultados = await laco.run_in_executor(None, self._pontua_lote, [registros for registros, _, _ in itens])
+            except Exception:
+                # Uma requisição com problema não pode derrubar as outras do lote: cada uma é
+                # pontuada de novo sozinha e recebe o próprio resultado ou a própria exceção.
+                resultados = []
+                for registros, _, _ in itens:
+                    try:
+                        resultados.append((await laco.run_in_executor(None, self._pontua_lote, [registros]))[0])
+                    except Exception as e:
+                        resultados.append(e)
+            agora = time.perf_counter()
+            for (_, futuro, chegada), resultado in zip(itens, resultados):
+                if not futuro.done():
+                    if isinstance(resultado, Exception):
+                        futuro.set_exception(resultado)
+                    else:
+                        futuro.set_result(resultado)
+                self.latencias.append(agora - chegada)
+            self.requisicoes += len(itens)
+            self.linhas += linhas
+            self.lotes += 1
+
+    def _pontua_lote(self, partes):
+        # Roda fora do laço de eventos: um único DataFrame e uma única chamada ao modelo.
+        classe, proba = self.modelo.pontua(registros_para_data([r for parte in partes for r in parte]))
+        rotulos = self.modelo.rotulos(classe)
+        resultados, inicio = [], 0
+        for parte in partes:
+            fim = inicio + len(parte)
+            resultados.append([{'income': r, 'probabilidade': float(p)}
+                               for r, p in zip(rotulos[inicio:fim], proba[inicio:fim])])
+            inicio = fim
+        return resultados
+
+    def metricas(self):
+        segundos = time.perf_counter() - self.inicio
+        latencias = np.array(self.latencias) * 1000
+        p50, p99 = np.percentile(latencias, [50, 99]) if len(latencias) else (0.0, 0.0)
+        return {'requisicoes': self.requisicoes, 'linhas': self.linhas, 'lotes': self.lotes,
+                'linhas_por_lote': self.linhas / self.lotes if self.lotes else 0.0,
+                'latencia_p50_ms': float(p50), 'latencia_p99_ms': float(p99),
+                'requisicoes_por_s': self.requisicoes / segundos, 'linhas_por_s': self.linhas / segundos,
+                'segundos': segundos}
+
+
+async def _le_requisicao(leitor):
+    # Retorna (método, caminho, cabeçalhos, corpo), ou None se a conexão foi fechada.
+    linha = await leitor.readline()
+    if not linha:
+        return None
+    metodo, caminho, _ = linha.decode('latin-1').split(' ', 2)
+    cabecalhos = {}
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b'\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        cabecalhos[nome.strip().lower()] = valor.strip()
+    tamanho = int(cabecalhos.get('content-length', 0))
+    if tamanho > MAX_CORPO:
+        raise RegistroInvalido('corpo da requisição grande demais')
+    corpo = await leitor.readexactly(tamanho) if tamanho else b''
+    return metodo, caminho, cabecalhos, corpo
+
+
+def _resposta(status, obj, manter=True):
+    corpo = json.dumps(obj, ensure_ascii=False).encode()
+    textos = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+    cabecalho = (f"HTTP/1.1 {status} {textos[status]}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(corpo)}\r\nConnection: {'keep-alive' if manter else 'close'}\r\n\r\n")
+    return cabecalho.encode() + corpo
+
+
+class Servico:
+    """Servidor HTTP/1.1 (com keep-alive) em volta de um Microlotes."""
+
+    def __init__(self, modelo, max_lote=MAX_LOTE, espera_max=ESPERA_MAX):
+        self.microlotes = Microlotes(modelo, max_lote, espera_max)
+
+    async def atende(self, leitor, escritor):
+        try:
+            while True:
+                try:
+                    requisicao = await _le_requisicao(leitor)
+                except (ValueError, asyncio.IncompleteReadError):
+                    escritor.write(_resposta(400, {'erro': 'requisição HTTP inválida'}, manter=False))
+                    break
+                if requisicao is None:
+                    break
+                metodo, caminho, cabecalhos, corpo = requisicao
+                manter = cabecalhos.get('connection', '').lower() != 'close'
+                status, obj = await self._responde(metodo, caminho.split('?', 1)[0], corpo)
+                escritor.write(_resposta(status, obj, manter))
+                await escritor.drain()
+                if not manter:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    async def _responde(self, metodo, caminho, corpo):
+        if metodo == 'GET' and caminho == '/metricas':
+            return 200, self.microlotes.metricas()
+        if metodo != 'POST' or caminho != '/pontua':
+            return 404, {'erro': f"rota desconhecida: {metodo} {caminho}"}
+        try:
+            conteudo = json.loads(corpo)
+            unico = isinstance(conteudo, dict)
+            resultados = await self.microlotes.pontua([conteudo] if unico else conteudo)
+        except (ValueError, TypeError) as e:
+            return 400, {'erro': str(e)}
+        except Exception as e:
+            return 500, {'erro': f"{type(e).__name__}: {e}"}
+        return 200, resultados[0] if unico else resultados
+
+    async def serve(self, host='127.0.0.1', porta=8000, pronto=None):
+        self.microlotes.inicia()
+        servidor = await asyncio.start_server(self.atende, host, porta)
+        if pronto is not None:
+            pronto(servidor)
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            await self.microlotes.para()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serviço HTTP de pontuação com micro-lotes.')
+    parser.add_argument('modelo', help='modelo salvo com ModeloRenda.salva ou diretório de artefato')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--max-lote', type=int, default=MAX_LOTE, help=f"linhas por lote (padrão: {MAX_LOTE})")
+    parser.add_argument('--espera-max', type=float, default=ESPERA_MAX * 1000,
+                        help=f"espera máxima por lote, em ms (padrão: {ESPERA_MAX * 1000:g})")
+    parser.add_argument('--memoiza', type=int, default=0, metavar='N', help='cache de N vetores (memoizacao.py)')
+    args = parser.parse_args(argv)
+
+    modelo = carrega_artefato(args.modelo) if os.path.isdir(args.modelo) else ModeloRenda.carrega(args.modelo)
+    if args.memoiza:
+        from memoizacao import PreditorMemoizado
+        modelo = PreditorMemoizado(modelo, args.memoiza)
+    servico = Servico(modelo, args.max_lote, args.espera_max / 1000)
+
+    def pronto(servidor):
+        print(f"servindo em http://{args.host}:{args.porta} (max_lote={args.max_lote}, "
+              f"espera_max={args.espera_max:g}ms)", file=sys.stderr)
+
+    try:
+        asyncio.run(servico.serve(args.host, args.porta, pronto))
+    except KeyboardInterrupt:
+        print(json.dumps(servico.microlotes.metricas()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
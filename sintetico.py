@@ -0,0 +1,148 @@
+# Gerador de datasets sintéticos no formato do dataset Adult, em qualquer escala.
+#
+# Uso:
+#   python sintetico.py data/adult.data .cache/benchmark/adult_x100.data --escala 100
+#
+# O gerador é ajustado com o adult.data e sorteia cada registro em duas etapas: primeiro a
+# renda (income), com a mesma distribuição do arquivo original; depois as demais colunas,
+# com a distribuição observada dentro daquela classe de renda. As colunas categóricas
+# correlacionadas entre si são sorteadas em conjunto, entre as combinações observadas na
+# classe, em dois grupos ('conjuntas'): workclass, occupation, marital-status, relationship
+# e sex (os '?' de workclass e occupation aparecem juntos; relationship depende de sex e de
+# marital-status), e race com native-country; as outras, de forma independente. Assim as distribuições marginais, as conjuntas com a
+# renda e as conjuntas dentro de cada grupo são as do arquivo original (a menos do
+# sorteio), e o dropna e o drop_duplicates da limpeza removem frações de linhas próximas
+# das do arquivo original. As colunas numéricas são sorteadas entre os valores observados
+# na classe, e education-num, que é uma recodificação de education, é sorteada dado o
+# valor de education, para manter a correspondência entre as duas.
+#
+# Os arquivos são gerados e gravados em lotes, com memória constante.
+
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from carregamento import colunas, tipos, carrega_adult
+
+
+# Colunas sorteadas dado o valor de outra coluna, em vez de dado a renda.
+dependentes = {'education-num': 'education'}
+
+# Grupos de colunas sorteadas em conjunto (uma combinação observada), dado a renda.
+conjuntas = [('workclass', 'occupation', 'marital-status', 'relationship', 'sex'), ('race', 'native-country')]
+
+# Versão das distribuições do gerador, no nome dos arquivos guardados pelo benchmark: uma
+# mudança no sorteio invalida os datasets já gerados.
+VERSAO = 2
+
+# Linhas geradas e gravadas por lote.
+TAMANHO_LOTE = 1000000
+
+# Primeira linha dos arquivos gerados, descartada na leitura com skiprows=1 (como no adult.test).
+CABECALHO = '|sintetico'
+
+
+class GeradorCenso:
+    """Sorteia registros com as distribuições de cada coluna (ou grupo de colunas) dentro de cada classe de renda.
+
+    gerador = GeradorCenso().fit(carrega_adult('data/adult.data', skiprows=1))
+    data = gerador.gera(100000, random_state=0)
+    """
+
+    def __init__(self, alvo='income', dependentes=dependentes, conjuntas=conjuntas):
+        self.alvo = alvo
+        self.dependentes = dependentes
+        self.conjuntas = conjuntas
+
+    def fit(self, data):
+        alvo = data[self.alvo].astype(str)
+        self.classes_, contagem = np.unique(alvo, return_counts=True)
+        self.proba_classes_ = contagem / contagem.sum()
+        self.n_linhas_ = len(data)
+        self.colunas_ = [c for c in data.columns if c != self.alvo]
+        self.grupos_ = [tuple(g) for g in self.conjuntas if all(c in self.colunas_ for c in g)]
+        agrupadas = {c for g in self.grupos_ for c in g}
+        self.grupos_ += [(c,) for c in self.colunas_ if c not in agrupadas and c not in self.dependentes]
+        # Combinações observadas de cada grupo em cada classe e valores observados de cada
+        # coluna dependente em cada valor da coluna de que depende.
+        self.valores_ = {}
+        for grupo in self.grupos_:
+            self.valores_[grupo] = {k: self._distribuicao(parte)
+                                    for k, parte in data[list(grupo)].groupby(alvo.to_numpy(), sort=True)}
+        for c in self.colunas_:
+            if c in self.dependentes:
+                chave = data[self.dependentes[c]].astype(object).to_numpy()
+                self.valores_[c] = {k: self._distribuicao(parte) for k, parte in data[[c]].groupby(chave, sort=True)}
+        return self
+
+    @staticmethod
+    def _distribuicao(data):
+        # Combinações distintas das colunas (nan incluído), como array (combinações x colunas), e a frequência de cada uma.
+        contagem = data.astype(object).value_counts(dropna=False, sort=False)
+        valores = np.empty((len(contagem), data.shape[1]), dtype=object)
+        valores[:] = list(contagem.index)
+        return valores, (contagem / contagem.sum()).to_numpy()
+
+    def gera(self, n, random_state=None):
+        """DataFrame com n registros, com as mesmas colunas e tipos de carregamento.carrega_adult."""
+        rng = np.random.default_rng(random_state)
+        rotulos = rng.choice(len(self.classes_), size=n, p=self.proba_classes_)
+        saida = {self.alvo: self.classes_[rotulos].astype(object)}
+        # As colunas de que outras dependem são sorteadas primeiro.
+        for grupo in self.grupos_:
+            valores = self._sorteia(self.valores_[grupo], saida[self.alvo], rng)
+            for i, c in enumerate(grupo):
+                saida[c] = valores[:, i]
+        for c in self.colunas_:
+            if c in self.dependentes:
+                saida[c] = self._sorteia(self.valores_[c], saida[self.dependentes[c]], rng)[:, 0]
+        data = pd.DataFrame({c: saida[c] for c in colunas if c in saida})
+        for c in data.columns:
+            if tipos.get(c) == 'int64':
+                data[c] = data[c].astype(np.int64)
+        return data
+
+    @staticmethod
+    def _sorteia(distribuicoes, chave, rng):
+        # Uma combinação sorteada por linha, com a distribuição do valor da chave da linha.
+        saida = np.empty((len(chave), next(iter(distribuicoes.values()))[0].shape[1]), dtype=object)
+        for k, (valores, proba) in distribuicoes.items():
+            linhas = np.flatnonzero(chave == k)
+            saida[linhas] = valores[rng.choice(len(valores), size=len(linhas), p=proba)]
+        return saida
+
+    def grava(self, caminho, n, random_state=None, tamanho_lote=TAMANHO_LOTE):
+        """Gera n registros e grava no formato do adult.data, em lotes de tamanho_lote linhas."""
+        pai = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(pai, exist_ok=True)
+        rng = np.random.default_rng(random_state)
+        tmp = f"{caminho}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(CABECALHO + '\n')
+            for inicio in range(0, n, tamanho_lote):
+                lote = self.gera(min(tamanho_lote, n - inicio), rng)
+                lote.to_csv(f, header=False, index=False, na_rep='?')
+        os.replace(tmp, caminho)
+        return caminho
+
+
+def gera_escala(origem, destino, escala, random_state=0, skiprows=1):
+    """Grava em 'destino' um dataset com 'escala' vezes o número de linhas de 'origem'."""
+    gerador = GeradorCenso().fit(carrega_adult(origem, skiprows=skiprows))
+    return gerador.grava(destino, int(round(gerador.n_linhas_ * escala)), random_state)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera um dataset sintético no formato do dataset Adult.')
+    parser.add_argument('origem', help='arquivo de onde tirar as distribuições (adult.data)')
+    parser.add_argument('destino')
+    parser.add_argument('--escala', type=float, default=1.0, help='múltiplo do número de linhas da origem')
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args(argv)
+    gera_escala(args.origem, args.destino, args.escala, args.semente)
+
+
+if __name__ == '__main__':
+    main()
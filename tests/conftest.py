@@ -0,0 +1,87 @@
+# Dados e modelo compartilhados pelos testes: o adult.data e o adult.test do diretório data/.
+
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+TREINO = os.path.join(RAIZ, 'data', 'adult.data')
+TESTE = os.path.join(RAIZ, 'data', 'adult.test')
+# Como no script principal, a primeira linha dos dois arquivos é descartada.
+SKIPROWS = 1
+
+
+@pytest.fixture(scope='session')
+def treino():
+    from carregamento import carrega_adult
+    return carrega_adult(TREINO, skiprows=SKIPROWS)
+
+
+@pytest.fixture(scope='session')
+def teste():
+    from carregamento import carrega_adult
+    return carrega_adult(TESTE, skiprows=SKIPROWS)
+
+
+@pytest.fixture(scope='session')
+def modelo():
+    """ModeloRenda do script principal (DecisionTreeClassifier com parametros_arvore)."""
+    from arvore_decisao_marcelo_danilo import treina
+    return treina(TREINO, destino=None)
+
+
+@pytest.fixture(scope='session')
+def matrizes(modelo, treino, teste):
+    """Matriz e alvo do treino limpo e matriz do adult.test, codificados como no modelo."""
+    import numpy as np
+
+    pre, cod = modelo.pre, modelo.codificador
+    treino = pre.transform(pre.limpa(treino))
+    teste = pre.transform(pre.limpa(teste, remove_outliers=False))
+    return (cod.transform(treino, formato='denso', dtype=np.float32), cod.transforma_alvo(treino),
+            cod.transform(teste, formato='denso', dtype=np.float32))
+
+
+def secoes_originais(caminho, remove_outliers=True):
+    """Seções 5 e 6 do script original: replace encadeados, map, dropna, drop_duplicates e apply por linha."""
+    import pandas as pd
+    from carregamento import colunas
+
+    data = pd.read_csv(caminho, sep=', ', names=colunas, engine='python', skiprows=SKIPROWS, na_values=['?'])
+    data['workclass'].replace(['State-gov', 'Federal-gov', 'Local-gov'], 'Government', inplace=True)
+    data['workclass'].replace(['Self-emp-not-inc', 'Self-emp-inc'], 'Self', inplace=True)
+    data['workclass'].replace(['Without-pay', 'Never-worked'], 'Others', inplace=True)
+    data['education'].replace(['11th', '9th', '7th-8th', '5th-6th', '10th', '1st-4th', 'Preschool', '12th'],
+                              'School-Dropout', inplace=True)
+    data['education'].replace(['Some-college', 'Assoc-acdm', 'Assoc-voc'], 'College', inplace=True)
+    data['education'].replace('Prof-school', 'Masters', inplace=True)
+    data['marital-status'].replace(['Married-AF-spouse', 'Married-civ-spouse', 'Married-spouse-absent'], 'Married',
+                                   inplace=True)
+    data['marital-status'].replace('Divorced', 'Separated', inplace=True)
+    data['occupation'].replace(['Tech-support', 'Craft-repair', 'Handlers-cleaners', 'Transport-moving',
+                                'Machine-op-inspct'], 'Blue-collar', inplace=True)
+    data['occupation'].replace(['Exec-managerial', 'Adm-clerical'], 'White-collar', inplace=True)
+    data['occupation'].replace('Prof-specialty', 'Gold-collar', inplace=True)
+    data['occupation'].replace(['Other-service', 'Sales', 'Priv-house-serv', 'Protective-serv'], 'Pink-collar',
+                               inplace=True)
+    data['occupation'].replace('Farming-fishing', 'Green-collar', inplace=True)
+    data['occupation'].replace('Armed-Forces', 'Brown-collar', inplace=True)
+    data['native-country'] = data['native-country'].map(lambda country: 'US' if country == 'United-States' else 'Other')
+    data['income'] = data['income'].str.rstrip('.')
+    if remove_outliers:
+        data = data.drop(data[data['capital-gain'] > 40000].index)
+    data = data.dropna(how='any', axis=0)
+    data = data.drop_duplicates()
+    data = data.drop('fnlwgt', axis=1)
+    data = data.drop(columns='education')
+    data['capital-gain'] = data.apply(lambda capital: (capital['capital-gain'] - capital['capital-loss']), axis=1)
+    return data.drop(columns='capital-loss')
+
+
+def registros(data):
+    """Registros (dicionários, como no corpo JSON do serviço) de um DataFrame bruto."""
+    data = data.drop(columns='income').astype(object)
+    return data.where(data.notna(), None).to_dict('records')
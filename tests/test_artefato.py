@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+from artefato import salva_artefato, carrega_artefato
+from conftest import RAIZ, TESTE, SKIPROWS
+from modelo import ModeloRenda
+
+
+def test_mesmas_previsoes_do_pkl(modelo, teste, tmp_path):
+    modelo.salva(str(tmp_path / 'modelo.pkl'))
+    salva_artefato(modelo, str(tmp_path / 'modelo'))
+    pkl = ModeloRenda.carrega(str(tmp_path / 'modelo.pkl'))
+    artefato = carrega_artefato(str(tmp_path / 'modelo'))
+    previsao, proba = artefato.pontua(teste)
+    previsao_pkl, proba_pkl = pkl.pontua(teste)
+    np.testing.assert_array_equal(previsao, previsao_pkl)
+    np.testing.assert_allclose(proba, proba_pkl, rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(artefato.rotulos(previsao), pkl.rotulos(previsao_pkl))
+
+
+def test_troca_atomica(modelo, teste, tmp_path):
+    # Leitores abrem o artefato sem parar enquanto ele é regravado: todos conseguem carregá-lo.
+    destino = str(tmp_path / 'modelo')
+    salva_artefato(modelo, destino)
+    esperado = carrega_artefato(destino).predict_proba(teste.head(100))
+    erros, fim = [], threading.Event()
+
+    def le():
+        while not fim.is_set():
+            try:
+                np.testing.assert_array_equal(carrega_artefato(destino).predict_proba(teste.head(100)), esperado)
+            except Exception as erro:
+                erros.append(erro)
+
+    leitores = [threading.Thread(target=le) for _ in range(2)]
+    for t in leitores:
+        t.start()
+    for _ in range(20):
+        salva_artefato(modelo, destino)
+    fim.set()
+    for t in leitores:
+        t.join()
+    assert not erros
+    assert os.path.islink(destino)
+    # Ficam apenas a versão atual e a anterior.
+    assert len(os.listdir(tmp_path / '.modelo.versoes')) == 2
+
+
+def test_substitui_diretorio_comum(modelo, tmp_path):
+    destino = tmp_path / 'modelo'
+    destino.mkdir()
+    (destino / 'meta.json').write_text('{}')
+    salva_artefato(modelo, str(destino))
+    assert os.path.islink(destino)
+    assert carrega_artefato(str(destino)).meta['n_arvores'] == 1
+
+
+def test_pontua_sem_sklearn(modelo, tmp_path):
+    # Carregar o artefato e pontuar não importa o sklearn (motor 'numpy' da inferência em lote).
+    destino = str(tmp_path / 'modelo')
+    salva_artefato(modelo, destino)
+    codigo = ("import sys; from artefato import carrega_artefato; from carregamento import carrega_adult; "
+              "previsao, proba = carrega_artefato(sys.argv[1]).pontua(carrega_adult(sys.argv[2], skiprows=int(sys.argv[3]))); "
+              "print(len(proba), 'sklearn' in sys.modules)")
+    saida = subprocess.run([sys.executable, '-c', codigo, destino, TESTE, str(SKIPROWS)], cwd=RAIZ, capture_output=True,
+                           text=True, check=True, env={**os.environ, 'PYTHONPATH': RAIZ})
+    n, sklearn = saida.stdout.split()
+    assert int(n) > 0
+    assert sklearn == 'False'
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from busca import BuscaSucessiva, combinacoes
+
+grade = {'max_depth': [3, 8, None], 'criterion': ['gini', 'entropy'], 'max_features': [None, 7]}
+
+
+@pytest.fixture(scope='module')
+def dados(modelo, treino):
+    return modelo.pre.transform(modelo.pre.limpa(treino))
+
+
+def test_combinacoes_na_ordem_do_parameter_grid():
+    from sklearn.model_selection import ParameterGrid
+    assert combinacoes(grade) == list(ParameterGrid(grade))
+
+
+def test_exaustiva_igual_ao_grid_search(dados):
+    from sklearn.model_selection import GridSearchCV, KFold
+    from sklearn.tree import DecisionTreeClassifier
+    from preprocessamento import CodificadorOneHot
+
+    busca = BuscaSucessiva(grade, sucessiva=False, n_jobs=1).fit(dados)
+    cod = CodificadorOneHot().fit(dados)
+    X = cod.transform(dados, formato='denso', dtype=np.float32)
+    referencia = GridSearchCV(DecisionTreeClassifier(random_state=42), grade, cv=KFold(6)).fit(X, cod.transforma_alvo(dados))
+    medias = [r['media'] for r in busca.resultados_]
+    np.testing.assert_allclose(medias, referencia.cv_results_['mean_test_score'], rtol=0, atol=1e-12)
+    assert busca.melhores_parametros_ == referencia.best_params_
+    assert {r['linhas'] for r in busca.resultados_} == {None}
+
+
+def test_ultima_rodada_usa_o_treino_completo():
+    busca = BuscaSucessiva(eta=3, min_linhas=1000)
+    assert busca.rodadas(30, 27000) == [1000, 3000, 9000, None]
+    assert busca.rodadas(9, 27000) == [9000, None]
+    assert BuscaSucessiva(sucessiva=False).rodadas(30, 27000) == [None]
+
+
+def test_sucessiva_termina_com_o_treino_completo(dados):
+    busca = BuscaSucessiva(grade, n_jobs=1, min_linhas=2000).fit(dados)
+    finais = [r for r in busca.resultados_ if r['linhas'] is None]
+    assert len(finais) >= 1 and len(finais) < len(combinacoes(grade))
+    assert busca.melhor_acuracia_ == max(r['media'] for r in finais)
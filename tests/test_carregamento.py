@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from carregamento import carrega_adult, colunas, colunas_categoricas
+from conftest import TREINO, TESTE, SKIPROWS
+
+
+def _referencia(caminho):
+    # A leitura do script original, com '?' como faltante.
+    return pd.read_csv(caminho, sep=', ', names=colunas, engine='python', skiprows=SKIPROWS, na_values=['?'])
+
+
+def _compara(data, referencia):
+    assert list(data.columns) == list(referencia.columns)
+    for c in data.columns:
+        if c in colunas_categoricas:
+            assert isinstance(data[c].dtype, pd.CategoricalDtype), c
+            pd.testing.assert_series_equal(data[c].astype(object), referencia[c].astype(object), check_names=False)
+        else:
+            np.testing.assert_array_equal(data[c].to_numpy(np.int64), referencia[c].to_numpy(np.int64), err_msg=c)
+
+
+@pytest.mark.parametrize('caminho', [TREINO, TESTE])
+@pytest.mark.parametrize('motor', ['c', 'pyarrow'])
+@pytest.mark.parametrize('n_threads', [1, 3])
+def test_igual_ao_read_csv(caminho, motor, n_threads):
+    if motor == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    _compara(carrega_adult(caminho, skiprows=SKIPROWS, n_threads=n_threads, motor=motor), _referencia(caminho))
+
+
+def test_cache_igual_ao_read_csv(tmp_path):
+    referencia = _referencia(TESTE)
+    _compara(carrega_adult(TESTE, skiprows=SKIPROWS, cache=str(tmp_path)), referencia)
+    # Segunda leitura: do cache, apenas as colunas pedidas.
+    parte = carrega_adult(TESTE, skiprows=SKIPROWS, usecols=['age', 'workclass'], cache=str(tmp_path))
+    _compara(parte, referencia[['age', 'workclass']])
+
+
+def test_pyarrow_nao_altera_o_numero_de_threads_global():
+    pa = pytest.importorskip('pyarrow')
+    anterior = pa.cpu_count()
+    for n_threads in (1, 2, anterior + 3):
+        carrega_adult(TESTE, skiprows=SKIPROWS, n_threads=n_threads, motor='pyarrow')
+        assert pa.cpu_count() == anterior
+
+
+def test_pyarrow_leituras_simultaneas():
+    # Leituras simultâneas com números de threads diferentes: o número global volta ao original.
+    pa = pytest.importorskip('pyarrow')
+    anterior = pa.cpu_count()
+    referencia = _referencia(TESTE)
+    erros = []
+
+    def le(n_threads):
+        try:
+            for _ in range(5):
+                _compara(carrega_adult(TESTE, skiprows=SKIPROWS, n_threads=n_threads, motor='pyarrow'), referencia)
+        except Exception as erro:
+            erros.append(erro)
+
+    leitores = [threading.Thread(target=le, args=(n_threads,)) for n_threads in (1, 2, anterior + 3, anterior + 5)]
+    for t in leitores:
+        t.start()
+    for t in leitores:
+        t.join()
+    assert not erros
+    assert pa.cpu_count() == anterior
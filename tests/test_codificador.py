@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from preprocessamento import CodificadorOneHot, PreProcessamento
+
+
+@pytest.fixture(scope='module')
+def dados(treino, teste):
+    pre = PreProcessamento().fit(treino)
+    return pre.transform(pre.limpa(treino)), pre.transform(pre.limpa(teste, remove_outliers=False))
+
+
+def _dummies(data):
+    # O pd.get_dummies(data, drop_first=True) da seção 7, com as categóricas como object.
+    categoricas = data.select_dtypes('category').columns
+    return pd.get_dummies(data.astype({c: object for c in categoricas}), drop_first=True)
+
+
+def test_igual_ao_get_dummies(dados):
+    treino, _ = dados
+    codificador = CodificadorOneHot(alvo='income').fit(treino)
+    esperado = _dummies(treino)
+    X = esperado.drop(columns='income_>50K')
+    assert codificador.nomes_ == list(X.columns)
+    np.testing.assert_array_equal(codificador.transform(treino).toarray(), X.to_numpy(np.float64))
+    np.testing.assert_array_equal(codificador.transform(treino, formato='denso', dtype=np.float32), X.to_numpy(np.float32))
+    np.testing.assert_array_equal(codificador.transforma_alvo(treino), esperado['income_>50K'].to_numpy())
+
+
+def test_mesmas_colunas_em_qualquer_lote(dados):
+    treino, teste = dados
+    codificador = CodificadorOneHot(alvo='income').fit(treino)
+    completo = codificador.transform(teste).toarray()
+    # Um lote sem algumas categorias gera as mesmas colunas, e as mesmas linhas.
+    lote = teste[teste['workclass'] == 'Private'].head(50)
+    posicoes = teste.index.get_indexer(lote.index)
+    np.testing.assert_array_equal(codificador.transform(lote).toarray(), completo[posicoes])
+    # Categorias não vistas no fit ficam com todos os dummies iguais a zero.
+    novo = lote.head(1).astype({'workclass': object})
+    novo['workclass'] = 'Astronaut'
+    linha = codificador.transform(novo).toarray()[0]
+    assert not any(linha[i] for i, nome in enumerate(codificador.nomes_) if nome.startswith('workclass_'))
+
+
+def test_formato_codigos(dados):
+    treino, teste = dados
+    codificador = CodificadorOneHot(alvo='income').fit(treino)
+    codigos = codificador.transform(teste, formato='codigos')
+    assert codigos.shape[1] == len(codificador.nomes_codigos)
+    for j, c in enumerate(codificador.categoricas_, start=len(codificador.numericas_)):
+        categorias = list(codificador.vocabulario_[c].categories)
+        np.testing.assert_array_equal(np.asarray(categorias, dtype=object)[codigos[:, j]], teste[c].astype(object).to_numpy())
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from artefato import salva_artefato, carrega_artefato
+from colunar import CodificadorColunar, PreditorColunar, registros_estruturados
+from memoizacao import PreditorMemoizado
+from pontuacao import pontua_arquivo
+
+
+@pytest.fixture(scope='module')
+def bruto(teste):
+    """adult.test com '?' e uma categoria não vista em algumas linhas."""
+    data = teste.copy()
+    for c in ('workclass', 'native-country'):
+        data[c] = data[c].astype(object)
+    data.loc[data.index[:5], 'workclass'] = 'Nunca-visto'
+    data.loc[data.index[5:10], 'native-country'] = '?'
+    return data
+
+
+def test_matriz_igual_a_do_modelo(modelo, bruto):
+    # ModeloRenda.matriz é CSR (float64); os valores são inteiros, exatos em float32.
+    esperada = modelo.matriz(bruto).toarray().astype(np.float32)
+    codificador = CodificadorColunar(modelo)
+    tabela = pa.Table.from_pandas(bruto, preserve_index=False)
+    np.testing.assert_array_equal(codificador.matriz(tabela), esperada)
+    np.testing.assert_array_equal(codificador.matriz(tabela.to_batches(max_chunksize=997)[1]), esperada[997:1994])
+    np.testing.assert_array_equal(codificador.matriz(registros_estruturados(bruto)), esperada)
+    with pytest.raises(TypeError):
+        codificador.matriz(bruto)
+
+
+@pytest.mark.parametrize('artefato', [False, True])
+def test_pontua_igual_ao_dataframe(modelo, teste, tmp_path, artefato):
+    if artefato:
+        salva_artefato(modelo, str(tmp_path / 'modelo'))
+        modelo = carrega_artefato(str(tmp_path / 'modelo'))
+    classe, proba = modelo.pontua(teste)
+    preditor = PreditorColunar(modelo)
+    tabela = pa.Table.from_pandas(teste, preserve_index=False)
+    # Texto puro, codificado por dicionário (como na leitura do .parquet) e lotes com dicionários próprios.
+    codificada = pa.table({c: tabela[c].dictionary_encode() if pa.types.is_string(tabela[c].type) else tabela[c]
+                           for c in tabela.column_names})
+    for fonte in (tabela, codificada, registros_estruturados(teste), registros_estruturados(teste, modelo)):
+        c, p = preditor.pontua(fonte)
+        np.testing.assert_array_equal(c, classe)
+        np.testing.assert_array_equal(p, proba)
+    partes = [preditor.pontua(b) for b in codificada.to_batches(max_chunksize=997)]
+    np.testing.assert_array_equal(np.concatenate([c for c, _ in partes]), classe)
+    np.testing.assert_array_equal(np.concatenate([p for _, p in partes]), proba)
+
+
+@pytest.mark.parametrize('memoiza', [False, True])
+def test_arquivo_parquet_igual_ao_dataframe(modelo, teste, tmp_path, memoiza):
+    entrada, saida = str(tmp_path / 'teste.parquet'), str(tmp_path / 'previsoes.csv')
+    teste.to_parquet(entrada, index=False)
+    preditor = PreditorMemoizado(modelo, 1000) if memoiza else modelo
+    linhas, _ = pontua_arquivo(preditor, entrada, saida, tamanho_lote=997)
+    previsoes = pd.read_csv(saida, index_col='linha')
+    classe, proba = modelo.pontua(teste)
+    assert linhas == len(teste)
+    np.testing.assert_array_equal(previsoes.index, np.arange(len(teste)))
+    np.testing.assert_array_equal(previsoes['income'].to_numpy(), modelo.rotulos(classe))
+    np.testing.assert_allclose(previsoes['probabilidade'].to_numpy(), proba, rtol=1e-12)
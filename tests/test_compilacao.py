@@ -0,0 +1,32 @@
+import importlib.util
+
+import pytest
+
+from arvore_decisao_marcelo_danilo import treina
+from compilacao import compila, verifica
+from conftest import TREINO
+
+
+@pytest.fixture(scope='module')
+def modelos(modelo):
+    return {'padrao': modelo,
+            'profunda': treina(TREINO, destino=None, max_depth=None, max_features=None),
+            'histograma': treina(TREINO, destino=None, motor='histograma', max_depth=12)}
+
+
+@pytest.mark.parametrize('nome', ['padrao', 'profunda', 'histograma'])
+def test_igual_ao_modelo(modelos, treino, teste, nome):
+    compilada = compila(modelos[nome])
+    for data in (treino, teste):
+        divergencias, _ = verifica(compilada, modelos[nome], data)
+        assert divergencias == 0
+
+
+def test_modulo_gravado(modelo, teste, tmp_path):
+    compilada = compila(modelo)
+    compilada.salva(str(tmp_path / 'arvore.py'))
+    spec = importlib.util.spec_from_file_location('arvore', tmp_path / 'arvore.py')
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    registros = teste.drop(columns='income').astype(object).where(teste.notna(), None).to_dict('records')
+    assert [modulo.prediz(r) for r in registros[:2000]] == [compilada.prediz(r) for r in registros[:2000]]
@@ -0,0 +1,60 @@
+import sys
+import shutil
+
+import numpy as np
+import pytest
+
+from arvore_decisao_marcelo_danilo import treina, treina_distribuido
+from conftest import TREINO, SKIPROWS
+from distribuido import ArvoreDistribuida, Coordenador, fragmenta_arquivo
+from histograma import ArvoreHistograma
+
+
+def _mesma_arvore(a, b):
+    for atributo in ('children_left', 'children_right', 'feature', 'threshold', 'value', 'faixa'):
+        np.testing.assert_array_equal(getattr(a, atributo), getattr(b, atributo), err_msg=atributo)
+
+
+@pytest.mark.parametrize('max_depth, max_features', [(8, 5), (None, None)])
+def test_igual_a_arvore_histograma(matrizes, max_depth, max_features):
+    X, y, _ = matrizes
+    parametros = dict(max_depth=max_depth, max_features=max_features, random_state=3)
+    esperado = ArvoreHistograma(**parametros).fit(X, y)
+    obtido = ArvoreDistribuida(n_trabalhadores=3, **parametros).fit(X, y)
+    _mesma_arvore(obtido.tree_, esperado.tree_)
+
+
+def test_arquivos_fragmentados_igual_ao_treina(teste, tmp_path):
+    # Fragmentos do adult.data: a limpeza (com as duplicatas entre fragmentos), a codificação
+    # e a árvore são as do treino com o arquivo inteiro.
+    arquivos = fragmenta_arquivo(TREINO, 3, str(tmp_path), skiprows=SKIPROWS)
+    parametros = dict(max_depth=8, max_features=5, random_state=3)
+    esperado = treina(TREINO, destino=None, motor='histograma', **parametros)
+    obtido = treina_distribuido(arquivos, destino=None, skiprows=1, **parametros)
+    assert obtido.codificador.nomes_ == esperado.codificador.nomes_
+    _mesma_arvore(obtido.estimador.tree_, esperado.estimador.tree_)
+    np.testing.assert_array_equal(obtido.predict_proba(teste), esperado.predict_proba(teste))
+
+
+def test_fragmento_so_com_duplicatas(tmp_path):
+    # O segundo fragmento só repete linhas do primeiro: fica sem linhas depois da limpeza.
+    with open(TREINO) as f:
+        linhas = f.readlines()
+    cabecalho, corpo = linhas[:SKIPROWS], linhas[SKIPROWS:SKIPROWS + 2000]
+    primeiro, segundo = tmp_path / 'a.data', tmp_path / 'b.data'
+    primeiro.write_text(''.join(cabecalho + corpo))
+    segundo.write_text(''.join(cabecalho + corpo[:100]))
+    parametros = dict(max_depth=6, max_features=5, random_state=3)
+    esperado = treina(str(primeiro), destino=None, motor='histograma', **parametros)
+    obtido = treina_distribuido([str(primeiro), str(segundo)], destino=None, skiprows=SKIPROWS, **parametros)
+    _mesma_arvore(obtido.estimador.tree_, esperado.estimador.tree_)
+
+
+def test_trabalhador_local_que_termina(monkeypatch):
+    # Um trabalhador que termina sem conectar não deixa o coordenador esperando para sempre.
+    falso = shutil.which('false')
+    if falso is None:
+        pytest.skip('sem o comando false')
+    monkeypatch.setattr(sys, 'executable', falso)
+    with pytest.raises(RuntimeError, match='terminou antes de conectar'):
+        Coordenador(2)
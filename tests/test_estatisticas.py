@@ -0,0 +1,64 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from carregamento import carrega_adult
+from conftest import TREINO
+from estatisticas import Estatisticas, estatisticas_arquivo
+
+
+def _iguais(a, b):
+    assert a.n_linhas_ == b.n_linhas_
+    pd.testing.assert_frame_equal(a.descreve(), b.descreve())
+    pd.testing.assert_frame_equal(a.correlacao(), b.correlacao(), atol=1e-10)
+    pd.testing.assert_series_equal(a.faltantes(), b.faltantes())
+    for c in a.colunas_:
+        # O tipo do índice acompanha o da coluna lida (inteiros reduzidos ou não).
+        pd.testing.assert_series_equal(a.contagem(c), b.contagem(c), check_index_type=False)
+        assert pd.Index(a.unicos(c), dtype=object).equals(pd.Index(b.unicos(c), dtype=object))
+
+
+def test_consultas_iguais_ao_pandas(treino):
+    est = Estatisticas().fit(treino)
+    for c in ('workclass', 'age', 'native-country'):
+        pd.testing.assert_series_equal(est.contagem(c).sort_index(), treino[c].value_counts().sort_index(),
+                                       check_index_type=False, check_categorical=False, check_index=False)
+        assert sorted(est.contagem(c).index) == sorted(treino[c].dropna().unique())
+    pd.testing.assert_series_equal(est.faltantes(), treino.isnull().sum())
+    numericas = treino.select_dtypes('number')
+    pd.testing.assert_frame_equal(est.descreve(), numericas.describe().astype(np.float64))
+    pd.testing.assert_frame_equal(est.correlacao(), numericas.corr(), atol=1e-10)
+
+
+@pytest.fixture
+def copia(tmp_path):
+    destino = tmp_path / 'adult.data'
+    shutil.copy(TREINO, destino)
+    return destino
+
+
+def test_cache_separa_skiprows_e_alvo(copia, tmp_path):
+    cache = tmp_path / 'cache'
+    com_cabecalho = estatisticas_arquivo(copia, skiprows=1, diretorio=cache)
+    sem_cabecalho = estatisticas_arquivo(copia, skiprows=0, diretorio=cache)
+    assert sem_cabecalho.n_linhas_ == com_cabecalho.n_linhas_ + 1
+    por_sexo = estatisticas_arquivo(copia, skiprows=1, diretorio=cache, alvo='sex')
+    assert sorted(por_sexo.classes_) == ['Female', 'Male']
+    # Segunda leitura de cada combinação: do cache, com o mesmo resultado.
+    _iguais(estatisticas_arquivo(copia, skiprows=0, diretorio=cache), sem_cabecalho)
+    _iguais(estatisticas_arquivo(copia, skiprows=1, diretorio=cache), com_cabecalho)
+
+
+def test_acrescimo_igual_ao_ajuste_completo(tmp_path):
+    with open(TREINO, 'rb') as f:
+        linhas = f.read().splitlines(keepends=True)
+    arquivo, cache = tmp_path / 'adult.data', tmp_path / 'cache'
+    arquivo.write_bytes(b''.join(linhas[:20001]))
+    parcial = estatisticas_arquivo(arquivo, skiprows=1, diretorio=cache)
+    assert parcial.n_linhas_ == 20000
+    with open(arquivo, 'ab') as f:
+        f.write(b''.join(linhas[20001:]))
+    incremental = estatisticas_arquivo(arquivo, skiprows=1, diretorio=cache)
+    _iguais(incremental, Estatisticas().fit(carrega_adult(arquivo, skiprows=1)))
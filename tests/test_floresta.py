@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from floresta import FlorestaCompartilhada
+
+
+@pytest.mark.parametrize('parametros', [dict(max_depth=8), dict(max_features=5, min_samples_leaf=3, criterion='entropy')])
+def test_mesmas_arvores_do_random_forest(matrizes, parametros):
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y, X_teste = matrizes
+    esperado = RandomForestClassifier(12, random_state=7, **parametros).fit(X, y)
+    obtido = FlorestaCompartilhada(12, n_jobs=2, random_state=7, **parametros).fit(X, y)
+    assert len(obtido.estimators_) == len(esperado.estimators_)
+    for a, b in zip(obtido.estimators_, esperado.estimators_):
+        for atributo in ('children_left', 'children_right', 'feature', 'threshold'):
+            np.testing.assert_array_equal(getattr(a.tree_, atributo), getattr(b.tree_, atributo))
+    np.testing.assert_allclose(obtido.predict_proba(X_teste), esperado.predict_proba(X_teste), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(obtido.predict(X_teste), esperado.predict(X_teste))
+
+
+def test_independe_do_numero_de_processos(matrizes):
+    X, y, X_teste = matrizes
+    um = FlorestaCompartilhada(6, max_depth=6, n_jobs=1, random_state=1).fit(X, y)
+    tres = FlorestaCompartilhada(6, max_depth=6, n_jobs=3, random_state=1).fit(X, y)
+    np.testing.assert_array_equal(um.predict_proba(X_teste), tres.predict_proba(X_teste))
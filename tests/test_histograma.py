@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from histograma import ArvoreHistograma, Discretizador, extremos_faixas, limiar_corte, limites_contagens
+
+
+def _custo(X, y, linhas, atributo, limiar):
+    # Soma das impurezas de Gini dos filhos, ponderadas pelo número de linhas.
+    custo = 0.0
+    for parte in (y[linhas][X[linhas, atributo] <= limiar], y[linhas][X[linhas, atributo] > limiar]):
+        p = np.bincount(parte, minlength=2) / len(parte)
+        custo += len(parte) * (1 - (p * p).sum())
+    return custo
+
+
+@pytest.mark.parametrize('max_depth', [8, None])
+def test_mesma_arvore_do_sklearn_a_menos_de_empates(matrizes, max_depth):
+    from sklearn.tree import DecisionTreeClassifier
+
+    X, y, X_teste = matrizes
+    sk = DecisionTreeClassifier(max_depth=max_depth, random_state=42).fit(X, y)
+    hi = ArvoreHistograma(max_depth=max_depth, random_state=42).fit(X, y)
+    a, b = sk.tree_, hi.tree_
+    caminhos = sk.decision_path(X).tocsc()
+    # Descida paralela pelas duas árvores, a partir da raiz: onde os cortes diferem, os dois
+    # têm o mesmo custo, e até o primeiro empate os nós têm os mesmos números (pré-ordem).
+    pilha, empates = [(0, 0)], 0
+    while pilha:
+        i, k = pilha.pop()
+        assert (a.children_left[i] == -1) == (b.children_left[k] == -1)
+        if a.children_left[i] == -1:
+            continue
+        if a.feature[i] != b.feature[k] or a.threshold[i] != b.threshold[k]:
+            linhas = caminhos[:, i].nonzero()[0]
+            assert _custo(X, y, linhas, a.feature[i], a.threshold[i]) == pytest.approx(
+                _custo(X, y, linhas, b.feature[k], b.threshold[k]))
+            empates += 1
+            continue
+        np.testing.assert_array_equal(a.value[i, 0], b.value[k, 0])
+        pilha += [(a.children_right[i], b.children_right[k]), (a.children_left[i], b.children_left[k])]
+    if max_depth == 8:
+        assert empates <= 5
+        primeiro = np.flatnonzero(a.feature != b.feature)[0]
+        np.testing.assert_array_equal(a.children_left[:primeiro], b.children_left[:primeiro])
+        np.testing.assert_array_equal(a.threshold[:primeiro], b.threshold[:primeiro])
+        assert np.mean(sk.predict(X_teste) == hi.predict(X_teste)) > 0.999
+
+
+def test_limiar_entre_valores_presentes_no_no():
+    # Sem linhas com 1, 2 ou 3 no nó, o limiar é o ponto médio entre 0 e 4, como no sklearn.
+    valores = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
+    limites = limites_contagens(valores, np.ones(5, dtype=np.int64))
+    minimos, maximos = extremos_faixas(valores, limites)
+    np.testing.assert_array_equal(minimos, valores)
+    np.testing.assert_array_equal(maximos, valores)
+    assert limiar_corte(np.array([3, 0, 0, 0, 5]), 0, minimos, maximos) == 2.0
+    assert limiar_corte(np.array([3, 2, 0, 0, 5]), 1, minimos, maximos) == 2.5
+
+
+def test_extremos_das_faixas_por_quantis():
+    col = np.arange(1000, dtype=np.float64) ** 2
+    discretizador = Discretizador(16).fit(col[:, None])
+    faixas = discretizador.transform(col[:, None])[0]
+    for f in range(len(discretizador.limites_[0]) + 1):
+        assert discretizador.minimos_[0][f] == col[faixas == f].min()
+        assert discretizador.maximos_[0][f] == col[faixas == f].max()
+    valores, contagens = np.unique(col, return_counts=True)
+    limites = limites_contagens(valores, contagens, 16)
+    np.testing.assert_array_equal(limites, discretizador.limites_[0])
+    np.testing.assert_array_equal(extremos_faixas(valores, limites)[0], discretizador.minimos_[0])
+
+
+def test_predict_proba_igual_ao_tree_(matrizes):
+    # A previsão da árvore usa os limiares do tree_, como o artefato e a árvore compilada.
+    from artefato import vetores_arvores
+    from inferencia import InferenciaEmLote
+
+    X, y, X_teste = matrizes
+    arvore = ArvoreHistograma(max_depth=12, max_features=7, random_state=0).fit(X, y)
+    inferencia = InferenciaEmLote(vetores_arvores([arvore.tree_]), arvore.tree_.max_depth, motor='numpy')
+    np.testing.assert_array_equal(arvore.predict_proba(X_teste), inferencia.proba_matriz(X_teste))
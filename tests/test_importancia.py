@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import importancia
+from importancia import ImportanciaPermutacao, colunas_usadas
+
+
+@pytest.fixture(scope='module')
+def avaliacao(modelo, teste):
+    """Matriz e alvo do adult.test, limpos e codificados como no ImportanciaPermutacao.fit."""
+    limpo = modelo.pre.transform(modelo.pre.limpa(teste, remove_outliers=False))
+    return (modelo.codificador.transform(limpo, formato='denso', dtype=np.float32),
+            modelo.codificador.transforma_alvo(limpo))
+
+
+def ingenua(estimador, X, y, grupos, n_repeticoes, random_state=42):
+    """Laço do permutation_importance: uma cópia da matriz e um predict por atributo e repetição.
+
+    As permutações são sorteadas com as mesmas sementes por atributo do ImportanciaPermutacao.
+    """
+    from sklearn.metrics import accuracy_score
+
+    base = accuracy_score(y, estimador.predict(X))
+    sementes = np.random.SeedSequence(random_state).spawn(len(grupos))
+    saida = np.zeros((len(grupos), n_repeticoes))
+    for i, colunas in enumerate(grupos.values()):
+        rng = np.random.default_rng(sementes[i])
+        for r in range(n_repeticoes):
+            permutada = X.copy()
+            permutada[:, colunas] = X[rng.permutation(len(X))][:, colunas]
+            saida[i, r] = base - accuracy_score(y, estimador.predict(permutada))
+    return base, saida
+
+
+def test_igual_ao_laco_ingenuo(modelo, teste, avaliacao):
+    X, y = avaliacao
+    calculada = ImportanciaPermutacao(n_repeticoes=3, n_jobs=2).fit(modelo, teste)
+    grupos = {nome: [j] for j, nome in enumerate(modelo.codificador.nomes_)}
+    base, referencia = ingenua(modelo.estimador, X, y, grupos, 3)
+    assert calculada.nomes_ == list(modelo.codificador.nomes_)
+    assert calculada.base_ == pytest.approx(base, abs=1e-12)
+    np.testing.assert_allclose(calculada.importancias_, referencia, rtol=0, atol=1e-12)
+    # Os atributos sem nenhum corte na árvore não mudam a previsão.
+    usados = set(colunas_usadas(modelo.estimador))
+    for j in range(X.shape[1]):
+        if j not in usados:
+            assert np.all(calculada.importancias_[j] == 0)
+
+
+def test_por_coluna_e_floresta_em_grupos_pequenos(modelo, avaliacao, matrizes, monkeypatch):
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = avaliacao
+    X_treino, y_treino, _ = matrizes
+    floresta = RandomForestClassifier(n_estimators=5, max_depth=8, random_state=0).fit(X_treino, y_treino)
+    # Uma repetição por pilha: exercita a divisão das repetições em grupos.
+    monkeypatch.setattr(importancia, 'MAX_VALORES', X.size)
+    calculada = ImportanciaPermutacao(n_repeticoes=2, por_coluna=True, n_jobs=1).fit_matriz(floresta, X, y, modelo.codificador)
+    grupos = importancia._grupos(modelo.codificador, True)
+    _, referencia = ingenua(floresta, X, y, grupos, 2)
+    assert calculada.nomes_ == list(grupos)
+    np.testing.assert_allclose(calculada.importancias_, referencia, rtol=0, atol=1e-12)
+
+
+def test_metrica_auc_e_resumo(modelo, teste, avaliacao):
+    from sklearn.metrics import roc_auc_score
+
+    X, y = avaliacao
+    calculada = ImportanciaPermutacao(n_repeticoes=2, metrica='auc').fit(modelo, teste)
+    assert calculada.base_ == pytest.approx(roc_auc_score(y, modelo.estimador.predict_proba(X)[:, 1]), abs=1e-3)
+    resumo = calculada.resumo()
+    assert list(resumo['importancia']) == sorted(resumo['importancia'], reverse=True)
+    assert np.all(resumo['ic_inferior'] <= resumo['importancia'])
+    with pytest.raises(ValueError):
+        ImportanciaPermutacao(metrica='log_loss')
@@ -0,0 +1,93 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from conftest import TREINO
+from incremental import ArvoreIncremental
+
+
+def contagens_por_no(arvore, X, y):
+    """Contagens por classe das linhas X que passam por cada nó do tree_ (percorrendo os limiares)."""
+    t = arvore.tree_
+    saida = np.zeros((t.node_count, len(arvore.classes_)))
+    nos = np.zeros(len(X), dtype=np.intp)
+    codigos = np.searchsorted(arvore.classes_, y)
+    ativas = np.arange(len(X))
+    while len(ativas):
+        np.add.at(saida, (nos[ativas], codigos[ativas]), 1)
+        internas = t.children_left[nos[ativas]] != -1
+        ativas = ativas[internas]
+        no = nos[ativas]
+        nos[ativas] = np.where(X[ativas, t.feature[no]] <= t.threshold[no], t.children_left[no], t.children_right[no])
+    return saida
+
+
+@pytest.mark.parametrize('parametros', [{'max_depth': 4}, {'max_depth': None, 'min_samples_leaf': 5, 'criterion': 'entropy'}])
+def test_contagens_das_linhas_absorvidas(matrizes, parametros):
+    X, y, _ = matrizes
+    # Em um único lote, cada nó tem as contagens das linhas que passam por ele, como no sklearn.
+    arvore = ArvoreIncremental(**parametros).fit(X, y)
+    np.testing.assert_array_equal(arvore.tree_.value[:, 0, :], contagens_por_no(arvore, X, y))
+
+    lotes = np.array_split(np.arange(len(X)), [8000, 9000, 9001, 20000])
+    arvore = ArvoreIncremental(**parametros)
+    for i, lote in enumerate(lotes):
+        arvore.partial_fit(X[lote], y[lote])
+        vistas = np.concatenate(lotes[:i + 1])
+        t = arvore.tree_
+        valores, esperadas = t.value[:, 0, :], contagens_por_no(arvore, X[vistas], y[vistas])
+        # A raiz soma todas as linhas absorvidas; abaixo dela, uma folha cortada de novo só
+        # passa aos filhos as linhas que recebeu (as herdadas ficam no nó cortado).
+        np.testing.assert_array_equal(valores[0], np.bincount(y[vistas], minlength=2))
+        assert arvore.linhas_ == len(vistas)
+        assert np.all(valores <= esperadas)
+        internos = np.flatnonzero(t.children_left != -1)
+        restos = valores[internos] - valores[t.children_left[internos]] - valores[t.children_right[internos]]
+        np.testing.assert_array_equal(restos, [arvore.restos_.get(no, np.zeros(2)) for no in internos])
+        # O percurso pelas faixas (absorção) e pelos limiares (predict) levam à mesma folha.
+        np.testing.assert_array_equal(arvore.nos_faixas(arvore.discretizador_.transform(X[vistas])),
+                                      arvore.nos_colunas(X[vistas].T.astype(np.float64)))
+    assert arvore.n_cortes_ > 0 and arvore.restos_
+    if parametros['max_depth'] is not None:
+        assert t.max_depth <= parametros['max_depth']
+
+
+def test_sem_corte_antes_do_periodo_e_classes_novas(matrizes):
+    X, y, _ = matrizes
+    arvore = ArvoreIncremental(periodo=len(X) + 1).fit(X, y)
+    assert arvore.tree_.node_count == 1
+    np.testing.assert_array_equal(arvore.tree_.value[0, 0], np.bincount(y))
+    with pytest.raises(ValueError):
+        arvore.partial_fit(X[:10], np.full(10, 2))
+
+
+def test_atualiza_igual_ao_partial_fit(tmp_path):
+    from arvore_decisao_marcelo_danilo import treina, atualiza
+    from artefato import carrega_artefato
+    from carregamento import carrega_adult
+
+    with open(TREINO) as f:
+        linhas = f.readlines()
+    # O histórico (com a primeira linha, descartada pelo treina) e as linhas novas.
+    historico, novos = tmp_path / 'historico.data', tmp_path / 'novos.data'
+    historico.write_text(''.join(linhas[:16001]))
+    novos.write_text(''.join(linhas[16001:]))
+    modelo = treina(str(historico), destino=None, motor='incremental', max_depth=6)
+    referencia = pickle.loads(pickle.dumps(modelo))
+    destino = str(tmp_path / 'modelo')
+    atualiza(modelo, str(novos), destino=destino, tamanho_lote=len(linhas))
+
+    # Um único lote: o mesmo partial_fit feito diretamente com as linhas novas limpas.
+    pre, cod = referencia.pre, referencia.codificador
+    limpo = pre.transform(pre.limpa(carrega_adult(str(novos), skiprows=0)))
+    referencia.estimador.partial_fit(cod.transform(limpo, formato='denso'), cod.transforma_alvo(limpo))
+    for atributo in ('children_left', 'children_right', 'feature', 'threshold', 'value'):
+        np.testing.assert_array_equal(getattr(modelo.estimador.tree_, atributo),
+                                      getattr(referencia.estimador.tree_, atributo))
+
+    teste = carrega_adult(str(novos), skiprows=0)
+    classe, proba = modelo.pontua(teste)
+    c, p = carrega_artefato(destino).pontua(teste)
+    np.testing.assert_array_equal(c, classe)
+    np.testing.assert_allclose(p, proba, rtol=0, atol=1e-12)
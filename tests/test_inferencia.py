@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from inferencia import InferenciaEmLote, de_estimador
+
+
+def _estimadores(X, y):
+    from sklearn.tree import DecisionTreeClassifier
+    from sklearn.ensemble import RandomForestClassifier
+
+    return {'arvore_rasa': DecisionTreeClassifier(max_depth=3, random_state=0).fit(X, y),
+            'arvore_profunda': DecisionTreeClassifier(random_state=0).fit(X, y),
+            'floresta_rasa': RandomForestClassifier(10, max_depth=6, random_state=0).fit(X, y),
+            'floresta_profunda': RandomForestClassifier(5, random_state=0).fit(X, y)}
+
+
+# profundidade_perfeita: None (padrão), só os vetores de filhos (0) e os dois percursos em sequência (3).
+@pytest.mark.parametrize('motor,profundidade_perfeita', [('compilado', None), ('numpy', None), ('numpy', 0), ('numpy', 3)])
+def test_igual_ao_predict_proba(matrizes, motor, profundidade_perfeita):
+    X, y, X_teste = matrizes
+    for nome, estimador in _estimadores(X, y).items():
+        inferencia = de_estimador(estimador, motor=motor, tamanho_bloco=4096, profundidade_perfeita=profundidade_perfeita)
+        np.testing.assert_allclose(inferencia.proba_matriz(X_teste), estimador.predict_proba(X_teste),
+                                   rtol=0, atol=1e-12, err_msg=nome)
+
+
+def test_motor_padrao_numpy():
+    from artefato import vetores_arvores
+    from sklearn.tree import DecisionTreeClassifier
+
+    arvore = DecisionTreeClassifier(max_depth=2).fit([[0], [1], [2], [3]], [0, 0, 1, 1])
+    assert InferenciaEmLote(vetores_arvores([arvore.tree_]), 2).motor == 'numpy'
+    folha = DecisionTreeClassifier().fit([[0], [1]], [1, 1])
+    np.testing.assert_array_equal(InferenciaEmLote(vetores_arvores([folha.tree_]), 0).proba_matriz(np.zeros((3, 1))),
+                                  [[1.0], [1.0], [1.0]])
+    with pytest.raises(ValueError):
+        InferenciaEmLote(vetores_arvores([arvore.tree_]), 2, motor='outro')
+
+
+def test_esparsa_e_threads(matrizes):
+    from scipy import sparse
+    from sklearn.tree import DecisionTreeClassifier
+
+    X, y, X_teste = matrizes
+    arvore = DecisionTreeClassifier(max_depth=8, random_state=0).fit(X, y)
+    esperado = arvore.predict_proba(X_teste)
+    for motor in ('compilado', 'numpy'):
+        inferencia = de_estimador(arvore, motor=motor, n_threads=3)
+        np.testing.assert_allclose(inferencia.proba_matriz(sparse.csr_matrix(X_teste)), esperado, atol=1e-12)
@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+import pytest
+
+from arvore_decisao_marcelo_danilo import treina
+from conftest import TREINO
+from instrumentacao import Instrumentacao, ReceptorArquivo, relatorio_memoria
+
+
+def test_treino_instrumentado_igual_ao_treino(modelo, treino, teste, tmp_path):
+    arquivo = str(tmp_path / 'etapas.jsonl')
+    instrumentacao = Instrumentacao([ReceptorArquivo(arquivo)], memoria=True, diretorio_perfil=str(tmp_path / 'perfis'))
+    instrumentado = treina(TREINO, destino=None, instrumentacao=instrumentacao)
+    np.testing.assert_array_equal(instrumentado.predict_proba(teste), modelo.predict_proba(teste))
+
+    registros = {r['etapa']: r for r in instrumentacao.registros}
+    assert list(registros) == ['carga', 'limpeza', 'engenharia', 'codificacao', 'ajuste']
+    limpo = modelo.pre.limpa(treino)
+    assert registros['limpeza']['linhas_entrada'] == len(treino)
+    assert registros['limpeza']['linhas_saida'] == registros['engenharia']['linhas_saida'] == len(limpo)
+    for r in registros.values():
+        assert r['segundos'] >= 0 and r['cpu_segundos'] >= 0
+        assert 'tracemalloc_pico_mb' in r
+        assert (tmp_path / 'perfis' / f"{r['etapa']}.prof").exists()
+    with open(arquivo) as f:
+        gravados = [json.loads(linha) for linha in f]
+    assert [r['etapa'] for r in gravados] == list(registros)
+    assert 'carga' in relatorio_memoria(instrumentacao.registros)
+
+
+def test_receptor_com_defeito_nao_interrompe():
+    def defeituoso(registro):
+        raise RuntimeError('receptor')
+
+    recebidos = []
+    instrumentacao = Instrumentacao([defeituoso, recebidos.append])
+    with instrumentacao.etapa('etapa', 3) as registro:
+        registro['linhas_saida'] = 2
+    assert [r['linhas_saida'] for r in recebidos] == [2]
+
+
+def test_registro_entregue_mesmo_com_excecao():
+    instrumentacao = Instrumentacao()
+    with pytest.raises(ValueError):
+        with instrumentacao.etapa('falha'):
+            raise ValueError
+    assert instrumentacao.registros[0]['etapa'] == 'falha'
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from carregamento import carrega_adult
+from conftest import TREINO, TESTE, SKIPROWS
+from limpeza import (ConjuntoImpressoes, ajusta_em_lotes, impressoes, limpa_arquivo, limpa_em_lotes,
+                     prepara_em_lotes)
+from preprocessamento import PreProcessamento
+
+
+@pytest.fixture(scope='module')
+def pre(treino):
+    return PreProcessamento().fit(treino)
+
+
+@pytest.mark.parametrize('tamanho_lote', [997, 5000])
+@pytest.mark.parametrize('caminho, remove_outliers', [(TREINO, True), (TESTE, False)])
+def test_igual_ao_limpa(pre, caminho, remove_outliers, tamanho_lote):
+    esperado = pre.limpa(carrega_adult(caminho, skiprows=SKIPROWS), remove_outliers=remove_outliers)
+    lotes = list(limpa_em_lotes(caminho, pre, skiprows=SKIPROWS, tamanho_lote=tamanho_lote,
+                                remove_outliers=remove_outliers))
+    # Mesmas linhas, na mesma ordem e com o mesmo índice (as categorias de cada lote são as
+    # lidas nele, e o concat as converte em object).
+    pd.testing.assert_frame_equal(pd.concat(lotes).astype(object), esperado.astype(object))
+
+
+def test_prepara_em_lotes_igual_ao_transform(treino):
+    pre = PreProcessamento().fit(treino)
+    esperado = pre.transform(pre.limpa(treino))
+    pre_lotes, obtido = prepara_em_lotes(TREINO, skiprows=SKIPROWS, tamanho_lote=997)
+    # O pré-processamento ajustado com as categorias vistas lote a lote é o mesmo.
+    assert pre_lotes.categorias_ == pre.categorias_
+    pd.testing.assert_frame_equal(obtido, esperado)
+
+
+def test_ajusta_em_lotes(treino):
+    pre = PreProcessamento().fit(treino)
+    assert ajusta_em_lotes(TREINO, SKIPROWS, tamanho_lote=997).saida_ == pre.saida_
+
+
+def test_limpa_arquivo(pre, tmp_path):
+    destino = str(tmp_path / 'limpo.data')
+    contadores = limpa_arquivo(TREINO, destino, pre, skiprows=SKIPROWS, tamanho_lote=5000)
+    esperado = pre.limpa(carrega_adult(TREINO, skiprows=SKIPROWS))
+    gravado = carrega_adult(destino, skiprows=1)
+    assert contadores['saida'] == len(esperado) == len(gravado)
+    for c in esperado.columns:
+        pd.testing.assert_series_equal(gravado[c].astype(object), esperado[c].reset_index(drop=True).astype(object),
+                                       check_names=False)
+
+
+def test_aproximada_nao_deixa_passar_duplicatas(pre):
+    esperado = pre.limpa(carrega_adult(TREINO, skiprows=SKIPROWS))
+    obtido = pd.concat(limpa_em_lotes(TREINO, pre, skiprows=SKIPROWS, tamanho_lote=5000, aproximada=True,
+                                      capacidade=40000))
+    # Só linhas mantidas pela limpeza exata; no máximo uma fração pequena a menos.
+    assert obtido.index.isin(esperado.index).all()
+    assert len(obtido) >= 0.99 * len(esperado)
+
+
+def test_conjunto_impressoes(treino):
+    h = impressoes(treino)
+    conjunto = ConjuntoImpressoes()
+    vistas = set()
+    for parte in np.array_split(h, 7):
+        unicas = np.unique(parte, axis=0)
+        novas = unicas[~conjunto.contem(unicas)]
+        assert {bytes(x) for x in novas} == {bytes(x) for x in unicas} - vistas
+        conjunto.adiciona(novas)
+        vistas |= {bytes(x) for x in novas}
+    assert len(conjunto) == len(vistas)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from arvore_decisao_marcelo_danilo import treina
+from artefato import salva_artefato, carrega_artefato
+from conftest import TREINO
+from memoizacao import PreditorMemoizado
+from modelo import ModeloRenda
+
+
+@pytest.fixture(scope='module')
+def modelos(modelo, matrizes, tmp_path_factory):
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y, _ = matrizes
+    floresta = ModeloRenda(modelo.pre, modelo.codificador, RandomForestClassifier(10, max_depth=10, random_state=0).fit(X, y))
+    diretorio = str(tmp_path_factory.mktemp('artefato') / 'modelo')
+    salva_artefato(floresta, diretorio)
+    return {'padrao': modelo,
+            'profunda': treina(TREINO, destino=None, max_depth=None, max_features=None),
+            'histograma': treina(TREINO, destino=None, motor='histograma', max_depth=10),
+            'floresta': floresta,
+            'artefato': carrega_artefato(diretorio)}
+
+
+@pytest.mark.parametrize('nome', ['padrao', 'profunda', 'histograma', 'floresta', 'artefato'])
+def test_igual_ao_modelo(modelos, teste, nome):
+    modelo = modelos[nome]
+    memoizado = PreditorMemoizado(modelo, capacidade=500)
+    for lote in np.array_split(np.arange(len(teste)), 5):
+        lote = teste.iloc[lote]
+        previsao, proba = memoizado.pontua(lote)
+        previsao_modelo, proba_modelo = modelo.pontua(lote)
+        np.testing.assert_array_equal(previsao, previsao_modelo)
+        np.testing.assert_array_equal(proba, proba_modelo)
+    assert len(memoizado.cache) <= 500
+    assert memoizado.linhas == len(teste)
+    assert memoizado.avaliacoes <= memoizado.distintas <= memoizado.linhas
+
+
+def test_arvore_rasa_avalia_poucas_linhas(modelo, treino):
+    # A árvore de profundidade 3 tem no máximo 8 folhas; as chaves separam apenas os lados dos limiares usados.
+    memoizado = PreditorMemoizado(modelo)
+    memoizado.pontua(treino)
+    assert memoizado.avaliacoes < 100
+    memoizado.pontua(treino)
+    assert memoizado.taxa_acerto == 0.5
@@ -0,0 +1,14 @@
+import pandas as pd
+
+from arvore_decisao_marcelo_danilo import carrega_treino
+from conftest import TREINO
+from memoria import cabe_no_orcamento, tamanho_lote
+
+
+def test_orcamento_em_lotes_igual_ao_carregamento_em_memoria():
+    # Com 1 MB o adult.data não cabe: a carga, a limpeza e a engenharia são feitas em lotes.
+    assert not cabe_no_orcamento(TREINO, 1)
+    assert tamanho_lote(TREINO, 1) < 30000
+    _, em_memoria = carrega_treino(TREINO)
+    _, em_lotes = carrega_treino(TREINO, orcamento_mb=1)
+    pd.testing.assert_frame_equal(em_lotes.reset_index(drop=True), em_memoria.reset_index(drop=True))
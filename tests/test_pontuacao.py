@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from artefato import salva_artefato
+from conftest import TESTE, SKIPROWS
+from pontuacao import main, pontua_arquivo
+
+
+def _esperado(modelo, teste):
+    classe, proba = modelo.pontua(teste)
+    return modelo.rotulos(classe), proba
+
+
+def test_em_lotes_igual_ao_pontua(modelo, teste, tmp_path):
+    saida = str(tmp_path / 'previsoes.csv')
+    linhas, _ = pontua_arquivo(modelo, TESTE, saida, tamanho_lote=997, skiprows=SKIPROWS)
+    previsoes = pd.read_csv(saida, index_col='linha')
+    rotulos, proba = _esperado(modelo, teste)
+    assert linhas == len(teste)
+    np.testing.assert_array_equal(previsoes.index, teste.index)
+    np.testing.assert_array_equal(previsoes['income'].to_numpy(), rotulos)
+    np.testing.assert_allclose(previsoes['probabilidade'].to_numpy(), proba, rtol=1e-12)
+
+
+def test_cli_com_artefato_e_parquet(modelo, teste, tmp_path):
+    salva_artefato(modelo, str(tmp_path / 'modelo'))
+    saida = str(tmp_path / 'previsoes.parquet')
+    main([str(tmp_path / 'modelo'), TESTE, saida, '--skiprows', str(SKIPROWS), '--tamanho-lote', '5000', '--memoiza', '1000'])
+    previsoes = pd.read_parquet(saida)
+    rotulos, proba = _esperado(modelo, teste)
+    np.testing.assert_array_equal(previsoes['linha'].to_numpy(), teste.index)
+    np.testing.assert_array_equal(previsoes['income'].to_numpy(), rotulos)
+    np.testing.assert_allclose(previsoes['probabilidade'].to_numpy(), proba, rtol=0, atol=1e-12)
@@ -0,0 +1,79 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('seaborn')
+
+from estatisticas import Estatisticas
+from preprocessamento import PreProcessamento
+from conftest import TREINO
+from relatorio import Relatorio, contagens, gera_relatorio, secao_modelo, _categorias
+
+
+@pytest.fixture(scope='module')
+def est(treino):
+    return Estatisticas().fit(treino)
+
+
+def _crosstab(valores, data):
+    # A tabela que o sns.countplot(data, x=..., hue='income') conta a partir das linhas.
+    return pd.crosstab(valores, data['income'].astype(object)).rename_axis(columns=None)
+
+
+def _compara(obtido, esperado):
+    obtido = obtido.rename_axis(columns=None)
+    assert list(obtido.index) == list(esperado.index)
+    assert (obtido[esperado.columns].to_numpy() == esperado.to_numpy()).all()
+
+
+@pytest.mark.parametrize('coluna', ['workclass', 'relationship', 'race', 'sex'])
+def test_contagens_iguais_as_das_linhas(est, treino, coluna):
+    _compara(contagens(est, coluna, _categorias), _crosstab(treino[coluna], treino))
+
+
+@pytest.mark.parametrize('coluna', ['workclass', 'education', 'marital-status', 'occupation', 'native-country'])
+def test_contagens_agrupadas(est, treino, coluna):
+    pre = PreProcessamento().fit(treino)
+    esperado = _crosstab(pre.agrupa(treino[coluna]), treino)
+    obtido = contagens(est, coluna, pre.agrupa)
+    # O crosstab omite os grupos sem linhas.
+    _compara(obtido[obtido.sum(axis=1) > 0], esperado)
+
+
+@pytest.mark.parametrize('coluna, faixas', [('age', 10), ('hours-per-week', 5)])
+def test_contagens_por_faixa(est, treino, coluna, faixas):
+    esperado = _crosstab(pd.cut(treino[coluna], faixas), treino)
+    obtido = contagens(est, coluna, lambda col: pd.cut(col, faixas))
+    _compara(obtido.astype(object).rename(index=str), esperado.rename(index=str))
+
+
+def test_contagens_na_ordem_de_aparicao(est, treino):
+    obtido = contagens(est, 'age')
+    esperado = _crosstab(treino['age'], treino).loc[pd.unique(treino['age'])]
+    _compara(obtido, esperado)
+
+
+def test_gera_relatorio_sem_interface(modelo, treino, teste, tmp_path):
+    rel = gera_relatorio(treino, PreProcessamento().fit(treino), str(tmp_path), modelo=modelo, teste=teste, n_jobs=2)
+    figuras = [os.path.basename(caminho) for caminho, _, _, _ in rel.figuras]
+    assert {'tree.png', 'confusion_decision_tree.png', '4_1_histogramas.png'} <= set(figuras)
+    for nome in figuras:
+        assert os.path.getsize(tmp_path / nome) > 0
+    html = (tmp_path / 'relatorio.html').read_text()
+    assert all(nome in html for nome in figuras)
+    assert (tmp_path / 'resumo.txt').exists()
+
+
+def test_arvore_fora_do_sklearn(teste, tmp_path):
+    # A figura da árvore sai dos vetores do tree_ quando o plot_tree não aceita o estimador.
+    from arvore_decisao_marcelo_danilo import treina
+
+    modelo = treina(TREINO, destino=None, motor='histograma', max_depth=6)
+    limpo = modelo.pre.transform(modelo.pre.limpa(teste, remove_outliers=False))
+    rel = Relatorio(str(tmp_path))
+    secao_modelo(rel, modelo, modelo.codificador.transform(limpo), modelo.codificador.transforma_alvo(limpo))
+    rel.renderiza(n_jobs=1)
+    assert [desenho for _, desenho, _, _ in rel.figuras] == ['vetores_arvore', 'confusao']
+    assert os.path.getsize(tmp_path / 'tree.png') > 0
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from arvore_decisao_marcelo_danilo import avalia, treina
+from artefato import carrega_artefato
+from conftest import RAIZ, TREINO, TESTE, secoes_originais
+from modelo import ModeloRenda
+
+
+def test_treina_igual_a_secao_7(modelo, teste):
+    # O modelo da seção 7 do script original: get_dummies e DecisionTreeClassifier com os mesmos parâmetros.
+    from sklearn.tree import DecisionTreeClassifier
+
+    data = pd.get_dummies(secoes_originais(TREINO), drop_first=True)
+    X, y = data[data.columns[:-1]], data[data.columns[-1]]
+    tree_clf_income = DecisionTreeClassifier(max_depth=3, random_state=42, criterion="gini", splitter='best',
+                                             max_features=7).fit(X, y)
+    for atributo in ('children_left', 'children_right', 'feature', 'threshold', 'value'):
+        np.testing.assert_array_equal(getattr(modelo.estimador.tree_, atributo), getattr(tree_clf_income.tree_, atributo))
+    teste_original = pd.get_dummies(secoes_originais(TESTE, remove_outliers=False), drop_first=True)
+    esperado = tree_clf_income.predict(teste_original.reindex(columns=X.columns, fill_value=False))
+    pre = modelo.pre
+    limpo = pre.limpa(teste, remove_outliers=False)
+    np.testing.assert_array_equal(modelo.predict(limpo), esperado)
+
+
+def test_treina_grava_pkl_e_artefato(teste, tmp_path):
+    destino = str(tmp_path / 'arvore_decisao')
+    modelo = treina(TREINO, destino)
+    esperado = modelo.predict_proba(teste)
+    np.testing.assert_array_equal(ModeloRenda.carrega(f"{destino}.pkl").predict_proba(teste), esperado)
+    np.testing.assert_allclose(carrega_artefato(destino).predict_proba(teste), esperado, rtol=0, atol=1e-12)
+    assert 'accuracy' in avalia(modelo, TESTE)
+
+
+def test_treino_sem_matplotlib():
+    # Importar o script e treinar não carrega as bibliotecas de gráficos.
+    codigo = ("import sys; from arvore_decisao_marcelo_danilo import treina; treina(sys.argv[1], destino=None); "
+              "print(sorted(m for m in ('matplotlib', 'seaborn') if m in sys.modules))")
+    saida = subprocess.run([sys.executable, '-c', codigo, TREINO], cwd=RAIZ, capture_output=True, text=True, check=True,
+                           env={**os.environ, 'PYTHONPATH': RAIZ})
+    assert saida.stdout.strip() == '[]'
@@ -0,0 +1,112 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from conftest import registros
+from servico import Microlotes, RegistroInvalido, valida_registros
+
+
+def test_valida_converte_inteiros(teste):
+    r = registros(teste.head(1))[0]
+    r['age'], r['fnlwgt'] = 37.0, '1234'
+    valida_registros([r])
+    assert r['age'] == 37 and r['fnlwgt'] == 1234
+
+
+@pytest.mark.parametrize('coluna, valor', [('age', 37.9), ('age', True), ('age', None), ('age', '3x'),
+                                           ('age', [37]), ('workclass', ['x']), ('workclass', 3),
+                                           ('sex', {'a': 1})])
+def test_valida_recusa(teste, coluna, valor):
+    r = registros(teste.head(1))[0]
+    r[coluna] = valor
+    with pytest.raises(RegistroInvalido):
+        valida_registros([r])
+
+
+def test_valida_aceita_categoria_nula(teste):
+    r = registros(teste.head(1))[0]
+    r['workclass'] = None
+    del r['occupation']
+    valida_registros([r])
+
+
+def test_valida_fnlwgt_opcional(teste):
+    r, s = registros(teste.head(2))
+    del r['fnlwgt']
+    s['fnlwgt'] = None
+    valida_registros([r, s])
+    assert 'fnlwgt' not in r and 'fnlwgt' not in s
+
+
+def test_microlotes_igual_ao_modelo(modelo, teste):
+    amostra = teste.head(300)
+    esperado = modelo.rotulos(modelo.pontua(amostra)[0])
+    partes = [registros(amostra.iloc[i:i + 30]) for i in range(0, 300, 30)]
+
+    async def roda():
+        lotes = Microlotes(modelo, max_lote=512, espera_max=0.01)
+        lotes.inicia()
+        try:
+            return await asyncio.gather(*(lotes.pontua(p) for p in partes))
+        finally:
+            await lotes.para()
+
+    resultados = [r['income'] for parte in asyncio.run(roda()) for r in parte]
+    assert resultados == list(esperado)
+
+
+class _ModeloFalho:
+    # Falha em qualquer lote que contenha a categoria 'falha' em workclass.
+    def __init__(self, modelo):
+        self.modelo = modelo
+
+    def pontua(self, data):
+        if (data['workclass'] == 'falha').any():
+            raise ValueError('registro que falha na pontuação')
+        return self.modelo.pontua(data)
+
+    def rotulos(self, previsoes):
+        return self.modelo.rotulos(previsoes)
+
+
+def test_falha_de_um_registro_nao_afeta_o_lote(modelo, teste):
+    boas = registros(teste.head(20))
+    ruim = registros(teste.head(1))
+    ruim[0]['workclass'] = 'falha'
+
+    async def roda():
+        # Espera longa: as três requisições entram no mesmo lote.
+        lotes = Microlotes(_ModeloFalho(modelo), max_lote=512, espera_max=0.2)
+        lotes.inicia()
+        try:
+            return await asyncio.gather(lotes.pontua(boas[:10]), lotes.pontua(ruim), lotes.pontua(boas[10:]),
+                                        return_exceptions=True)
+        finally:
+            await lotes.para()
+
+    primeira, erro, segunda = asyncio.run(roda())
+    assert isinstance(erro, ValueError)
+    esperado = modelo.rotulos(modelo.pontua(teste.head(20))[0])
+    assert [r['income'] for r in primeira + segunda] == list(esperado)
+    assert np.all([0 <= r['probabilidade'] <= 1 for r in primeira + segunda])
+
+
+def test_microlotes_sem_fnlwgt_e_vazio(modelo, teste):
+    amostra = teste.head(50)
+    esperado = modelo.rotulos(modelo.pontua(amostra)[0])
+    parte = registros(amostra)
+    for r in parte[::2]:
+        del r['fnlwgt']
+
+    async def roda():
+        lotes = Microlotes(modelo, max_lote=512, espera_max=0.01)
+        lotes.inicia()
+        try:
+            return await asyncio.gather(lotes.pontua(parte), lotes.pontua([]))
+        finally:
+            await lotes.para()
+
+    resultados, vazio = asyncio.run(roda())
+    assert [r['income'] for r in resultados] == list(esperado)
+    assert vazio == []
@@ -0,0 +1,43 @@
+import pytest
+
+from preprocessamento import PreProcessamento
+from sintetico import GeradorCenso
+
+
+def _distancia(a, b, colunas):
+    # Distância de variação total entre as distribuições conjuntas das colunas.
+    pa = a[colunas].astype(str).value_counts(normalize=True)
+    pb = b[colunas].astype(str).value_counts(normalize=True)
+    return 0.5 * pa.sub(pb, fill_value=0).abs().sum()
+
+
+@pytest.fixture(scope='module')
+def sintetico(treino):
+    return GeradorCenso().fit(treino).gera(len(treino), random_state=0)
+
+
+def test_colunas_e_tipos(treino, sintetico):
+    assert list(sintetico.columns) == list(treino.columns)
+    assert len(sintetico) == len(treino)
+    assert (sintetico.dtypes.astype(str)[['age', 'fnlwgt']] == 'int64').all()
+
+
+@pytest.mark.parametrize('colunas', [['income'], ['relationship', 'sex'], ['marital-status', 'relationship'],
+                                     ['workclass', 'occupation'], ['race', 'native-country'],
+                                     ['education', 'education-num'], ['sex', 'income']])
+def test_distribuicoes_conjuntas(treino, sintetico, colunas):
+    assert _distancia(treino, sintetico, colunas) < 0.03
+
+
+def test_faltantes_aparecem_juntos(treino, sintetico):
+    for data in (treino, sintetico):
+        assert (data['workclass'].isna() <= data['occupation'].isna()).all()
+
+
+def test_limpeza_remove_fracao_parecida(treino, sintetico):
+    pre = PreProcessamento().fit(treino)
+
+    def fracao(data):
+        return len(pre.limpa(data)) / len(data)
+
+    assert fracao(sintetico) == pytest.approx(fracao(treino), abs=0.01)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from validacao import ValidacaoCruzada, Metricas
+
+
+@pytest.fixture(scope='module')
+def dados(modelo, treino):
+    return modelo.pre.transform(modelo.pre.limpa(treino))
+
+
+def dobras_sklearn(dados, estimador):
+    """Probabilidades de validação de cada dobra do KFold(6), com o codificador ajustado no treino da dobra."""
+    from sklearn.base import clone
+    from sklearn.model_selection import KFold
+    from preprocessamento import CodificadorOneHot
+
+    saida = []
+    for treino, validacao in KFold(6).split(dados):
+        parte_treino, parte_validacao = dados.iloc[treino], dados.iloc[validacao]
+        cod = CodificadorOneHot().fit(parte_treino)
+        arvore = clone(estimador).fit(cod.transform(parte_treino, formato='denso', dtype=np.float32),
+                                      cod.transforma_alvo(parte_treino))
+        saida.append((cod.transforma_alvo(parte_validacao),
+                      arvore.predict_proba(cod.transform(parte_validacao, formato='denso', dtype=np.float32))))
+    return saida
+
+
+@pytest.mark.parametrize('parametros', [{'max_depth': 3}, {'max_depth': 8, 'min_samples_leaf': 5}])
+def test_metricas_iguais_as_do_sklearn_no_kfold(dados, parametros):
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+    from sklearn.tree import DecisionTreeClassifier
+
+    estimador = DecisionTreeClassifier(random_state=42, **parametros)
+    validacao = ValidacaoCruzada(estimador, n_jobs=2).fit(dados)
+    referencia = dobras_sklearn(dados, estimador)
+    assert len(validacao.dobras_) == len(referencia) == 6
+    for metricas, (y, proba) in zip(validacao.dobras_, referencia):
+        previsto = proba.argmax(axis=1)
+        assert metricas.n == len(y)
+        assert metricas.acuracia == pytest.approx(accuracy_score(y, previsto), abs=1e-12)
+        assert metricas.precisao == pytest.approx(precision_score(y, previsto), abs=1e-12)
+        assert metricas.revocacao == pytest.approx(recall_score(y, previsto), abs=1e-12)
+        assert metricas.f1 == pytest.approx(f1_score(y, previsto), abs=1e-12)
+        # Exata quando cada faixa do histograma tem uma única probabilidade distinta.
+        faixas = np.minimum((proba[:, 1] * metricas.histograma.shape[0]).astype(int), metricas.histograma.shape[0] - 1)
+        if all(len(np.unique(proba[faixas == f, 1])) == 1 for f in np.unique(faixas)):
+            assert metricas.auc == pytest.approx(roc_auc_score(y, proba[:, 1]), abs=1e-12)
+        else:
+            assert metricas.auc == pytest.approx(roc_auc_score(y, proba[:, 1]), abs=1e-3)
+    # O total é o cross_val_predict: as previsões de validação de todas as dobras juntas.
+    y = np.concatenate([y for y, _ in referencia])
+    proba = np.concatenate([p for _, p in referencia])
+    assert validacao.total_.acuracia == pytest.approx(accuracy_score(y, proba.argmax(axis=1)), abs=1e-12)
+    assert validacao.total_.f1 == pytest.approx(f1_score(y, proba.argmax(axis=1)), abs=1e-12)
+    resumo = validacao.resumo()
+    assert resumo['acuracia']['media'] == pytest.approx(np.mean([accuracy_score(y, p.argmax(axis=1))
+                                                                  for y, p in referencia]), abs=1e-12)
+
+
+def test_n_jobs_nao_muda_o_resultado(dados):
+    from sklearn.tree import DecisionTreeClassifier
+
+    estimador = DecisionTreeClassifier(random_state=42, max_depth=6)
+    serial = ValidacaoCruzada(estimador, n_jobs=1).fit(dados)
+    paralela = ValidacaoCruzada(estimador, n_jobs=3).fit(dados)
+    for a, b in zip(serial.dobras_, paralela.dobras_):
+        np.testing.assert_array_equal(a.matriz, b.matriz)
+        np.testing.assert_array_equal(a.histograma, b.histograma)
+
+
+def test_soma_equivale_a_uniao_e_relatorio(matrizes, modelo):
+    from sklearn.metrics import classification_report
+
+    X, y, _ = matrizes
+    proba = modelo.estimador.predict_proba(X)
+    metade = len(y) // 2
+    total = Metricas.de_previsoes(y[:metade], proba[:metade]) + Metricas.de_previsoes(y[metade:], proba[metade:])
+    inteiro = Metricas.de_previsoes(y, proba)
+    np.testing.assert_array_equal(total.matriz, inteiro.matriz)
+    np.testing.assert_array_equal(total.histograma, inteiro.histograma)
+    # As linhas do classification_report (duas casas) são as mesmas, com os rótulos 0 e 1.
+    referencia = classification_report(y, proba.argmax(axis=1), target_names=['<=50K', '>50K']).split('\n')
+    relatorio = inteiro.relatorio().split('\n')
+    for linha in ('<=50K', '>50K', 'accuracy', 'macro avg', 'weighted avg'):
+        assert next(l.split() for l in relatorio if l.strip().startswith(linha)) == \
+            next(l.split() for l in referencia if l.strip().startswith(linha))
@@ -0,0 +1,186 @@
+# Validação cruzada (KFold(6)) com todas as métricas tiradas de agregados de cada dobra.
+#
+# O notebook importa cross_val_score, cross_val_predict e KFold(6), mas a avaliação acaba
+# sendo um classification_report no próprio treino; e calcular cada métrica do sklearn em
+# separado (accuracy_score, f1_score, roc_auc_score...) percorre as previsões uma vez por
+# métrica. Aqui:
+#   - as dobras são codificadas e gravadas uma única vez como .npy (busca.prepara_dobras) e
+#     abertas com mmap por todos os processos do pool;
+#   - cada dobra é avaliada em um processo: um ajuste e um predict_proba na validação, dos
+#     quais saem apenas a matriz de confusão (2 x 2) e um histograma das probabilidades da
+#     classe positiva para cada classe (n_faixas x 2);
+#   - acurácia, precisão, revocação e F1 vêm da matriz de confusão, e a ROC-AUC do
+#     histograma (estatística de Mann-Whitney com as faixas como empates). A AUC é exata
+#     quando cada faixa só contém uma probabilidade distinta, como nas folhas de uma árvore
+#     rasa; em geral o erro é limitado pelos pares que caem na mesma faixa.
+# As métricas de cada dobra e as do conjunto (as dobras somadas) são calculadas a partir
+# desses agregados, sem reler as previsões.
+
+import os
+import copy
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import busca
+from busca import prepara_dobras, N_DOBRAS
+
+
+# Número de faixas do histograma de probabilidades usado na ROC-AUC.
+N_FAIXAS = 1000
+
+metricas = ['acuracia', 'precisao', 'revocacao', 'f1', 'auc']
+
+
+class Metricas:
+    """Matriz de confusão e histograma das probabilidades de um conjunto de previsões binárias.
+
+    matriz[i, j]: linhas da classe i previstas como j (0 = <=50K, 1 = >50K).
+    histograma[f, i]: linhas da classe i com a probabilidade da classe 1 na faixa f.
+    Somar dois Metricas (m1 + m2) equivale a avaliar a união das previsões.
+    """
+
+    def __init__(self, matriz, histograma):
+        self.matriz = np.asarray(matriz, dtype=np.int64)
+        self.histograma = np.asarray(histograma, dtype=np.int64)
+
+    @classmethod
+    def de_previsoes(cls, y, proba, n_faixas=N_FAIXAS):
+        """Agregados de um alvo binário y e das probabilidades proba (n x 2) de um predict_proba."""
+        y = np.asarray(y).astype(np.int64)
+        # Mesma regra do predict: a classe de maior probabilidade, a primeira nos empates.
+        previsto = (proba[:, 1] > proba[:, 0]).astype(np.int64)
+        matriz = np.bincount(2 * y + previsto, minlength=4).reshape(2, 2)
+        faixas = np.minimum((proba[:, 1] * n_faixas).astype(np.int64), n_faixas - 1)
+        histograma = np.bincount(2 * faixas + y, minlength=2 * n_faixas).reshape(n_faixas, 2)
+        return cls(matriz, histograma)
+
+    def __add__(self, outro):
+        return Metricas(self.matriz + outro.matriz, self.histograma + outro.histograma)
+
+    @property
+    def n(self):
+        return int(self.matriz.sum())
+
+    @property
+    def acuracia(self):
+        return _razao(np.trace(self.matriz), self.matriz.sum())
+
+    def precisao_classe(self, i):
+        return _razao(self.matriz[i, i], self.matriz[:, i].sum())
+
+    def revocacao_classe(self, i):
+        return _razao(self.matriz[i, i], self.matriz[i, :].sum())
+
+    def f1_classe(self, i):
+        # 2 VP / (2 VP + FP + FN): dispensa a média harmônica (e a divisão por zero dela).
+        return _razao(2 * self.matriz[i, i], self.matriz[i, :].sum() + self.matriz[:, i].sum())
+
+    @property
+    def precisao(self):
+        return self.precisao_classe(1)
+
+    @property
+    def revocacao(self):
+        return self.revocacao_classe(1)
+
+    @property
+    def f1(self):
+        return self.f1_classe(1)
+
+    @property
+    def auc(self):
+        negativos, positivos = self.histograma[:, 0].astype(np.float64), self.histograma[:, 1].astype(np.float64)
+        # Para cada positivo, os negativos em faixas abaixo contam 1 e os da mesma faixa, 1/2.
+        abaixo = np.cumsum(negativos) - negativos
+        pares = negativos.sum() * positivos.sum()
+        return _razao((positivos * (abaixo + negativos / 2)).sum(), pares)
+
+    def como_dict(self):
+        return {m: float(getattr(self, m)) for m in metricas}
+
+    def relatorio(self, rotulos=('<=50K', '>50K')):
+        """Texto no formato do classification_report, a partir da matriz de confusão."""
+        largura = max(len(r) for r in rotulos + ('weighted avg',))
+        linhas = [f"{'':>{largura}} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", '']
+        suportes = self.matriz.sum(axis=1)
+        por_classe = [(self.precisao_classe(i), self.revocacao_classe(i), self.f1_classe(i)) for i in range(2)]
+        for rotulo, valores, suporte in zip(rotulos, por_classe, suportes):
+            linhas.append(f"{rotulo:>{largura}} " + ' '.join(f"{v:9.2f}" for v in valores) + f" {suporte:9d}")
+        linhas.append('')
+        linhas.append(f"{'accuracy':>{largura}} {'':>9} {'':>9} {self.acuracia:9.2f} {self.n:9d}")
+        media = np.mean(por_classe, axis=0)
+        ponderada = np.average(por_classe, axis=0, weights=suportes) if self.n else media
+        for nome, valores in (('macro avg', media), ('weighted avg', ponderada)):
+            linhas.append(f"{nome:>{largura}} " + ' '.join(f"{v:9.2f}" for v in valores) + f" {self.n:9d}")
+        linhas.append(f"{'roc auc':>{largura}} {'':>9} {'':>9} {self.auc:9.2f} {self.n:9d}")
+        return '\n'.join(linhas)
+
+
+def _razao(a, b):
+    return float(a) / float(b) if b else 0.0
+
+
+def _avalia_dobra(tarefa):
+    # Ajusta o estimador no treino da dobra k e agrega as previsões da validação.
+    estimador, k, n_faixas = tarefa
+    dobra = busca._dobras[k]
+    estimador.fit(dobra['X_treino'], dobra['y_treino'])
+    return Metricas.de_previsoes(dobra['y_validacao'], estimador.predict_proba(dobra['X_validacao']), n_faixas)
+
+
+class ValidacaoCruzada:
+    """KFold(n_dobras) em n_jobs processos, com as métricas tiradas dos agregados de cada dobra.
+
+    validacao = ValidacaoCruzada(DecisionTreeClassifier(**parametros_arvore)).fit(data)
+    validacao.resumo()           # média e desvio de cada métrica nas dobras
+    print(validacao.total_.relatorio())
+
+    data: saída de PreProcessamento.transform. Depois do fit, dobras_ tem um Metricas por
+    dobra e total_ a soma deles (as previsões de validação de todas as dobras, como em
+    cross_val_predict).
+    """
+
+    def __init__(self, estimador=None, n_dobras=N_DOBRAS, n_jobs=None, n_faixas=N_FAIXAS, random_state=42,
+                 diretorio=None):
+        self.estimador = estimador
+        self.n_dobras = n_dobras
+        self.n_jobs = n_jobs
+        self.n_faixas = n_faixas
+        self.random_state = random_state
+        self.diretorio = diretorio
+
+    def fit(self, data, alvo='income'):
+        estimador = self.estimador
+        if estimador is None:
+            from arvore_decisao_marcelo_danilo import cria_estimador
+            estimador = cria_estimador()
+        diretorio = self.diretorio or tempfile.mkdtemp(prefix='validacao-')
+        try:
+            prepara_dobras(data, diretorio, self.n_dobras, alvo, self.random_state)
+            # Cada tarefa leva a sua cópia do estimador (ajustada no processo que a avalia).
+            tarefas = [(copy.deepcopy(estimador), k, self.n_faixas) for k in range(self.n_dobras)]
+            n_jobs = min(self.n_jobs or os.cpu_count() or 1, self.n_dobras)
+            if n_jobs > 1:
+                with ProcessPoolExecutor(n_jobs, initializer=busca._abre_dobras, initargs=(diretorio,)) as pool:
+                    self.dobras_ = list(pool.map(_avalia_dobra, tarefas))
+            else:
+                busca._abre_dobras(diretorio)
+                self.dobras_ = [_avalia_dobra(t) for t in tarefas]
+        finally:
+            if self.diretorio is None:
+                shutil.rmtree(diretorio, ignore_errors=True)
+        self.total_ = sum(self.dobras_[1:], self.dobras_[0])
+        return self
+
+    def por_dobra(self):
+        """Lista com um dict de métricas por dobra (como os cross_val_score de cada métrica)."""
+        return [m.como_dict() for m in self.dobras_]
+
+    def resumo(self):
+        """Média e desvio de cada métrica nas dobras, e as métricas do conjunto das dobras."""
+        valores = {m: np.array([d[m] for d in self.por_dobra()]) for m in metricas}
+        return {m: {'media': float(v.mean()), 'desvio': float(v.std()), 'total': float(getattr(self.total_, m))}
+                for m, v in valores.items()}